@@ -0,0 +1,337 @@
+"""
+Portfolio allocation: share one capital budget across many sites.
+
+Each site is offered at a few fractions of its recommended size
+(ALLOC_SIZE_STEPS), and every option is billed and projected with
+`finance.project()` in vectorized chunks. The allocation picks at most one
+option per site to maximize total NPV, keeping the total cost within the budget
+and the installed kW of each region (feeder, substation...) within its cap:
+
+1. Greedy by marginal return. A site's options form an upgrade chain along the
+   upper hull of NPV against cost; all increments are taken in order of NPV
+   gained per rupee while the budget and the region allow.
+2. Knapsack refinement. The sites around the point where the greedy pass
+   stopped (its least rewarding installs and the most promising sites it left
+   out) are released and re-solved exactly by a dynamic program over the
+   budget they share; the better of the two solutions is kept.
+
+Filling the budget fractionally in the greedy order (the LP relaxation) gives
+an upper bound on the achievable NPV, reported alongside the result.
+"""
+
+import math
+import os
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from batch import group_by_plan, plan_bills, effective_tariffs, resource_arrays, round_exact
+from calculator import (
+    parse_site, system_type_for, PUMP_REQUIREMENT_KW, SOLAR_MULTIPLIER, AGRICULTURE_SOLAR_MULTIPLIER,
+    WIND_MULTIPLIER, SOLAR_COST_PER_KW, WIND_COST_PER_KW, AGRICULTURE_COST_PER_KW, AGRICULTURE_SUBSIDY,
+)
+from finance import annual_om, degraded, project
+from geo_resource import solar_factor, wind_factor_array
+
+ALLOC_SIZE_STEPS = tuple(float(step) for step in os.environ.get("ALLOC_SIZE_STEPS", "0.25,0.5,0.75,1").split(","))
+ALLOC_REFINE_SITES = int(os.environ.get("ALLOC_REFINE_SITES", 200))  # sites re-solved by the knapsack pass
+ALLOC_REFINE_RESOLUTION = int(os.environ.get("ALLOC_REFINE_RESOLUTION", 5000))  # budget units in the knapsack
+ALLOC_CHUNK = 16384  # sites projected at once, to bound memory
+
+
+def parse_caps(value) -> Dict[str, float]:
+    """Validate the `regionCaps` request field ({region: kW}), raising ValueError"""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise ValueError("regionCaps must be an object of region: kW")
+    caps = {}
+    for region, cap in value.items():
+        if isinstance(cap, bool) or not isinstance(cap, (int, float)) or cap < 0:
+            raise ValueError(f"regionCaps.{region} must be a non-negative number")
+        caps[str(region)] = float(cap)
+    return caps
+
+
+def _options(usage_types, consumption, tariff, plans, latitude, longitude, steps):
+    """Size, cost, NPV and generation of every (site, size step) option as (n, steps) arrays"""
+    slabs_used = np.array([plan is not None for plan in plans], dtype=bool)
+    groups = group_by_plan(plans)
+    usage = np.array(usage_types, dtype=object)
+    is_agri = usage == "agriculture"
+    is_wind = np.array([system_type_for(u) == "wind" for u in usage_types], dtype=bool)
+    tariff = effective_tariffs(consumption, tariff, slabs_used, groups)
+
+    # Sizes, generation and costs the same way as recommend_batch()
+    recommended = round_exact(consumption / 100)
+    recommended = np.where(is_agri, np.maximum(recommended, PUMP_REQUIREMENT_KW), recommended)
+    size = round_exact(recommended[:, None] * np.asarray(steps))
+    size = np.where(is_agri[:, None], np.maximum(size, PUMP_REQUIREMENT_KW), size)
+
+    ghi, wind_speed = resource_arrays(latitude, longitude)
+    factors = np.where(is_wind, wind_factor_array(wind_speed), solar_factor(ghi))
+    multiplier = np.where(is_wind, WIND_MULTIPLIER, np.where(is_agri, AGRICULTURE_SOLAR_MULTIPLIER, SOLAR_MULTIPLIER))
+    generation = np.trunc(size * multiplier[:, None] * 30 * factors[:, None])
+
+    base_cost = np.where(is_agri, AGRICULTURE_COST_PER_KW, np.where(is_wind, WIND_COST_PER_KW, SOLAR_COST_PER_KW))
+    gross_cost = np.trunc(size * base_cost[:, None])
+    subsidy = np.where(is_agri[:, None], np.trunc(gross_cost * AGRICULTURE_SUBSIDY), 0)
+    om = annual_om(np.where(is_wind[:, None], 0, gross_cost), np.where(is_wind[:, None], gross_cost, 0))
+
+    # Project every option, a chunk of sites at a time
+    n, m = size.shape
+    npv = np.empty((n, m))
+    current_bill = consumption * tariff
+    for start in range(0, n, ALLOC_CHUNK):
+        rows = slice(start, min(start + ALLOC_CHUNK, n))
+        generation_by_year = degraded(generation[rows].ravel())
+        units = np.maximum(0.0, np.repeat(consumption[rows], m)[:, None] - generation_by_year)
+        chunk_groups = []
+        for plan, plan_rows in groups:
+            plan_rows = plan_rows[(plan_rows >= rows.start) & (plan_rows < rows.stop)] - start
+            if len(plan_rows):
+                chunk_groups.append((plan, (plan_rows[:, None] * m + np.arange(m)).ravel()))
+        new_bills = np.where(np.repeat(slabs_used[rows], m)[:, None], plan_bills(chunk_groups, units),
+                             units * np.repeat(tariff[rows], m)[:, None])
+        savings = np.repeat(current_bill[rows], m)[:, None] - new_bills
+        projection = project(savings, generation_by_year, gross_cost[rows].ravel(), subsidy[rows].ravel(),
+                             om[rows].ravel(), with_irr=False)
+        npv[rows] = projection["npv"].reshape(-1, m)
+
+    return {
+        "size": size,
+        "cost": gross_cost - subsidy,
+        "npv": npv,
+        "generation": generation,
+        "recommended": recommended,
+        "is_wind": is_wind,
+    }
+
+
+def _hull(cost: np.ndarray, value: np.ndarray, size: np.ndarray):
+    """Upgrade chains along the upper hull of (cost, NPV) per site, starting from no install.
+
+    Returns flat arrays of increments: site, option reached, step number in the
+    site's chain, and the extra cost, NPV and kW. Marginal returns fall along a chain.
+    """
+    n, m = cost.shape
+    current_cost = np.zeros(n)
+    current_value = np.zeros(n)
+    current_size = np.zeros(n)
+    active = np.ones(n, dtype=bool)
+    increments = []
+    for step in range(m):
+        extra_cost = cost - current_cost[:, None]
+        extra_value = value - current_value[:, None]
+        usable = (extra_cost > 0) & (extra_value > 0) & active[:, None]
+        ratio = np.where(usable, extra_value / np.where(extra_cost > 0, extra_cost, 1.0), -np.inf)
+        # Best ratio, then the larger option among ties
+        best = m - 1 - np.argmax(ratio[:, ::-1], axis=1)
+        sites = np.flatnonzero(np.isfinite(ratio[np.arange(n), best]))
+        if not len(sites):
+            break
+        best = best[sites]
+        increments.append((sites, best, np.full(len(sites), step), extra_cost[sites, best],
+                           extra_value[sites, best], size[sites, best] - current_size[sites]))
+        current_cost[sites], current_value[sites], current_size[sites] = (
+            cost[sites, best], value[sites, best], size[sites, best])
+        active[:] = False
+        active[sites] = True
+    if not increments:
+        empty = np.zeros(0, dtype=int)
+        return empty, empty, empty, np.zeros(0), np.zeros(0), np.zeros(0)
+    return tuple(np.concatenate(parts) for parts in zip(*increments))
+
+
+def _knapsack(groups, budget: float, resolution: int):
+    """Multiple-choice 0/1 knapsack: at most one (cost, value) choice per group within budget.
+
+    Costs are rounded up to budget units, so the result never exceeds the budget.
+    Returns the chosen index for each group (-1 for none).
+    """
+    best = np.zeros(resolution + 1)
+    picks = []
+    unit = budget / resolution
+    for choices in groups:
+        new = best.copy()
+        pick = np.full(resolution + 1, -1)
+        for k, (choice_cost, choice_value) in enumerate(choices):
+            weight = math.ceil(choice_cost / unit)
+            if weight > resolution:
+                continue
+            candidate = np.full(resolution + 1, -np.inf)
+            candidate[weight:] = best[:resolution + 1 - weight] + choice_value
+            better = candidate > new
+            new[better] = candidate[better]
+            pick[better] = k
+        picks.append(pick)
+        best = new
+
+    # Walk back from the full budget
+    chosen = [-1] * len(groups)
+    capacity = resolution
+    for g in range(len(groups) - 1, -1, -1):
+        k = picks[g][capacity]
+        if k >= 0:
+            chosen[g] = k
+            capacity -= math.ceil(groups[g][k][0] / unit)
+    return chosen
+
+
+def allocate(sites: List[Dict[str, Any]], budget: float, region_caps: Optional[Dict[str, float]] = None,
+             steps=ALLOC_SIZE_STEPS) -> Dict[str, Any]:
+    """Choose which sites to install, and at what size, under a shared budget and per-region kW caps.
+
+    Sites take the same fields as /api/recommend plus an optional `region`;
+    sites without a region, or in a region without a cap, are only limited by
+    the budget. Rows that fail validation are reported under "errors".
+    """
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)) or budget <= 0:
+        raise ValueError("budget must be a positive number")
+    region_caps = region_caps or {}
+
+    errors = []
+    valid_idx, locations, usage_types, consumptions, tariffs, plans, latitudes, longitudes, regions = (
+        [], [], [], [], [], [], [], [], [])
+    for i, site in enumerate(sites):
+        try:
+            parsed = parse_site(site)
+            region = site.get('region')
+            if region is not None and not isinstance(region, str):
+                raise ValueError("region must be a string")
+        except ValueError as e:
+            errors.append({"index": i, "error": str(e)})
+            continue
+        valid_idx.append(i)
+        locations.append(parsed.location)
+        usage_types.append(parsed.usage_type)
+        consumptions.append(parsed.monthly_consumption)
+        tariffs.append(parsed.tariff)
+        plans.append(parsed.tariff_plan)
+        latitudes.append(parsed.latitude if parsed.latitude is not None else np.nan)
+        longitudes.append(parsed.longitude if parsed.longitude is not None else np.nan)
+        regions.append(region)
+
+    result = {"budget": budget, "spent": 0, "npv": 0.0, "npv_upper_bound": 0.0, "greedy_npv": 0.0,
+              "refinement_gain": 0.0, "count": 0, "capacity_kw": 0.0, "regions": {}, "installs": [], "errors": errors}
+    if not valid_idx:
+        return result
+
+    options = _options(usage_types, np.array(consumptions, dtype=np.float64), np.array(tariffs, dtype=np.float64),
+                       plans, np.array(latitudes, dtype=np.float64), np.array(longitudes, dtype=np.float64), steps)
+    size, cost, npv = options["size"], options["cost"], options["npv"]
+    n = len(valid_idx)
+
+    # Region of each site as an index into the remaining-capacity array (last slot: uncapped)
+    capped = sorted(region_caps)
+    code = {region: c for c, region in enumerate(capped)}
+    region_code = np.array([code.get(region, len(capped)) for region in regions], dtype=int)
+    capacity_left = np.array([region_caps[region] for region in capped] + [np.inf])
+
+    site, option, chain_step, extra_cost, extra_value, extra_kw = _hull(cost, npv, size)
+
+    # Greedy: increments by marginal return (a site's own chain stays in order)
+    ratio = extra_value / extra_cost
+    order = np.lexsort((chain_step, -ratio))
+    cumulative = np.cumsum(extra_cost[order])
+    full = np.searchsorted(cumulative, budget, side="right")
+    bound = extra_value[order[:full]].sum()
+    if full < len(order):
+        bound += extra_value[order[full]] * (budget - (cumulative[full - 1] if full else 0.0)) / extra_cost[order[full]]
+
+    chosen = np.full(n, -1)
+    last_ratio = np.full(n, np.inf)  # marginal return of each site's last accepted increment
+    blocked = np.zeros(n, dtype=bool)
+    budget_left = float(budget)
+    cheapest_after = np.minimum.accumulate(extra_cost[order][::-1])[::-1]
+    for position, j in enumerate(order):
+        if budget_left < cheapest_after[position]:
+            break
+        s = site[j]
+        if blocked[s]:
+            continue
+        r = region_code[s]
+        if extra_cost[j] <= budget_left and extra_kw[j] <= capacity_left[r] + 1e-9:
+            chosen[s] = option[j]
+            last_ratio[s] = ratio[j]
+            budget_left -= extra_cost[j]
+            capacity_left[r] -= extra_kw[j]
+        else:
+            blocked[s] = True
+    rows = np.arange(n)
+    greedy_npv = float(np.where(chosen >= 0, npv[rows, np.maximum(chosen, 0)], 0.0).sum())
+
+    # Refinement: the sites around the greedy stopping point (the least rewarding installs and the
+    # most promising sites left out) are released and re-solved exactly as a knapsack
+    if ALLOC_REFINE_SITES > 0:
+        installs = np.flatnonzero(chosen >= 0)
+        released = installs[np.argsort(last_ratio[installs], kind="stable")[:ALLOC_REFINE_SITES // 2]]
+        unit_cost = np.where(cost > 0, cost, 1.0)
+        promise = np.where((npv > 0) & (cost > 0), npv / unit_cost, -np.inf).max(axis=1)
+        promise[installs] = -np.inf
+        left_out = np.flatnonzero(np.isfinite(promise))
+        left_out = left_out[np.argsort(-promise[left_out], kind="stable")[:ALLOC_REFINE_SITES - len(released)]]
+        core = np.concatenate([released, left_out])
+
+        core_value = float(npv[released, chosen[released]].sum())
+        pool = budget_left + float(cost[released, chosen[released]].sum())
+        pool_capacity = capacity_left.copy()
+        np.add.at(pool_capacity, region_code[released], size[released, chosen[released]])
+        fits = ((cost[core] > 0) & (cost[core] <= pool) & (npv[core] > 0)
+                & (size[core] <= pool_capacity[region_code[core]][:, None] + 1e-9))
+        choices = [np.flatnonzero(row) for row in fits]
+        if len(core) and pool > 0:
+            groups = [[(cost[s, k], npv[s, k]) for k in ks] for s, ks in zip(core, choices)]
+            picks = _knapsack(groups, pool, ALLOC_REFINE_RESOLUTION)
+            # Region caps are checked as the knapsack's picks are applied
+            refined = np.full(len(core), -1)
+            refined_capacity = pool_capacity.copy()
+            refined_budget = pool
+            for c, (s, ks, pick) in enumerate(zip(core, choices, picks)):
+                if pick < 0:
+                    continue
+                k, r = ks[pick], region_code[s]
+                if size[s, k] <= refined_capacity[r] + 1e-9 and cost[s, k] <= refined_budget:
+                    refined[c] = k
+                    refined_capacity[r] -= size[s, k]
+                    refined_budget -= cost[s, k]
+            taken = refined >= 0
+            if float(npv[core[taken], refined[taken]].sum()) > core_value:
+                chosen[core] = refined
+                capacity_left, budget_left = refined_capacity, refined_budget
+
+    installed = np.flatnonzero(chosen >= 0)
+    picked = chosen[installed]
+    total_npv = float(npv[installed, picked].sum())
+    result.update({
+        "spent": int(cost[installed, picked].sum()),
+        "npv": round(total_npv, 2),
+        "npv_upper_bound": round(max(float(bound), total_npv), 2),
+        "greedy_npv": round(greedy_npv, 2),
+        "refinement_gain": round(total_npv - greedy_npv, 2),
+        "count": len(installed),
+        "capacity_kw": round(float(size[installed, picked].sum()), 1),
+        "regions": {
+            region: {
+                "cap_kw": region_caps[region],
+                "allocated_kw": round(region_caps[region] - float(capacity_left[c]), 1),
+            }
+            for c, region in enumerate(capped)
+        },
+        "installs": [
+            {
+                "index": valid_idx[s],
+                "location": locations[s],
+                "region": regions[s],
+                "usage_type": usage_types[s],
+                "system_type": "wind" if options["is_wind"][s] else "solar",
+                "recommended_size_kw": float(options["recommended"][s]),
+                "size_kw": float(size[s, k]),
+                "estimated_generation_kwh": int(options["generation"][s, k]),
+                "system_cost": int(cost[s, k]),
+                "npv": round(float(npv[s, k]), 2),
+            }
+            for s, k in zip(installed, picked)
+        ],
+    })
+    return result
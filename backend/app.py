@@ -1,14 +1,36 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
 import os
-import random
-import math
+import json
 from dotenv import load_dotenv
+import atexit
 import time
+import threading
+
+from allocation import allocate, parse_caps
+from batch import recommend_batch
+from sweep import sweep
+from calculator import parse_site, compute, evaluate, to_response
+from tariffs import list_tariffs, register_tariff
+from summary_jobs import SummaryJobQueue, job_store_from_env
+from summary_cache import summary_cache_from_env
+from response_cache import body_etag, request_key, response_cache_from_env
+from result_store import result_store_from_env
+from response_format import JSON, MSGPACK, ARROW, available, json_provider, negotiate, pack, batch_arrow, sweep_arrow
+from compression import compress_response
+from circuit_breaker import CircuitBreaker, HealthProber
+from gazetteer import get_gazetteer, resolve_place
+from geo_resource import get_resource_grid
+from summary_templates import render_summary
+from uncertainty import shutdown_pool
+from metrics import (
+    registry, REQUEST_SECONDS, SUMMARY_SECONDS, StageTimer, cache_gauge, record_llm_usage, start_profile,
+    finish_profile,
+)
 
 # Import local LM module
 try:
-    from local_lm import get_model_instance
+    from local_lm import LocalLM
     USE_LOCAL_LM = True
 except ImportError:
     print("Warning: Local LM module could not be imported. Using fallback method.")
@@ -17,346 +39,565 @@ except ImportError:
 # Load environment variables
 load_dotenv()
 
-# Initialize LM Studio API connection if available
+# Circuit breaker around LM Studio: when it is down or too slow, summaries come from templates
+llm_breaker = CircuitBreaker(
+    failure_threshold=int(os.environ.get("LM_FAILURE_THRESHOLD", 3)),
+    recovery_timeout=float(os.environ.get("LM_RECOVERY_TIMEOUT", 30)),
+    latency_budget=float(os.environ.get("LM_P95_BUDGET", 8)),
+)
+# Longest a single request waits for the local LM before using the template
+LLM_DEADLINE = float(os.environ.get("LM_DEADLINE", 10))
+
+# LM Studio connection, set up per process by start_background(); the health prober keeps checking it
 local_model = None
-if USE_LOCAL_LM:
-    try:
-        # Get the API endpoint from environment variable or use default
-        api_base = os.environ.get("LM_STUDIO_API_BASE", "http://localhost:1234/v1")
-        local_model = get_model_instance(api_base)
-        print(f"LM Studio API connection initialized: {local_model is not None}")
-        if local_model is None:
-            print("LM Studio API not available. Make sure LM Studio is running with the API server enabled.")
+health_prober = None
+background_pid = None
+background_lock = threading.Lock()
+
+def start_background():
+    """Connect to LM Studio without blocking and start the health prober, once per process.
+
+    Threads do not survive a fork, so under a preloading server this runs in
+    each worker (gunicorn.conf.py calls it after fork; otherwise the first
+    request does). Summaries use templates until the first probe succeeds.
+    """
+    global local_model, health_prober, background_pid, USE_LOCAL_LM
+    if background_pid == os.getpid():
+        return
+    with background_lock:
+        if background_pid == os.getpid():
+            return
+        background_pid = os.getpid()
+        if not USE_LOCAL_LM:
+            return
+        try:
+            # Get the API endpoint from environment variable or use default
+            api_base = os.environ.get("LM_STUDIO_API_BASE", "http://localhost:1234/v1")
+            local_model = LocalLM(api_base, check_connection=False)
+            local_model.on_usage = record_llm_usage
+            llm_breaker.trip("LM Studio connection not checked yet")
+            probe_interval = float(os.environ.get("LM_PROBE_INTERVAL", 15))
+            health_prober = HealthProber(local_model, llm_breaker, interval=probe_interval)
+            health_prober.start(immediate=True)
+        except Exception as e:
+            print(f"Error initializing LM Studio API connection: {e}")
             USE_LOCAL_LM = False
+
+def shutdown():
+    """Stop background threads and close the LM Studio connection (safe to call more than once)"""
+    if health_prober is not None:
+        health_prober.stop()
+    if summary_jobs is not None:
+        summary_jobs.stop(timeout=float(os.environ.get('SUMMARY_SHUTDOWN_TIMEOUT', 10)))
+    if local_model is not None:
+        local_model.close()
+    shutdown_pool()
+
+def preload():
+    """Load the shared read-only data up front, so forked workers share it instead of each loading it"""
+    start_time = time.time()
+    get_resource_grid()
+    try:
+        get_gazetteer()
     except Exception as e:
-        print(f"Error initializing LM Studio API connection: {e}")
-        USE_LOCAL_LM = False
+        print(f"Gazetteer unavailable: {e}")
+    print(f"Preloaded resource grid and gazetteer in {time.time() - start_time:.2f} seconds")
 
 # Initialize Flask app
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+app.json = json_provider(app)  # orjson when installed
+CORS(app, expose_headers=["ETag", "X-Cache", "X-Recomputed"])  # Enable CORS for all routes
+app.before_request(start_background)
+
+@app.before_request
+def start_request_timer():
+    """Time every request, profiling a sampled fraction of them"""
+    g.request_start = time.perf_counter()
+    g.profile = start_profile()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record request latency (and dump the profile of a slow sampled request)"""
+    start = g.get('request_start')
+    if start is not None:
+        elapsed = time.perf_counter() - start
+        endpoint = request.endpoint or "unknown"
+        REQUEST_SECONDS.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+        if g.get('profile') is not None:
+            finish_profile(g.profile, elapsed, endpoint)
+            g.profile = None
+    return response
+
+@app.after_request
+def compress(response):
+    """gzip or Brotli for large bodies (runs before the timing hook above, so it is included in request latency)"""
+    return compress_response(response, request.accept_encodings)
+
+# Cache of LLM summaries keyed on the prompt inputs
+summary_cache = summary_cache_from_env()
+
+# Cache of whole /api/recommend responses keyed on the canonical request (None when disabled)
+response_cache = response_cache_from_env()
+
+# Recent evaluations, so follow-ups sending previousResultId only recompute what changed (None when disabled)
+result_store = result_store_from_env()
+cache_gauge("cache", lambda: {"summary": summary_cache, "response": response_cache, "result": result_store})
+
+# Background workers for asynchronous LLM summaries (started on first use), and the
+# store that shares job state between worker processes (None when jobs stay in-process)
+summary_jobs = None
+summary_jobs_lock = threading.Lock()
+summary_job_ttl = float(os.environ.get('SUMMARY_JOB_TTL', 600))
+summary_job_store = job_store_from_env(summary_job_ttl)
+
+def get_summary_jobs():
+    """Get or create the shared summary job queue"""
+    global summary_jobs
+    with summary_jobs_lock:
+        if summary_jobs is None:
+            summary_jobs = SummaryJobQueue(
+                generate_summary,
+                workers=int(os.environ.get('SUMMARY_WORKERS', 2)),
+                max_queue=int(os.environ.get('SUMMARY_QUEUE_SIZE', 100)),
+                ttl=summary_job_ttl,
+                store=summary_job_store,
+            )
+    return summary_jobs
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Simple health check endpoint"""
-    return jsonify({"status": "healthy", "message": "Python backend is running"}), 200
+    return jsonify({
+        "status": "healthy",
+        "message": "Python backend is running",
+        "summary_cache": summary_cache.stats(),
+        "response_cache": response_cache.stats() if response_cache is not None else None,
+        "result_store": result_store.stats() if result_store is not None else None,
+        "llm": {
+            "enabled": USE_LOCAL_LM and local_model is not None,
+            "connected": local_model.is_available() if local_model is not None else False,
+            "breaker": llm_breaker.stats(),
+        },
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker process"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
 
 @app.route('/api/recommend', methods=['POST'])
 def recommend():
     """Generate renewable energy recommendations based on input data"""
     try:
+        timer = StageTimer()
+        fmt = negotiate(request.accept_mimetypes)
+        if fmt is None:
+            return not_acceptable((JSON, MSGPACK))
         data = request.json
-        
-        # Extract data from the request
-        location = data.get('location', 'Unknown')
-        usage_type = data.get('usageType', 'home')
-        monthly_consumption = data.get('monthlyConsumption', 0)
-        
-        # Get tariff either from direct tariff field or calculate from slabs
-        tariff = data.get('tariff', 0)
-        slabs = data.get('slabs', {})
-        budget = data.get('budget')
-        
-        # If slabs are provided, calculate effective tariff
-        if slabs:
-            # Default values if not provided
-            slab1_rate = slabs.get('slab1Rate', 4.0)
-            slab2_rate = slabs.get('slab2Rate', 6.0)
-            slab3_rate = slabs.get('slab3Rate', 8.0)
-            slab4_rate = slabs.get('slab4Rate', 10.0)
-            
-            # Calculate total bill based on consumption slabs
-            if monthly_consumption <= 0:
-                total_bill = 0
-            else:
-                bill = 0
-                remaining = monthly_consumption
-                
-                # Slab 1: 0-100 kWh
-                units_in_slab1 = min(100, remaining)
-                bill += units_in_slab1 * slab1_rate
-                remaining -= units_in_slab1
-                
-                # Slab 2: 101-300 kWh
-                if remaining > 0:
-                    units_in_slab2 = min(200, remaining)  # 300-100=200
-                    bill += units_in_slab2 * slab2_rate
-                    remaining -= units_in_slab2
-                
-                # Slab 3: 301-500 kWh
-                if remaining > 0:
-                    units_in_slab3 = min(200, remaining)  # 500-300=200
-                    bill += units_in_slab3 * slab3_rate
-                    remaining -= units_in_slab3
-                
-                # Slab 4: >500 kWh
-                if remaining > 0:
-                    bill += remaining * slab4_rate
-                
-                # Calculate effective tariff (average cost per unit)
-                tariff = bill / monthly_consumption if monthly_consumption > 0 else 0
-                
-                print(f"Calculated effective tariff from slabs: ₹{tariff:.2f}/unit")
-                
-        # If no valid tariff, use a reasonable default
-        if not tariff or tariff <= 0:
-            tariff = 8.0  # Default tariff
-        
-        # Determine system type based on usage type
-        if usage_type == "home":
-            system_type = "solar"
-        elif usage_type == "factory":
-            system_type = "wind"
-        elif usage_type == "agriculture":
-            # For agriculture, we'll recommend solar pumps and solar panels
-            system_type = "solar"
-        else:
-            system_type = "solar"  # Default to solar
-        
-        # Simple calculations
-        # In a real app, these would be based on location data, solar radiation maps, etc.
-        
-        # Calculate system size based on consumption and usage type
-        if usage_type == "agriculture":
-            # Agricultural systems typically need larger sizing for irrigation pumps
-            # Assuming a 5HP pump requires about 3.7kW
-            pump_requirement = 3.7
-            # Base size on consumption but with a minimum for pump operations
-            recommended_size_kw = max(round(monthly_consumption / 100, 1), pump_requirement)
-        else:
-            # Standard calculation for homes and factories
-            recommended_size_kw = round(monthly_consumption / 100, 1)
-        
-        # Calculate expected generation - typically 4-5 kWh per kW of solar in India
-        solar_multiplier = 4.2  # average daily sun hours
-        wind_multiplier = 3.8   # average daily wind generation factor
-        
-        # Agricultural solar systems often have better positioning (open fields)
-        if usage_type == "agriculture" and system_type == "solar":
-            solar_multiplier = 4.5  # slightly higher for agricultural deployments
-            
-        # Use different multipliers based on system type
-        multiplier = solar_multiplier if system_type == "solar" else wind_multiplier
-        
-        # Calculate estimated generation - adjusted by location factor
-        location_factor = 0.9 + (hash(location) % 20) / 100  # Pseudo-random factor based on location
-        estimated_generation_kwh = int(recommended_size_kw * multiplier * 30 * location_factor)
-        
-        # Calculate current monthly bill before solar
-        current_bill = monthly_consumption * tariff
-        
-        # Calculate new consumption after solar (remaining grid usage)
-        new_consumption = max(0, monthly_consumption - estimated_generation_kwh)
-        
-        # Calculate new bill after solar using slabs if provided
-        if slabs:
-            slab1_rate = slabs.get('slab1Rate', 4.0)
-            slab2_rate = slabs.get('slab2Rate', 6.0)
-            slab3_rate = slabs.get('slab3Rate', 8.0)
-            slab4_rate = slabs.get('slab4Rate', 10.0)
-            
-            # Calculate new bill with reduced consumption
-            if new_consumption <= 0:
-                new_bill = 0
-            else:
-                new_bill = 0
-                remaining = new_consumption
-                
-                # Slab 1: 0-100 kWh
-                units_in_slab1 = min(100, remaining)
-                new_bill += units_in_slab1 * slab1_rate
-                remaining -= units_in_slab1
-                
-                # Slab 2: 101-300 kWh
-                if remaining > 0:
-                    units_in_slab2 = min(200, remaining)
-                    new_bill += units_in_slab2 * slab2_rate
-                    remaining -= units_in_slab2
-                
-                # Slab 3: 301-500 kWh
-                if remaining > 0:
-                    units_in_slab3 = min(200, remaining)
-                    new_bill += units_in_slab3 * slab3_rate
-                    remaining -= units_in_slab3
-                
-                # Slab 4: >500 kWh
-                if remaining > 0:
-                    new_bill += remaining * slab4_rate
-        else:
-            # Simple calculation if no slabs
-            new_bill = new_consumption * tariff
-            
-        # Calculate monthly savings (difference between current and new bill)
-        monthly_savings = int(current_bill - new_bill)
-        
-        # Calculate system cost with different rates based on usage type
-        if usage_type == "agriculture":
-            # Agricultural solar systems often have government subsidies
-            # PM-KUSUM scheme provides subsidies for solar agricultural pumps
-            base_cost = 45000  # Lower cost per kW due to subsidies
-            subsidy_percentage = 0.30  # 30% subsidy
-            
-            # Calculate gross and net costs
-            gross_cost = int(recommended_size_kw * base_cost)
-            subsidy_amount = int(gross_cost * subsidy_percentage)
-            system_cost = gross_cost - subsidy_amount
-            
-            # Store subsidy info in details for display
-            subsidy_info = {
-                "available": True,
-                "percentage": subsidy_percentage * 100,
-                "amount": subsidy_amount,
-                "gross_cost": gross_cost
-            }
-        else:
-            # Standard costs for homes and factories
-            base_cost = 55000 if system_type == "solar" else 75000  # Cost per kW
-            system_cost = int(recommended_size_kw * base_cost)
-            subsidy_info = {"available": False}
-        
-        # Calculate payback period in years
-        annual_savings = monthly_savings * 12
-        payback_years = round(system_cost / annual_savings, 1) if annual_savings > 0 else 0
-        
-        # Calculate additional metrics
-        co2_reduction = estimated_generation_kwh * 0.82 / 1000  # Tons of CO2 saved per month (0.82 kg/kWh in India)
-        
-        # Generate a summary based on the data
-        gemini_summary = generate_summary(
-            location, 
-            usage_type, 
-            system_type, 
-            recommended_size_kw, 
-            estimated_generation_kwh, 
-            monthly_savings, 
-            system_cost, 
-            payback_years
+        site = parse_site(data)
+        timer.lap("parse")
+
+        # Identical requests are answered from the response cache
+        key = request_key(site, data) if response_cache is not None or result_store is not None else None
+        cache_key = None
+        if response_cache is not None and key is not None:
+            cache_key = key if fmt == JSON else f"{key}:{fmt}"
+        if cache_key is not None:
+            body = response_cache.get(cache_key)
+            timer.lap("cache")
+            if body is not None:
+                timer.record(site.usage_type)
+                return conditional_response(body, "hit", fmt)
+
+        # A follow-up to an earlier result only recomputes the stages whose inputs changed
+        previous = result_store.get(data.get('previousResultId')) if result_store is not None else None
+        evaluation = evaluate(site, previous.evaluation if previous is not None else None, timer)
+        rec = evaluation.recommendation
+
+        summary_args = (
+            rec.location,
+            rec.usage_type,
+            rec.system_type,
+            rec.recommended_size_kw,
+            rec.estimated_generation_kwh,
+            rec.monthly_savings,
+            rec.system_cost,
+            rec.payback_years
         )
-        
-        # Prepare response with detailed breakdown
-        response = {
-            "location": location,
-            "usage_type": usage_type,
-            "system_type": system_type,
-            "recommended_size_kw": recommended_size_kw,
-            "estimated_generation_kwh": estimated_generation_kwh,
-            "monthly_savings": monthly_savings,
-            "system_cost": system_cost,
-            "payback_years": payback_years,
-            "gemini_summary": gemini_summary,
-            "details": {
-                "current_consumption": monthly_consumption,
-                "remaining_consumption": new_consumption,
-                "current_bill": round(current_bill, 2),
-                "new_bill": round(new_bill, 2),
-                "effective_tariff": round(tariff, 2),
-                "co2_reduction": round(co2_reduction, 2),
-                "slabs_used": bool(slabs),
-                "subsidy_info": subsidy_info,
-            }
-        }
-        
-        return jsonify(response), 200
+
+        # In async mode, return the template summary now and let a worker ask the LLM
+        if data.get('asyncSummary'):
+            placeholder = template_summary(*summary_args)
+            job = None
+            if USE_LOCAL_LM and local_model is not None and llm_breaker.available():
+                job = get_summary_jobs().submit(summary_args, placeholder)
+                if job is None:
+                    print("Summary queue is full. Returning template-based summary.")
+
+            response = to_response(rec, placeholder)
+            response["summary_job_id"] = job.id if job is not None else None
+            response["summary_status"] = job.status if job is not None else "complete"
+            if result_store is not None:
+                response["result_id"] = result_store.put(evaluation, summary_args, None)
+            response = formatted_response(response, fmt)
+            response.headers["X-Recomputed"] = ",".join(evaluation.recomputed)
+            return response, 200
+
+        # Generate a summary based on the data, reusing the previous one if none of its inputs changed
+        if previous is not None and previous.summary is not None and previous.summary_args == summary_args:
+            gemini_summary = previous.summary
+            SUMMARY_SECONDS.observe(0.0, path="previous")
+        else:
+            gemini_summary = generate_summary(*summary_args)
+        timer.lap("summary")
+
+        response = to_response(rec, gemini_summary)
+        if result_store is not None:
+            response["result_id"] = result_store.put(evaluation, summary_args, gemini_summary, key)
+        body = pack(response) if fmt == MSGPACK else jsonify(response).get_data()
+        timer.lap("serialize")
+        if cache_key is not None:
+            response_cache.set(cache_key, body)
+        timer.record(site.usage_type)
+        response = conditional_response(body, "miss" if cache_key is not None else "bypass", fmt)
+        response.headers["X-Recomputed"] = ",".join(evaluation.recomputed)
+        return response
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+def conditional_response(body, cache_status, mimetype=JSON):
+    """Response with an ETag, or 304 Not Modified when the client's If-None-Match already has it"""
+    etag = body_etag(body)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, status=200, mimetype=mimetype)
+    response.set_etag(etag)
+    response.vary.add("Accept")
+    response.headers["X-Cache"] = cache_status
+    return response
+
+def formatted_response(document, mimetype, arrow=None):
+    """A response document as JSON or MessagePack, or as Arrow through the endpoint's `arrow` callable"""
+    if mimetype == ARROW:
+        response = Response(arrow(), mimetype=ARROW)
+    elif mimetype == MSGPACK:
+        response = Response(pack(document), mimetype=MSGPACK)
+    else:
+        response = jsonify(document)
+    response.vary.add("Accept")
+    return response
+
+def not_acceptable(offered):
+    """406 listing the formats an endpoint can return"""
+    formats = ", ".join(mimetype for mimetype in offered if available(mimetype))
+    return jsonify({"error": f"Not acceptable; this endpoint returns {formats}"}), 406
+
+@app.route('/api/recommend/batch', methods=['POST'])
+def recommend_batch_endpoint():
+    """Generate recommendations for many sites in one call (no LLM summaries)"""
+    try:
+        fmt = negotiate(request.accept_mimetypes, (JSON, MSGPACK, ARROW))
+        if fmt is None:
+            return not_acceptable((JSON, MSGPACK, ARROW))
+        data = request.json or {}
+        sites = data.get('sites')
+        if not isinstance(sites, list):
+            return jsonify({"error": "'sites' must be a list"}), 400
+
+        max_batch_size = int(os.environ.get('MAX_BATCH_SIZE', 100000))
+        if len(sites) > max_batch_size:
+            return jsonify({"error": f"Batch too large: {len(sites)} sites (max {max_batch_size})"}), 400
+
+        with_summaries = bool(data.get('summaries'))
+        max_summaries = int(os.environ.get('MAX_BATCH_SUMMARIES', 200))
+        if with_summaries and len(sites) > max_summaries:
+            return jsonify({"error": f"Summaries are limited to {max_summaries} sites per batch"}), 400
+
+        start_time = time.time()
+        results = recommend_batch(sites)
+        elapsed = time.time() - start_time
+        errors = sum(1 for r in results if "error" in r)
+        print(f"Scored batch of {len(sites)} sites in {elapsed:.3f} seconds ({errors} errors)")
+
+        if with_summaries:
+            attach_batch_summaries(results)
+
+        document = {"count": len(results), "errors": errors, "results": results}
+        return formatted_response(document, fmt, lambda: batch_arrow(sites, results)), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
+@app.route('/api/recommend/sweep', methods=['POST'])
+def recommend_sweep():
+    """Evaluate one site over a grid of what-if parameter values (no LLM summaries)"""
+    try:
+        fmt = negotiate(request.accept_mimetypes, (JSON, MSGPACK, ARROW))
+        if fmt is None:
+            return not_acceptable((JSON, MSGPACK, ARROW))
+        data = request.json or {}
+        site = data.get('site')
+        if not isinstance(site, dict):
+            return jsonify({"error": "'site' must be an object"}), 400
+
+        start_time = time.time()
+        result = sweep(site, data.get('parameters'), with_irr=bool(data.get('irr')))
+        elapsed = time.time() - start_time
+        print(f"Swept {result['points']} scenarios in {elapsed:.3f} seconds")
+        return formatted_response(result, fmt, lambda: sweep_arrow(result)), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/portfolio/allocate', methods=['POST'])
+def portfolio_allocate():
+    """Choose installs and sizes across many sites under a shared budget and per-region kW caps"""
+    try:
+        data = request.json or {}
+        sites = data.get('sites')
+        if not isinstance(sites, list):
+            return jsonify({"error": "'sites' must be a list"}), 400
+
+        max_batch_size = int(os.environ.get('MAX_BATCH_SIZE', 100000))
+        if len(sites) > max_batch_size:
+            return jsonify({"error": f"Portfolio too large: {len(sites)} sites (max {max_batch_size})"}), 400
+
+        start_time = time.time()
+        result = allocate(sites, data.get('budget'), parse_caps(data.get('regionCaps')))
+        elapsed = time.time() - start_time
+        print(f"Allocated portfolio of {len(sites)} sites in {elapsed:.3f} seconds ({result['count']} installs)")
+        return jsonify(result), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/tariffs', methods=['GET'])
+def get_tariffs():
+    """List the named tariffs available to /api/recommend via tariffId"""
+    return jsonify({"tariffs": list_tariffs()}), 200
+
+@app.route('/api/tariffs', methods=['POST'])
+def create_tariff():
+    """Register (or replace) a named tariff for later requests"""
+    try:
+        data = request.json or {}
+        name = data.get('name')
+        if not name or not isinstance(name, str):
+            return jsonify({"error": "'name' is required"}), 400
+        tariff = register_tariff(name, data)
+        return jsonify(dict(tariff.to_dict(), name=name)), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/geocode', methods=['GET'])
+def geocode():
+    """Resolve a place name or pincode offline, with prefix suggestions for autocomplete"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "'q' is required"}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+        match = resolve_place(query)
+        suggestions = get_gazetteer().search(query, limit=limit)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        "query": query,
+        "match": match.to_dict() if match is not None else None,
+        "suggestions": [place.to_dict() for place in suggestions],
+    }), 200
+
+@app.route('/api/summary/<job_id>', methods=['GET'])
+def get_summary(job_id):
+    """Fetch an asynchronous summary; ?wait=<seconds> long-polls until it is ready"""
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0), 30)
+    except ValueError:
+        return jsonify({"error": "'wait' must be a number of seconds"}), 400
+
+    # With a shared store, a job submitted by another worker process can be found here too
+    if summary_jobs is not None or summary_job_store is not None:
+        job = get_summary_jobs().get(job_id, wait=wait)
+    else:
+        job = None
+    if job is None:
+        return jsonify({"error": "Unknown or expired summary job"}), 404
+    return jsonify(job.to_dict()), 200
+
+@app.route('/api/recommend/stream', methods=['POST'])
+def recommend_stream():
+    """Stream a recommendation as server-sent events: the numbers first, then the summary as it is generated"""
+    try:
+        rec = compute(parse_site(request.json))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+    summary_args = (
+        rec.location,
+        rec.usage_type,
+        rec.system_type,
+        rec.recommended_size_kw,
+        rec.estimated_generation_kwh,
+        rec.monthly_savings,
+        rec.system_cost,
+        rec.payback_years
+    )
+
+    def events():
+        yield sse_event("recommendation", to_response(rec))
+
+        summary = None
+        if USE_LOCAL_LM and local_model is not None:
+            data = summary_inputs(*summary_args)
+            summary = summary_cache.get(data)
+            if summary is not None:
+                yield sse_event("token", {"text": summary})
+            elif llm_breaker.allow_request():
+                parts = []
+                start_time = time.time()
+                first_token = None
+                recorded = False
+                try:
+                    for text in local_model.stream_energy_recommendation(data, timeout=LLM_DEADLINE):
+                        if first_token is None:
+                            first_token = time.time() - start_time
+                            print(f"First token from local LM after {first_token:.2f} seconds")
+                        parts.append(text)
+                        yield sse_event("token", {"text": text})
+                    summary = "".join(parts).strip()
+                    summary_cache.set(data, summary)
+                except Exception as e:
+                    print(f"Error streaming from local LM: {e}. Falling back to template-based summary.")
+                    llm_breaker.record_failure(str(e))
+                    recorded = True
+                    summary = None
+                finally:
+                    # Time to first token is what the latency budget applies to when streaming,
+                    # including when the client disconnects mid-stream
+                    if not recorded:
+                        if first_token is not None:
+                            llm_breaker.record_success(first_token)
+                        else:
+                            llm_breaker.record_failure("stream ended without output")
+
+        # The "done" event always carries the final summary, replacing any partial text
+        if summary is None:
+            summary = template_summary(*summary_args)
+            yield sse_event("token", {"text": summary})
+        yield sse_event("done", {"summary": summary})
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def attach_batch_summaries(results):
+    """Add a summary to every valid batch row, asking the local LM concurrently for uncached ones"""
+    use_llm = USE_LOCAL_LM and local_model is not None
+    pending = []
+    for row in results:
+        if "error" in row:
+            continue
+        args = (
+            row["location"],
+            row["usage_type"],
+            row["system_type"],
+            row["recommended_size_kw"],
+            row["estimated_generation_kwh"],
+            row["monthly_savings"],
+            row["system_cost"],
+            row["payback_years"]
+        )
+        cached = summary_cache.get(summary_inputs(*args)) if use_llm else None
+        if cached is not None:
+            row["gemini_summary"] = cached
+        else:
+            pending.append((row, args))
+
+    if pending and use_llm and llm_breaker.allow_request():
+        start_time = time.time()
+        generated = local_model.generate_batch([summary_inputs(*args) for _, args in pending], timeout=LLM_DEADLINE)
+        print(f"Generated {len(pending)} batch summaries using local LM in {time.time() - start_time:.2f} seconds")
+        for (row, args), item in zip(pending, generated):
+            row["summary_elapsed"] = item["elapsed"]
+            if item["summary"] is not None:
+                llm_breaker.record_success(item["elapsed"])
+                summary_cache.set(summary_inputs(*args), item["summary"])
+                row["gemini_summary"] = item["summary"]
+            else:
+                llm_breaker.record_failure(item["error"])
+                row["summary_error"] = item["error"]
+
+    # Template summaries for rows the LM could not handle
+    for row, args in pending:
+        if "gemini_summary" not in row:
+            row["gemini_summary"] = template_summary(*args)
+
+def sse_event(event, payload):
+    """Format one server-sent event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+def summary_inputs(location, usage_type, system_type, size, generation, savings, cost, payback):
+    """Fields of a recommendation that the summary is generated from"""
+    return {
+        "location": location,
+        "usage_type": usage_type,
+        "system_type": system_type,
+        "recommended_size_kw": size,
+        "estimated_generation_kwh": generation,
+        "monthly_savings": savings,
+        "system_cost": cost,
+        "payback_years": payback
+    }
+
 def generate_summary(location, usage_type, system_type, size, generation, savings, cost, payback):
     """Generate a human-readable summary of the recommendation"""
-    
+    start_time = time.perf_counter()
+
     # Check if we should use local LM
     if USE_LOCAL_LM and local_model is not None:
-        try:
-            # Prepare the data for the local model
-            data = {
-                "location": location,
-                "usage_type": usage_type,  # This will now include 'agriculture' as a possibility
-                "system_type": system_type,
-                "recommended_size_kw": size,
-                "estimated_generation_kwh": generation,
-                "monthly_savings": savings,
-                "system_cost": cost,
-                "payback_years": payback
-            }
-            
-            # Get summary from local model
-            start_time = time.time()
-            summary = local_model.generate_energy_recommendation(data)
-            elapsed = time.time() - start_time
-            print(f"Generated recommendation using local LM in {elapsed:.2f} seconds")
-            
+        # Prepare the data for the local model
+        data = summary_inputs(location, usage_type, system_type, size, generation, savings, cost, payback)
+
+        # Reuse a previous summary for the same inputs
+        summary = summary_cache.get(data)
+        if summary is not None:
+            SUMMARY_SECONDS.observe(time.perf_counter() - start_time, path="cache")
             return summary
-        except Exception as e:
-            print(f"Error using local LM: {e}. Falling back to template-based summary.")
-            # Fall back to template-based summary
-            pass
-    
-    # Template-based summary generation as fallback
-    # Collection of phrases to make the summary more natural
-    intros = [
-        f"Based on your {usage_type} in {location}, we recommend a {size} kW {system_type} energy system.",
-        f"For your {usage_type} located in {location}, a {size} kW {system_type} system would be optimal.",
-        f"Our analysis suggests that a {size} kW {system_type} system is ideal for your {usage_type} in {location}."
-    ]
-    
-    generation_phrases = [
-        f"This system will generate approximately {generation} kWh per month,",
-        f"You can expect to generate around {generation} kWh monthly,",
-        f"With average {location} conditions, you'll produce about {generation} kWh each month,"
-    ]
-    
-    savings_phrases = [
-        f"saving you ₹{savings:,} on your monthly electricity bill.",
-        f"which translates to monthly savings of ₹{savings:,}.",
-        f"reducing your electricity expenses by approximately ₹{savings:,} per month."
-    ]
-    
-    investment_phrases = [
-        f"The total investment of ₹{cost:,} would be recovered in {payback} years, making it a sound financial decision.",
-        f"With a total cost of ₹{cost:,}, your investment will pay for itself in just {payback} years.",
-        f"The system costs approximately ₹{cost:,} and offers a payback period of {payback} years."
-    ]
-    
-    benefits = []
-    if usage_type == "agriculture":
-        if system_type == "solar":
-            benefits = [
-                "Solar pumps for irrigation eliminate diesel costs and reduce dependency on grid power.",
-                "PM-KUSUM scheme offers substantial subsidies for agricultural solar installations.",
-                "Solar-powered farming improves crop yield through consistent and reliable irrigation.",
-                "Excess generation can be sold back to the grid for additional income."
-            ]
-        else:
-            benefits = [
-                "Renewable energy for agricultural operations reduces operational costs significantly.",
-                "Government programs offer special incentives for farm-based renewable energy.",
-                "Clean energy enhances sustainability credentials for farm products."
-            ]
-    elif system_type == "solar":
-        benefits = [
-            "This renewable energy solution will reduce your carbon footprint significantly.",
-            "In addition to financial benefits, you'll contribute to environmental sustainability.",
-            "Solar energy is maintenance-free and will provide clean electricity for 25+ years."
-        ]
-    else:  # wind
-        benefits = [
-            "Wind energy is particularly effective for industrial applications with high consumption.",
-            "This wind system will operate day and night, complementing your energy needs.",
-            "Industrial wind solutions provide consistent power with minimal maintenance."
-        ]
-    
-    # Randomly select one phrase from each category
-    intro = random.choice(intros)
-    generation_phrase = random.choice(generation_phrases)
-    savings_phrase = random.choice(savings_phrases)
-    investment_phrase = random.choice(investment_phrases)
-    benefit = random.choice(benefits)
-    
-    # Combine all parts into a coherent summary
-    summary = f"{intro} {generation_phrase} {savings_phrase} {investment_phrase} {benefit}"
-    
+
+        # Skip the model entirely while the circuit breaker is open
+        if llm_breaker.allow_request():
+            llm_start = time.perf_counter()
+            try:
+                # Get summary from local model, waiting no longer than the deadline
+                summary = local_model.generate_energy_recommendation(data, timeout=LLM_DEADLINE)
+            except Exception as e:
+                llm_breaker.record_failure(str(e))
+                print(f"Error using local LM: {e}. Falling back to template-based summary.")
+            else:
+                elapsed = time.perf_counter() - llm_start
+                llm_breaker.record_success(elapsed)
+                print(f"Generated recommendation using local LM in {elapsed:.2f} seconds")
+                summary_cache.set(data, summary)
+                SUMMARY_SECONDS.observe(time.perf_counter() - start_time, path="llm")
+                return summary
+
+    summary = template_summary(location, usage_type, system_type, size, generation, savings, cost, payback)
+    SUMMARY_SECONDS.observe(time.perf_counter() - start_time, path="template")
     return summary
 
+def template_summary(location, usage_type, system_type, size, generation, savings, cost, payback):
+    """Template-based summary generation, used as the fallback and as the async placeholder"""
+    return render_summary(location, usage_type, system_type, size, generation, savings, cost, payback)
+
+def create_app():
+    """Application factory for WSGI servers, e.g. `gunicorn -c gunicorn.conf.py wsgi:app`"""
+    preload()
+    atexit.register(shutdown)
+    return app
+
 if __name__ == '__main__':
-    # Get port from environment variable or use default
+    # Development server; see gunicorn.conf.py for production serving
     port = int(os.environ.get('PORT', 5000))
-    app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
+    create_app()
+    start_background()
+    app.run(debug=True, host='0.0.0.0', port=port)
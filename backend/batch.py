@@ -0,0 +1,292 @@
+"""
+Vectorized recommendations for many sites at once.
+
+`recommend_batch()` parses every row, then sizes, bills, costs and projects the
+valid ones as NumPy arrays in one pass, giving each row exactly what
+`compute()` would give the same site. Rows that fail validation carry an error
+instead of failing the batch. The array helpers here (tariff grouping, resource
+lookup, exact rounding) are shared with the sweep and allocation modules, and
+`to_row()` flattens a result for the bulk scoring CLI and Arrow responses.
+"""
+
+from typing import Dict, Any, List
+
+import numpy as np
+
+from calculator import (
+    parse_site, compute, to_response, system_type_for, DEFAULT_TARIFF, PUMP_REQUIREMENT_KW,
+    SOLAR_MULTIPLIER, AGRICULTURE_SOLAR_MULTIPLIER, WIND_MULTIPLIER, SOLAR_COST_PER_KW, WIND_COST_PER_KW,
+    AGRICULTURE_COST_PER_KW, AGRICULTURE_SUBSIDY, CO2_KG_PER_KWH,
+)
+from finance import annual_om, degraded, finance_info, project
+from simulation import simulate
+from uncertainty import run_many
+from geo_resource import get_resource_grid, solar_factor, wind_factor_array, REFERENCE_GHI, REFERENCE_WIND_SPEED
+
+
+# Columns of a flattened result row (bulk_score.py files, Arrow responses) and their Arrow types
+COLUMNS = [
+    ("row", "int64"), ("id", "string"), ("location", "string"), ("usage_type", "string"),
+    ("system_type", "string"), ("recommended_size_kw", "float64"), ("estimated_generation_kwh", "int64"),
+    ("monthly_savings", "int64"), ("system_cost", "int64"), ("payback_years", "float64"),
+    ("current_bill", "float64"), ("new_bill", "float64"), ("effective_tariff", "float64"),
+    ("co2_reduction", "float64"), ("latitude", "float64"), ("longitude", "float64"), ("npv", "float64"),
+    ("irr", "float64"), ("discounted_payback_years", "float64"), ("lcoe", "float64"), ("error", "string"),
+]
+
+
+def round_exact(values, digits: int = 1) -> np.ndarray:
+    """round(value, digits) exactly as Python computes it for single sites, for a whole array.
+
+    np.round() scales by 10 ** digits before rounding, so near a tie (2.25, 1.005)
+    the scaled value can fall on the other side and disagree with compute().
+    Only those near-ties are handed to Python's round(); the rest are unambiguous.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    scale = 10.0 ** digits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    with np.errstate(invalid='ignore'):  # inf - inf for unbounded values, which are never ties
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6 + np.abs(scaled) * 1e-12
+    if near_tie.any():
+        rows = np.flatnonzero(near_tie)
+        rounded.flat[rows] = [round(value, digits) for value in values.ravel()[rows].tolist()]
+    return rounded
+
+
+def group_by_plan(plans):
+    """Row indices for each distinct tariff plan (rows without a plan are skipped)"""
+    groups = {}
+    for j, plan in enumerate(plans):
+        if plan is not None:
+            groups.setdefault(id(plan), (plan, []))[1].append(j)
+    return [(plan, np.array(rows)) for plan, rows in groups.values()]
+
+
+def plan_bills(groups, units):
+    """Vectorized bills for rows with a tariff plan, evaluated once per distinct plan"""
+    bills = np.zeros(units.shape)
+    for plan, rows in groups:
+        bills[rows] = plan.bill_array(units[rows])
+    return bills
+
+
+def effective_tariffs(consumption, tariff, slabs_used, groups):
+    """Effective ₹/kWh per row: the tiered tariff's average rate where one applies, else the flat tariff"""
+    plan_bill = plan_bills(groups, consumption)
+    from_plan = slabs_used & (consumption > 0)
+    tariff = np.where(from_plan, plan_bill / np.where(consumption > 0, consumption, 1.0), tariff)
+    return np.where(tariff > 0, tariff, DEFAULT_TARIFF)
+
+
+def resource_arrays(latitude, longitude):
+    """GHI and wind speed per row; rows without coordinates (NaN) use the reference resource"""
+    has_coords = ~np.isnan(latitude)
+    ghi = np.full(len(latitude), REFERENCE_GHI)
+    wind_speed = np.full(len(latitude), REFERENCE_WIND_SPEED)
+    if has_coords.any():
+        ghi[has_coords], wind_speed[has_coords] = get_resource_grid().lookup_array(latitude[has_coords],
+                                                                                   longitude[has_coords])
+    return ghi, wind_speed
+
+
+@np.errstate(over='ignore', invalid='ignore')  # overflowing rows are reported as errors below
+def recommend_batch(sites: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Compute recommendations for many sites at once using vectorized array operations.
+
+    Each site uses the same fields as /api/recommend. Results are returned in input
+    order; rows that fail validation, or whose numbers overflow, carry an "error"
+    instead of failing the batch.
+    """
+    results: List[Dict[str, Any]] = [None] * len(sites)
+
+    # Parse rows up front, collecting per-row errors
+    valid_idx = []
+    locations, usage_types, consumptions, tariffs, plans, latitudes, longitudes, places = [], [], [], [], [], [], [], []
+    simulated, financed, uncertainty = [], [], []
+    for i, site in enumerate(sites):
+        try:
+            parsed = parse_site(site)
+        except ValueError as e:
+            results[i] = {"index": i, "error": str(e)}
+            continue
+        if parsed.optimize is not None:
+            # The optimizer searches per site, so these rows take the single-site path
+            try:
+                results[i] = dict({"index": i}, **to_response(compute(parsed)))
+            except (ValueError, OverflowError) as e:
+                results[i] = {"index": i, "error": str(e)}
+            continue
+        valid_idx.append(i)
+        locations.append(parsed.location)
+        usage_types.append(parsed.usage_type)
+        consumptions.append(parsed.monthly_consumption)
+        tariffs.append(parsed.tariff)
+        plans.append(parsed.tariff_plan)
+        latitudes.append(parsed.latitude if parsed.latitude is not None else np.nan)
+        longitudes.append(parsed.longitude if parsed.longitude is not None else np.nan)
+        places.append(parsed.place)
+        simulated.append(parsed.simulate)
+        financed.append(parsed.finance)
+        uncertainty.append(parsed.uncertainty)
+
+    if not valid_idx:
+        return results
+
+    consumption = np.array(consumptions, dtype=np.float64)
+    tariff = np.array(tariffs, dtype=np.float64)
+    slabs_used = np.array([plan is not None for plan in plans], dtype=bool)
+    groups = group_by_plan(plans)
+    usage = np.array(usage_types, dtype=object)
+    is_agri = usage == "agriculture"
+    is_wind = np.array([system_type_for(u) == "wind" for u in usage_types], dtype=bool)
+
+    # Effective tariff from the tiered tariff where provided and consumption is positive
+    tariff = effective_tariffs(consumption, tariff, slabs_used, groups)
+
+    # System sizing
+    recommended_size_kw = round_exact(consumption / 100)
+    recommended_size_kw = np.where(is_agri, np.maximum(recommended_size_kw, PUMP_REQUIREMENT_KW), recommended_size_kw)
+
+    # Resource at each site; rows without coordinates use the reference resource
+    latitude = np.array(latitudes, dtype=np.float64)
+    longitude = np.array(longitudes, dtype=np.float64)
+    has_coords = ~np.isnan(latitude)
+    ghi, wind_speed = resource_arrays(latitude, longitude)
+    factors = np.where(is_wind, wind_factor_array(wind_speed), solar_factor(ghi))
+
+    # Generation with the same multipliers as the single-site endpoint
+    multiplier = np.where(is_wind, WIND_MULTIPLIER, np.where(is_agri, AGRICULTURE_SOLAR_MULTIPLIER, SOLAR_MULTIPLIER))
+    raw_generation = recommended_size_kw * multiplier * 30 * factors
+    estimated_generation_kwh = np.trunc(raw_generation)
+
+    # Bills before and after
+    current_bill = consumption * tariff
+    new_consumption = np.maximum(0, consumption - estimated_generation_kwh)
+    new_bill = np.where(slabs_used, plan_bills(groups, new_consumption), new_consumption * tariff)
+    monthly_savings = np.trunc(current_bill - new_bill)
+
+    # Costing, including the PM-KUSUM subsidy for agriculture
+    base_cost = np.where(is_agri, AGRICULTURE_COST_PER_KW, np.where(is_wind, WIND_COST_PER_KW, SOLAR_COST_PER_KW))
+    gross_cost = np.trunc(recommended_size_kw * base_cost)
+    subsidy_amount = np.where(is_agri, np.trunc(gross_cost * AGRICULTURE_SUBSIDY), 0)
+    system_cost = gross_cost - subsidy_amount
+
+    annual_savings = monthly_savings * 12
+    pays_back = annual_savings > 0
+    payback_years = np.where(pays_back, round_exact(system_cost / np.where(pays_back, annual_savings, 1)), 0)
+    co2_reduction = estimated_generation_kwh * CO2_KG_PER_KWH / 1000
+
+    # Lifetime cashflows for the rows that ask for them, each re-billed for every year of degraded generation
+    om = annual_om(np.where(is_wind, 0, gross_cost), np.where(is_wind, gross_cost, 0))
+    financed = np.array(financed, dtype=bool)
+    projection = None
+    if financed.any():
+        rows = np.flatnonzero(financed)
+        generation_by_year = degraded(estimated_generation_kwh[rows])
+        units = np.maximum(0.0, consumption[rows, None] - generation_by_year)
+        new_bills = np.where(slabs_used[rows, None], plan_bills(group_by_plan([plans[j] for j in rows]), units),
+                             units * tariff[rows, None])
+        projection = project(current_bill[rows, None] - new_bills, generation_by_year, gross_cost[rows],
+                             subsidy_amount[rows], om[rows])
+    projection_row = np.cumsum(financed) - 1  # row of each site in the projection
+
+    # Inputs too large for the arithmetic (e.g. 1e308 kWh) overflow to inf or NaN; those rows fail on their own
+    in_range = np.isfinite(np.stack([current_bill, new_bill, estimated_generation_kwh, monthly_savings, system_cost,
+                                     payback_years])).all(axis=0)
+
+    # Assemble rows back in input order
+    uncertainty_jobs = []
+    for j, i in enumerate(valid_idx):
+        if not in_range[j]:
+            results[i] = {"index": i, "error": "inputs are too large to compute a recommendation"}
+            continue
+        if is_agri[j]:
+            subsidy_info = {
+                "available": True,
+                "percentage": AGRICULTURE_SUBSIDY * 100,
+                "amount": int(subsidy_amount[j]),
+                "gross_cost": int(gross_cost[j])
+            }
+        else:
+            subsidy_info = {"available": False}
+
+        results[i] = {
+            "index": i,
+            "location": locations[j],
+            "usage_type": usage_types[j],
+            "system_type": system_type_for(usage_types[j]),
+            "recommended_size_kw": float(recommended_size_kw[j]),
+            "estimated_generation_kwh": int(estimated_generation_kwh[j]),
+            "monthly_savings": int(monthly_savings[j]),
+            "system_cost": int(system_cost[j]),
+            "payback_years": float(payback_years[j]),
+            "details": {
+                "current_consumption": float(consumption[j]),
+                "remaining_consumption": float(new_consumption[j]),
+                "current_bill": round(float(current_bill[j]), 2),
+                "new_bill": round(float(new_bill[j]), 2),
+                "effective_tariff": round(float(tariff[j]), 2),
+                "co2_reduction": round(float(co2_reduction[j]), 2),
+                "slabs_used": bool(slabs_used[j]),
+                "subsidy_info": subsidy_info,
+            }
+        }
+        if plans[j] is not None and plans[j].name is not None:
+            results[i]["details"]["tariff_id"] = plans[j].name
+        results[i]["details"]["resource"] = {
+            "latitude": float(latitude[j]) if has_coords[j] else None,
+            "longitude": float(longitude[j]) if has_coords[j] else None,
+            "ghi_kwh_m2_day": round(float(ghi[j]), 2),
+            "wind_speed_ms": round(float(wind_speed[j]), 2),
+            "location_factor": round(float(factors[j]), 3),
+            "source": "grid" if has_coords[j] else "default",
+        }
+        if places[j] is not None:
+            results[i]["details"]["resource"]["place"] = places[j]
+        if financed[j]:
+            results[i]["details"]["finance"] = finance_info(projection, projection_row[j])
+        solar_generation = 0.0 if is_wind[j] else float(raw_generation[j])
+        wind_generation = float(raw_generation[j]) if is_wind[j] else 0.0
+        if simulated[j]:
+            results[i]["details"]["simulation"] = simulate(
+                usage_types[j], solar_generation / 30, wind_generation / 30, float(consumption[j]),
+                float(tariff[j]), plans[j], latitudes[j] if has_coords[j] else None, float(wind_speed[j]),
+                float(system_cost[j]),
+            )
+        if uncertainty[j] is not None:
+            uncertainty_jobs.append((i, dict(
+                monthly_consumption=float(consumption[j]), tariff=float(tariff[j]), plan=plans[j],
+                solar_generation=solar_generation, wind_generation=wind_generation,
+                gross_cost=float(gross_cost[j]), subsidy=float(subsidy_amount[j]), om=float(om[j]), **uncertainty[j],
+            )))
+
+    # Monte Carlo runs are the expensive part; large portfolios are spread over processes
+    if uncertainty_jobs:
+        bands = run_many([job for _, job in uncertainty_jobs])
+        for (i, _), band in zip(uncertainty_jobs, bands):
+            results[i]["details"]["uncertainty"] = band
+
+    return results
+
+
+def to_row(row: int, record_id, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Flatten a recommend_batch() result into a COLUMNS row; `row` is its input position"""
+    out = {name: None for name, _ in COLUMNS}
+    out["row"] = row
+    out["id"] = None if record_id is None else str(record_id)
+    if "error" in result:
+        out["error"] = result["error"]
+        return out
+    for name in ("location", "usage_type", "system_type", "recommended_size_kw", "estimated_generation_kwh",
+                 "monthly_savings", "system_cost", "payback_years"):
+        out[name] = result[name]
+    details = result["details"]
+    for name in ("current_bill", "new_bill", "effective_tariff", "co2_reduction"):
+        out[name] = details[name]
+    out["latitude"] = details["resource"]["latitude"]
+    out["longitude"] = details["resource"]["longitude"]
+    if "finance" in details:
+        for name in ("npv", "irr", "discounted_payback_years", "lcoe"):
+            out[name] = details["finance"][name]
+    return out
@@ -0,0 +1,90 @@
+"""
+In-process throughput of the recommendation math, with no HTTP, cache or model involved.
+
+    python benchmarks/bench_core.py
+    python benchmarks/bench_core.py --save core.json
+    python benchmarks/bench_core.py --baseline core.json --tolerance 0.2
+
+Each benchmark reports the best and median time per call over several runs;
+comparing with a baseline uses the best time, which is the least
+sensitive to other load on the machine, and exits 1 on a regression.
+"""
+
+import argparse
+import json
+import sys
+
+from common import Results, add_output_args, finish, sample_sites, time_call
+
+import numpy as np
+
+from calculator import parse_site, compute, to_response
+from batch import recommend_batch
+from finance import project
+from allocation import allocate
+from summary_templates import render_summary
+
+
+def per_row(result, rows: int):
+    """Add rows/s to a time_call() result"""
+    result["rows_per_s"] = round(rows / (result["median_ms"] / 1000)) if result["median_ms"] else None
+    return result
+
+
+def run(quick: bool) -> Results:
+    results = Results("core")
+    n = 200 if quick else 2000
+    repeat = 3 if quick else 7
+    sites = sample_sites(n)
+    parsed = [parse_site(site) for site in sites]
+
+    results.add("parse_site", per_row(time_call(lambda: [parse_site(s) for s in sites], repeat), n))
+    results.add("compute", per_row(time_call(lambda: [compute(s) for s in parsed], repeat), n))
+    results.add("compute+to_response+json", per_row(time_call(
+        lambda: [json.dumps(to_response(compute(s))) for s in parsed], repeat), n))
+
+    financed = [parse_site(dict(site, finance=True)) for site in sites]
+    results.add("compute(finance)", per_row(time_call(lambda: [compute(s) for s in financed], repeat), n))
+
+    simulated = [parse_site(site) for site in sample_sites(n // 20 or 1, seed=1, simulate=True)]
+    results.add("compute(simulate)", per_row(time_call(lambda: [compute(s) for s in simulated], repeat),
+                                             len(simulated)))
+
+    optimized = [parse_site(dict(site, optimize="npv")) for site in sites[:n // 20 or 1]]
+    results.add("compute(optimize)", per_row(time_call(lambda: [compute(s) for s in optimized], repeat),
+                                             len(optimized)))
+
+    unc = parse_site(dict(sites[0], uncertainty={"samples": 2000, "seed": 1}))
+    results.add("compute(uncertainty 2000)", time_call(lambda: compute(unc), repeat))
+
+    batch_rows = 2000 if quick else 20000
+    batch_sites = sample_sites(batch_rows, seed=2)
+    results.add("recommend_batch", per_row(time_call(lambda: recommend_batch(batch_sites), repeat), batch_rows))
+
+    rng = np.random.default_rng(0)
+    savings = rng.uniform(500, 50000, (batch_rows, 25))
+    generation = rng.uniform(100, 10000, (batch_rows, 25))
+    cost = rng.uniform(1e5, 5e6, batch_rows)
+    results.add("finance.project", per_row(time_call(
+        lambda: project(savings, generation, cost, 0.0, cost * 0.01), repeat), batch_rows))
+
+    alloc_rows = 2000 if quick else 20000
+    alloc_sites = [dict(site, region=f"R{i % 8}") for i, site in enumerate(sample_sites(alloc_rows, seed=3))]
+    caps = {f"R{i}": 5000.0 for i in range(8)}
+    results.add("allocate", per_row(time_call(lambda: allocate(alloc_sites, 5e8, caps), repeat), alloc_rows))
+
+    summary_args = [("Pune", "home", "Solar", 3.5, 420, 3200, 192500, 5.0 + i / 100) for i in range(n)]
+    results.add("render_summary", per_row(time_call(lambda: [render_summary(*a) for a in summary_args], repeat), n))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recommendation math in-process")
+    parser.add_argument("--quick", action="store_true", help="smaller inputs and fewer runs")
+    add_output_args(parser, "best_ms")
+    args = parser.parse_args(argv)
+    return finish(run(args.quick), args, "best_ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
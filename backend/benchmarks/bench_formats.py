@@ -0,0 +1,79 @@
+"""
+Size and encoding time of bulk responses in each format, plain and compressed.
+
+    python benchmarks/bench_formats.py
+    python benchmarks/bench_formats.py --rows 100000 --save formats.json
+
+Encodes one /api/recommend/batch response and one sweep response as JSON
+(standard library and the app's provider), MessagePack and Arrow, then
+compresses each body with gzip and Brotli at the app's settings. Formats whose
+library is not installed are skipped.
+"""
+
+import argparse
+import json
+import sys
+
+from common import Results, add_output_args, finish, sample_sites, time_call
+
+from flask import Flask
+
+from batch import recommend_batch
+from compression import compress, brotli
+from response_format import json_provider, pack, batch_arrow, sweep_arrow, msgpack, pa
+from sweep import sweep
+
+
+def measure(results: Results, name: str, encode, repeat: int):
+    """Time one encoder, then the compressors on its output"""
+    body = encode()
+    result = dict(time_call(encode, repeat), bytes=len(body))
+    for encoding in ("gzip", "br") if brotli is not None else ("gzip",):
+        compressed = compress(body, encoding)
+        result[f"{encoding}_bytes"] = len(compressed)
+        result[f"{encoding}_ms"] = time_call(lambda: compress(body, encoding), 1, warmup=0)["best_ms"]
+    results.add(name, result)
+
+
+def run(rows: int, repeat: int) -> Results:
+    results = Results("formats")
+    provider = json_provider(Flask(__name__))
+
+    sites = sample_sites(rows)
+    batch = recommend_batch(sites)
+    document = {"count": len(batch), "errors": sum(1 for row in batch if "error" in row), "results": batch}
+    encoders = [
+        ("json (stdlib)", lambda: json.dumps(document, sort_keys=True, separators=(",", ":")).encode("utf-8")),
+        (f"json ({type(provider).__name__})", lambda: provider.dumps(document).encode("utf-8")),
+    ]
+    if msgpack is not None:
+        encoders.append(("msgpack", lambda: pack(document)))
+    if pa is not None:
+        encoders.append(("arrow", lambda: batch_arrow(sites, batch)))
+    for name, encode in encoders:
+        measure(results, f"batch {rows} {name}", encode, repeat)
+
+    grid = sweep({"location": "Pune", "usageType": "home", "monthlyConsumption": 350, "tariff": 8},
+                 {"monthlyConsumption": {"start": 100, "stop": 2000, "step": 1}, "tariff": [6, 7, 8, 9],
+                  "budgetCap": [50000, 100000, 1000000]})
+    encoders = [(f"json ({type(provider).__name__})", lambda: provider.dumps(grid).encode("utf-8"))]
+    if msgpack is not None:
+        encoders.append(("msgpack", lambda: pack(grid)))
+    if pa is not None:
+        encoders.append(("arrow", lambda: sweep_arrow(grid)))
+    for name, encode in encoders:
+        measure(results, f"sweep {grid['points']} {name}", encode, repeat)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark response formats and compression")
+    parser.add_argument("--rows", type=int, default=20000, help="sites in the batch response (default 20000)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per encoder (default 5)")
+    add_output_args(parser, "best_ms")
+    args = parser.parse_args(argv)
+    return finish(run(args.rows, args.repeat), args, "best_ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Summary latency against the LM Studio stub, and the template fallback for comparison.
+
+    python benchmarks/bench_summary.py
+    python benchmarks/bench_summary.py --delay 0.5 --tokens-per-second 25 --concurrency 8
+
+Measures, through the real `LocalLM` client: single completions, streamed
+completions (time to first chunk and to the end), and `generate_batch()`
+across many sites. The stub's delay and token rate set the floor, so the
+numbers show the client's own overhead and how well it overlaps requests.
+Point --url at a running LM Studio to measure a real model instead.
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import Results, add_output_args, finish, latency_stats
+from lm_stub import start_stub
+
+from local_lm import LocalLM
+from summary_templates import render_summary
+
+
+def summary_args(i: int):
+    """Distinct summary inputs, so no two prompts are identical"""
+    return ("Pune", ("home", "factory", "agriculture")[i % 3], "Solar", 3.5 + i / 10, 420 + i, 3200 + i, 192500, 5.0)
+
+
+def summary_inputs(i: int):
+    """summary_args() as the fields LocalLM builds its prompt from"""
+    location, usage_type, system_type, size, generation, savings, cost, payback = summary_args(i)
+    return {
+        "location": location, "usage_type": usage_type, "system_type": system_type, "recommended_size_kw": size,
+        "estimated_generation_kwh": generation, "monthly_savings": savings, "system_cost": cost,
+        "payback_years": payback,
+    }
+
+
+def stream_once(model: LocalLM, data):
+    """(time to first chunk, total time) of one streamed completion"""
+    start = time.perf_counter()
+    first = None
+    for _ in model.stream_energy_recommendation(data):
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+
+def run(model: LocalLM, requests: int, concurrency: int) -> Results:
+    results = Results("summary")
+    tokens = []
+    prompts = []
+
+    def on_usage(prompt_tokens, completion_tokens, elapsed, mode):
+        prompts.append(prompt_tokens)
+        tokens.append(completion_tokens / elapsed if elapsed else 0)
+
+    model.on_usage = on_usage
+
+    def complete(i):
+        start = time.perf_counter()
+        model.generate_energy_recommendation(summary_inputs(i))
+        return time.perf_counter() - start
+
+    latencies = [complete(i) for i in range(requests)]
+    results.add("completion (serial)", latency_stats(latencies))
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(complete, range(requests, requests * 2)))
+    wall = time.perf_counter() - started
+    results.add(f"completion (c={concurrency})", dict(latency_stats(latencies),
+                                                      requests_per_s=round(len(latencies) / wall, 2)))
+
+    streams = [stream_once(model, summary_inputs(i)) for i in range(requests * 2, requests * 2 + requests)]
+    results.add("stream first chunk", latency_stats([first for first, _ in streams if first is not None]))
+    results.add("stream total", latency_stats([total for _, total in streams]))
+
+    batch = [summary_inputs(i) for i in range(requests * 3, requests * 3 + requests * 2)]
+    start = time.perf_counter()
+    outcomes = model.generate_batch(batch)
+    results.add(f"generate_batch ({len(batch)})", {
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        "failed": sum(1 for outcome in outcomes if outcome["error"]),
+    })
+
+    if tokens:
+        tokens.sort()
+        results.add("tokens per second", {"p50": round(tokens[len(tokens) // 2], 1), "min": round(tokens[0], 1)})
+        results.add("prompt tokens per call", {"mean": round(sum(prompts) / len(prompts), 1), "max": max(prompts)})
+
+    latencies = []
+    for args in map(summary_args, range(requests)):
+        start = time.perf_counter()
+        render_summary(*args)
+        latencies.append(time.perf_counter() - start)
+    results.add("template summary", latency_stats(latencies))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark summary generation against the LM Studio stub")
+    parser.add_argument("--url", help="LM Studio API base to use instead of the stub, e.g. http://localhost:1234/v1")
+    parser.add_argument("--requests", type=int, default=20, help="completions per measurement (default 20)")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent completions (default 4)")
+    parser.add_argument("--delay", type=float, default=0.2, help="stub delay before the first token (default 0.2)")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="stub generation rate (default 40)")
+    parser.add_argument("--tokens", type=int, default=120, help="stub completion length (default 120)")
+    add_output_args(parser, "p50_ms")
+    args = parser.parse_args(argv)
+
+    stub = None
+    api_base = args.url
+    if api_base is None:
+        stub, api_base = start_stub(delay=args.delay, tokens_per_second=args.tokens_per_second, tokens=args.tokens)
+        print(f"Stub: {args.delay}s to first token, {args.tokens_per_second} tokens/s, {args.tokens} tokens")
+    model = LocalLM(api_base, max_in_flight=args.concurrency)
+    try:
+        results = run(model, args.requests, args.concurrency)
+    finally:
+        model.close()
+        if stub is not None:
+            stub.shutdown()
+    return finish(results, args, "p50_ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""
+Shared helpers for the benchmark scripts: sample sites, timing statistics and
+saving/comparing results so a slowdown in a hot path fails a run.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, Any, List
+
+# The backend modules are flat files one directory up
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+LOCATIONS = ("Pune", "Jaisalmer", "Chennai", "Leh", "Shillong", "Bhopal", "Kochi", "Nowhere")
+USAGE_TYPES = ("home", "factory", "agriculture")
+TARIFF_IDS = ("legacy-4-slab", "example-domestic-8-tier", "example-commercial-seasonal")
+
+
+def sample_sites(n: int, seed: int = 0, simulate: bool = False) -> List[Dict[str, Any]]:
+    """n /api/recommend request bodies with a realistic spread of inputs (the same seed gives the same sites)"""
+    rng = random.Random(seed)
+    sites = []
+    for _ in range(n):
+        usage_type = rng.choice(USAGE_TYPES)
+        scale = {"home": 400, "factory": 15000, "agriculture": 2500}[usage_type]
+        site = {
+            "location": rng.choice(LOCATIONS),
+            "usageType": usage_type,
+            "monthlyConsumption": round(rng.uniform(0.1, 2.0) * scale),
+            "tariff": rng.choice((6.5, 8, 9.5)),
+        }
+        r = rng.random()
+        if r < 0.3:
+            site["tariffId"] = rng.choice(TARIFF_IDS)
+        elif r < 0.5:
+            site["slabs"] = {"slab1Rate": 3, "slab2Rate": 5.5, "slab3Rate": 8, "slab4Rate": 10}
+        if rng.random() < 0.3:
+            site["latitude"] = round(rng.uniform(8.5, 34), 3)
+            site["longitude"] = round(rng.uniform(69, 94), 3)
+        if simulate:
+            site["simulate"] = True
+        sites.append(site)
+    return sites
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return float("nan")
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    """Count, mean and p50/p90/p99/max of latencies, in milliseconds"""
+    values = sorted(s * 1000 for s in seconds)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3) if values else float("nan"),
+        "p50_ms": round(percentile(values, 50), 3),
+        "p90_ms": round(percentile(values, 90), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else float("nan"),
+    }
+
+
+def time_call(fn: Callable[[], Any], repeat: int = 5, number: int = 1, warmup: int = 1) -> Dict[str, float]:
+    """Best and median time of `number` calls of fn, over `repeat` runs (in ms per call)"""
+    for _ in range(warmup):
+        fn()
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - start) / number)
+    runs.sort()
+    return {"best_ms": round(runs[0] * 1000, 4), "median_ms": round(runs[len(runs) // 2] * 1000, 4)}
+
+
+class Results:
+    """Named benchmark results, printed as they come in and optionally saved or compared with a baseline"""
+
+    def __init__(self, suite: str):
+        self.suite = suite
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, name: str, result: Dict[str, Any], note: str = ""):
+        """Record and print one result"""
+        self.results[name] = result
+        fields = ", ".join(f"{key}={value}" for key, value in result.items())
+        print(f"{name:<36} {fields}{'  ' + note if note else ''}")
+
+    def save(self, path: str):
+        """Write the results as JSON"""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"suite": self.suite, "results": self.results}, f, indent=2, sort_keys=True)
+        print(f"Saved results to {path}")
+
+    def compare(self, path: str, tolerance: float, metric: str) -> List[str]:
+        """Names of benchmarks whose `metric` is more than `tolerance` (a fraction) worse than the baseline"""
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = []
+        for name, result in self.results.items():
+            before = baseline.get(name, {}).get(metric)
+            after = result.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            flag = "REGRESSION" if change > tolerance else "ok"
+            print(f"{name:<36} {metric} {before} -> {after} ({change:+.1%}) {flag}")
+            if change > tolerance:
+                regressions.append(name)
+        return regressions
+
+
+def add_output_args(parser, metric: str):
+    """--save/--baseline/--tolerance options shared by the scripts"""
+    parser.add_argument("--save", metavar="FILE", help="write the results to a JSON file")
+    parser.add_argument("--baseline", metavar="FILE", help=f"compare {metric} with a saved run; exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline as a fraction (default 0.25)")
+
+
+def finish(results: Results, args, metric: str) -> int:
+    """Save and compare as requested by the command line; returns the exit status"""
+    if args.save:
+        results.save(args.save)
+    if args.baseline:
+        regressions = results.compare(args.baseline, args.tolerance, metric)
+        if regressions:
+            print(f"{len(regressions)} benchmark(s) regressed by more than {args.tolerance:.0%}: "
+                  f"{', '.join(regressions)}")
+            return 1
+    return 0
+
@@ -0,0 +1,145 @@
+"""
+Stand-in for LM Studio's OpenAI-compatible server, for benchmarking without a model.
+
+    python benchmarks/lm_stub.py --port 1235 --delay 0.2 --tokens-per-second 40 --tokens 120
+
+then point the backend at it with LM_STUDIO_API_BASE=http://localhost:1235/v1.
+It answers `GET /v1/models` and `POST /v1/chat/completions` (plain and
+`"stream": true`), waiting `delay` seconds before the first token and then
+emitting tokens at `tokens_per_second`. `max_tokens` in the request caps the
+completion length. A fraction of requests can fail with 503 to exercise the
+retry and circuit breaker paths.
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("solar", "panels", "will", "cut", "your", "monthly", "bill", "and", "pay", "back", "the", "system",
+         "within", "a", "few", "years", "while", "reducing", "grid", "emissions")
+
+
+class StubConfig:
+    """Timing and failure settings shared by the handler threads"""
+
+    def __init__(self, delay: float = 0.2, tokens_per_second: float = 40, tokens: int = 120,
+                 error_rate: float = 0.0, model: str = "stub-model"):
+        self.delay = delay
+        self.tokens_per_second = tokens_per_second
+        self.tokens = tokens
+        self.error_rate = error_rate
+        self.model = model
+        self.requests = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Handles the two LM Studio endpoints the backend uses"""
+    protocol_version = "HTTP/1.1"  # keep-alive, like LM Studio
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    config: StubConfig = None
+
+    def log_message(self, format, *args):
+        pass  # quiet: the benchmarks print their own results
+
+    def _json(self, status: int, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._json(200, {"object": "list", "data": [{"id": self.config.model, "object": "model"}]})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._json(404, {"error": "not found"})
+            return
+        config = self.config
+        with config.lock:
+            config.requests += 1
+        if config.error_rate and random.random() < config.error_rate:
+            self._json(503, {"error": "model busy"})
+            return
+
+        tokens = min(config.tokens, int(request.get("max_tokens") or config.tokens))
+        interval = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0
+        prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in request.get("messages", []))
+        time.sleep(config.delay)
+        words = [WORDS[i % len(WORDS)] for i in range(tokens)]
+
+        if request.get("stream"):
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, word in enumerate(words):
+                if i and interval:
+                    time.sleep(interval)
+                chunk = {"choices": [{"index": 0, "delta": {"content": (" " if i else "") + word}}]}
+                self._chunk(f"data: {json.dumps(chunk)}\n\n")
+            if (request.get("stream_options") or {}).get("include_usage"):
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": tokens,
+                         "total_tokens": prompt_tokens + tokens}
+                self._chunk(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n")
+            self._chunk("data: [DONE]\n\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        time.sleep(interval * max(tokens - 1, 0))
+        self._json(200, {
+            "id": f"stub-{config.requests}",
+            "object": "chat.completion",
+            "model": config.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                         "finish_reason": "length" if tokens == request.get("max_tokens") else "stop"}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": tokens,
+                      "total_tokens": prompt_tokens + tokens},
+        })
+
+    def _chunk(self, text: str):
+        data = text.encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_stub(port: int = 0, **settings):
+    """Run the stub on a background thread; returns (server, base URL). Stop it with server.shutdown()"""
+    config = StubConfig(**settings)
+    handler = type("ConfiguredStubHandler", (StubHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.config = config
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="LM Studio stand-in with configurable latency")
+    parser.add_argument("--port", type=int, default=1235)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds before the first token (default 0.2)")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="generation rate (default 40)")
+    parser.add_argument("--tokens", type=int, default=120, help="completion length in tokens (default 120)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions answered with 503")
+    args = parser.parse_args(argv)
+    server, base = start_stub(args.port, delay=args.delay, tokens_per_second=args.tokens_per_second,
+                              tokens=args.tokens, error_rate=args.error_rate)
+    print(f"LM Studio stub listening on {base} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+End-to-end /api/recommend latency under concurrent load.
+
+    python benchmarks/load_test.py                         # in-process server, template summaries
+    python benchmarks/load_test.py --stub --delay 0.3      # summaries from the LM Studio stub
+    python benchmarks/load_test.py --url http://localhost:5000 --concurrency 32 --requests 5000
+
+Without --url the app is served in this process by a threaded development
+server, so client and server share one interpreter; use --url against
+gunicorn (see wsgi.py) for production numbers. Bodies are drawn from
+--distinct different sites (default: one per request, so every request misses
+the response and summary caches); a smaller number measures the cached path.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from common import Results, add_output_args, finish, latency_stats, sample_sites
+from lm_stub import start_stub
+
+import requests
+
+
+def start_app():
+    """Serve the Flask app on a background thread; returns (server, base URL)"""
+    from werkzeug.serving import make_server
+    from app import create_app, start_background
+
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)  # no access log line per request
+    app = create_app()
+    start_background()
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def wait_for_model(base: str, timeout: float = 10):
+    """Wait until the backend's circuit breaker lets requests through to the model"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        breaker = requests.get(f"{base}/api/health", timeout=5).json()["llm"]["breaker"]
+        if breaker["state"] != "open":
+            return True
+        time.sleep(0.1)
+    print("Warning: the model never became available; summaries will come from templates")
+    return False
+
+
+def load(base: str, bodies, total: int, concurrency: int):
+    """Send `total` requests from `concurrency` threads; returns (latencies, statuses, cache results, wall time)"""
+    local = threading.local()
+    latencies = []
+    statuses = Counter()
+    cache = Counter()
+    lock = threading.Lock()
+
+    def send(i):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        try:
+            response = session.post(f"{base}/api/recommend", json=bodies[i % len(bodies)], timeout=60)
+            status, cache_status = response.status_code, response.headers.get("X-Cache", "none")
+        except requests.RequestException:
+            status, cache_status = "error", "none"
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            statuses[status] += 1
+            cache[cache_status] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(send, range(total)))
+    return latencies, statuses, cache, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test /api/recommend")
+    parser.add_argument("--url", help="backend to test (default: serve the app in this process)")
+    parser.add_argument("--requests", type=int, default=2000, help="requests to send (default 2000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent clients (default 16)")
+    parser.add_argument("--distinct", type=int, help="distinct request bodies (default: one per request)")
+    parser.add_argument("--warmup", type=int, default=50, help="requests sent before measuring (default 50)")
+    parser.add_argument("--simulate", action="store_true", help="run the hourly simulation for every site")
+    parser.add_argument("--stub", action="store_true", help="serve summaries from the LM Studio stub "
+                                                            "(in-process app only)")
+    parser.add_argument("--delay", type=float, default=0.2, help="stub delay before the first token (default 0.2)")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="stub generation rate (default 40)")
+    parser.add_argument("--tokens", type=int, default=120, help="stub completion length (default 120)")
+    add_output_args(parser, "p90_ms")
+    args = parser.parse_args(argv)
+
+    stub = server = None
+    if args.stub:
+        if args.url:
+            parser.error("--stub needs the in-process app; start lm_stub.py yourself and point the backend at it")
+        stub, api_base = start_stub(delay=args.delay, tokens_per_second=args.tokens_per_second, tokens=args.tokens)
+        os.environ["LM_STUDIO_API_BASE"] = api_base
+        os.environ["LM_PROBE_INTERVAL"] = "1"
+    base = args.url.rstrip("/") if args.url else None
+    if base is None:
+        server, base = start_app()
+    if args.stub:
+        wait_for_model(base)
+
+    bodies = sample_sites(args.distinct or args.requests, seed=7, simulate=args.simulate)
+    # Warm up on bodies the measured run does not reuse, unless the run is meant to hit the cache
+    if args.warmup:
+        warmup = bodies if args.distinct else sample_sites(args.warmup, seed=8, simulate=args.simulate)
+        load(base, warmup, args.warmup, args.concurrency)
+
+    latencies, statuses, cache, wall = load(base, bodies, args.requests, args.concurrency)
+    results = Results("load")
+    name = f"recommend c={args.concurrency}" + (" stub" if args.stub else "") + (" sim" if args.simulate else "")
+    result = dict(latency_stats(latencies), requests_per_s=round(len(latencies) / wall, 1))
+    results.add(name, result)
+    print(f"Status codes: {dict(statuses)}; X-Cache: {dict(cache)}")
+
+    if server is not None:
+        server.shutdown()
+    if stub is not None:
+        print(f"Stub completions served: {stub.config.requests}")
+        stub.shutdown()
+    status = finish(results, args, "p90_ms")
+    failed = sum(count for code, count in statuses.items() if code != 200)
+    return 1 if failed else status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
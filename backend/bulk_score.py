@@ -0,0 +1,213 @@
+"""
+Score a CSV or Parquet file of sites from the command line.
+
+    python bulk_score.py customers.csv scored.csv
+    python bulk_score.py customers.parquet scored.parquet --chunk-size 20000 --workers 8
+
+Input columns use the /api/recommend field names (location, usageType,
+monthlyConsumption, tariff, tariffId, month, latitude, longitude, budget and
+slab1Rate..slab4Rate); an `id` column is copied to the output. Rows are read a
+chunk at a time, scored with `batch.recommend_batch()` in a process pool and
+written in input order as soon as each chunk is done, so memory stays flat
+however large the file is. Parquet needs pyarrow (`pip install pyarrow`).
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, Iterator, List
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from batch import COLUMNS, recommend_batch, to_row
+from calculator import SLAB_KEYS
+
+NUMBER_FIELDS = ("monthlyConsumption", "tariff", "latitude", "longitude", "budget") + SLAB_KEYS
+INTEGER_FIELDS = ("month",)
+TEXT_FIELDS = ("location", "usageType", "tariffId")
+
+PROGRESS_INTERVAL = 2.0  # seconds between progress lines
+
+
+def _value(field: str, value):
+    """Convert a cell to the type parse_site() expects (bad numbers are left for it to reject)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str) and field in NUMBER_FIELDS + INTEGER_FIELDS:
+        try:
+            value = float(value)
+        except ValueError:
+            return value
+    # Integer columns come back as floats from CSV text and from Parquet columns with nulls (3.0)
+    if field in INTEGER_FIELDS and isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def to_site(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Build a /api/recommend style site from an input record, with the cashflow projection the output reports"""
+    site = {'finance': True}
+    for field in TEXT_FIELDS + NUMBER_FIELDS + INTEGER_FIELDS:
+        value = _value(field, record.get(field))
+        if value is not None:
+            site[field] = value
+    slabs = {key: site.pop(key) for key in SLAB_KEYS if key in site}
+    if slabs:
+        site['slabs'] = slabs
+    return site
+
+
+def _score_one(site: Dict[str, Any]) -> Dict[str, Any]:
+    """Score a single site, turning any failure into the row's error"""
+    try:
+        return recommend_batch([site])[0]
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def score_chunk(start: int, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Score one chunk of input records (runs in a worker process)"""
+    sites = [to_site(record) for record in records]
+    try:
+        results = recommend_batch(sites)
+    except Exception as e:
+        # Rescore the chunk row by row, so only the rows that fail carry the error
+        print(f"Chunk at row {start} failed ({e}); scoring its rows one at a time", file=sys.stderr)
+        results = [_score_one(site) for site in sites]
+    return [to_row(start + k, record.get("id"), result) for k, (record, result) in enumerate(zip(records, results))]
+
+
+def _require_pyarrow():
+    """Exit with a hint if Parquet is used without pyarrow"""
+    if pq is None:
+        sys.exit("Parquet files need pyarrow: pip install pyarrow")
+
+
+def read_chunks(path: str, chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Yield lists of input records, chunk_size at a time"""
+    if path.endswith(".parquet"):
+        _require_pyarrow()
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_size):
+            yield batch.to_pylist()
+        return
+    with open(path, encoding="utf-8", newline="") as f:
+        chunk = []
+        for record in csv.DictReader(f):
+            chunk.append(record)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+
+def count_rows(path: str):
+    """Total input rows if cheaply known (Parquet metadata), else None"""
+    if path.endswith(".parquet") and pq is not None:
+        return pq.ParquetFile(path).metadata.num_rows
+    return None
+
+
+class Writer:
+    """Incremental CSV or Parquet writer for output rows"""
+
+    def __init__(self, path: str):
+        self.parquet = path.endswith(".parquet")
+        if self.parquet:
+            _require_pyarrow()
+            self.schema = pa.schema([(name, getattr(pa, kind)()) for name, kind in COLUMNS])
+            self.writer = pq.ParquetWriter(path, self.schema)
+        else:
+            self.file = open(path, "w", encoding="utf-8", newline="")
+            self.writer = csv.DictWriter(self.file, fieldnames=[name for name, _ in COLUMNS])
+            self.writer.writeheader()
+
+    def write(self, rows: List[Dict[str, Any]]):
+        """Append rows to the output"""
+        if self.parquet:
+            self.writer.write_table(pa.Table.from_pylist(rows, schema=self.schema))
+        else:
+            self.writer.writerows(rows)
+
+    def close(self):
+        """Flush and close the output"""
+        if self.parquet:
+            self.writer.close()
+        else:
+            self.file.close()
+
+
+def _progress(done: int, errors: int, total, started: float, final: bool = False):
+    """Print rows scored, throughput and (when known) percent complete"""
+    elapsed = max(time.time() - started, 1e-9)
+    percent = f" ({done / total:.0%})" if total else ""
+    label = "Scored" if final else "Scoring:"
+    print(f"{label} {done:,} rows{percent} in {elapsed:.1f}s, {done / elapsed:,.0f} rows/s, {errors:,} errors",
+          file=sys.stderr)
+
+
+def run(input_path: str, output_path: str, chunk_size: int, workers: int) -> int:
+    """Score a file and return the number of rows written"""
+    total = count_rows(input_path)
+    writer = Writer(output_path)
+    started = last_report = time.time()
+    done = errors = 0
+
+    def flush(rows):
+        nonlocal done, errors, last_report
+        writer.write(rows)
+        done += len(rows)
+        errors += sum(1 for row in rows if row["error"] is not None)
+        if time.time() - last_report >= PROGRESS_INTERVAL:
+            _progress(done, errors, total, started)
+            last_report = time.time()
+
+    try:
+        if workers <= 1:
+            start = 0
+            for chunk in read_chunks(input_path, chunk_size):
+                flush(score_chunk(start, chunk))
+                start += len(chunk)
+        else:
+            # At most two chunks per worker are in flight, so memory does not grow with the file
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = deque()
+                start = 0
+                for chunk in read_chunks(input_path, chunk_size):
+                    pending.append(pool.submit(score_chunk, start, chunk))
+                    start += len(chunk)
+                    if len(pending) >= workers * 2:
+                        flush(pending.popleft().result())
+                while pending:
+                    flush(pending.popleft().result())
+    finally:
+        writer.close()
+    _progress(done, errors, total, started, final=True)
+    return done
+
+
+def main(argv=None):
+    """Parse the command line and score the input file into the output file"""
+    parser = argparse.ArgumentParser(description="Score a CSV or Parquet file of sites")
+    parser.add_argument("input", help="input .csv or .parquet file")
+    parser.add_argument("output", help="output .csv or .parquet file")
+    parser.add_argument("--chunk-size", type=int, default=int(os.environ.get("BULK_CHUNK_SIZE", 10000)),
+                        help="rows scored per task (default 10000)")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("BULK_WORKERS", os.cpu_count() or 1)),
+                        help="worker processes (default: one per CPU; 1 scores in this process)")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    run(args.input, args.output, args.chunk_size, args.workers)
+
+
+if __name__ == "__main__":
+    main()
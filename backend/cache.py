@@ -0,0 +1,246 @@
+"""
+In-process LRU cache with TTL and size bounds, plus an optional SQLite or
+Redis store so warm entries survive restarts and can be shared by several
+worker processes.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+
+def _size_of(value: Any) -> int:
+    """Approximate size of a cached value in bytes"""
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    return sys.getsizeof(value)
+
+
+class SQLiteStore:
+    """Persistent key/value store for cached strings or bytes, safe to share between processes"""
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 100000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._pid = None
+        self._conn.execute("SELECT 1")  # open the file now, so a bad path fails at startup
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Connection for this process (SQLite connections must not be carried across a fork)"""
+        if self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, created REAL, accessed REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+            self._connection, self._pid = conn, os.getpid()
+        return self._connection
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+        return value
+
+    def set(self, key: str, value: Any):
+        """Store a value, trimming the least recently used rows now and then"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._trim(now)
+
+    def delete(self, key: str):
+        """Remove a stored value"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove every stored value"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+
+    def _trim(self, now: float):
+        """Drop expired rows and the oldest rows beyond max_entries"""
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM cache WHERE created < ?", (now - self.ttl,))
+        self._conn.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+
+class RedisStore:
+    """Key/value store on a Redis-compatible server, shared by every worker (needs the redis package).
+
+    Server errors are logged and treated as misses, so the cache never fails a request.
+    """
+
+    def __init__(self, url: str, ttl: Optional[float] = None, prefix: str = "cache:"):
+        if redis is None:
+            raise RuntimeError("a Redis cache needs the redis package: pip install redis")
+        self.ttl = ttl
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=1, socket_connect_timeout=1)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if missing, expired or unreachable"""
+        try:
+            return self._client.get(self.prefix + key)
+        except redis.RedisError as e:
+            print(f"Redis cache unavailable: {e}")
+            return None
+
+    def set(self, key: str, value: Any):
+        """Store a value with the TTL"""
+        try:
+            self._client.set(self.prefix + key, value, ex=int(self.ttl) if self.ttl else None)
+        except redis.RedisError as e:
+            print(f"Redis cache unavailable: {e}")
+
+    def delete(self, key: str):
+        """Remove a stored value"""
+        try:
+            self._client.delete(self.prefix + key)
+        except redis.RedisError as e:
+            print(f"Redis cache unavailable: {e}")
+
+    def clear(self):
+        """Remove every value under this store's prefix"""
+        try:
+            for key in self._client.scan_iter(match=self.prefix + "*"):
+                self._client.delete(key)
+        except redis.RedisError as e:
+            print(f"Redis cache unavailable: {e}")
+
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and total bytes, with a TTL per entry.
+
+    When a `store` is given, misses fall through to it and new entries are written
+    through, so the cache is warm again after a restart.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 store: Optional[Union[SQLiteStore, RedisStore]] = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.store = store
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, expires, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return a cached value (refreshing its recency), or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires, size = entry
+                if expires is None or expires > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+        if self.store is not None:
+            value = self.store.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._insert(key, value, now)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        """Cache a value, evicting least recently used entries to stay within bounds"""
+        with self._lock:
+            self._insert(key, value, time.time())
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def delete(self, key: str):
+        """Drop a cached value"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+        if self.store is not None:
+            self.store.delete(key)
+
+    def clear(self):
+        """Drop every cached value"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for /api/health"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "persistent": self.store is not None,
+            }
+
+    def _insert(self, key: str, value: Any, now: float):
+        """Add or replace an entry and evict down to the bounds (caller holds the lock)"""
+        if key in self._entries:
+            self._remove(key)
+        size = _size_of(value)
+        expires = now + self.ttl if self.ttl is not None else None
+        self._entries[key] = (value, expires, size)
+        self._bytes += size
+        while self._entries and (
+            len(self._entries) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        """Remove an entry and its size (caller holds the lock)"""
+        value, expires, size = self._entries.pop(key)
+        self._bytes -= size
@@ -0,0 +1,598 @@
+"""
+Pure recommendation math, independent of Flask and JSON.
+
+`compute()` is the hot path: it takes a parsed `SiteInput` and returns a
+`Recommendation` without touching the network, the LLM or any globals, so it can
+be called in-process from simulation jobs and benchmarked on its own.
+"""
+
+import inspect
+import math
+from dataclasses import dataclass
+from numbers import Real
+from typing import Callable, Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from tariffs import Tariff, get_tariff, tariff_from_slabs
+from gazetteer import resolve_place
+from finance import annual_om, degraded, finance_info, project
+from optimizer import OBJECTIVES, optimize
+from simulation import simulate
+from uncertainty import parse_options, run_uncertainty
+from geo_resource import get_resource_grid, solar_factor, wind_factor, REFERENCE_GHI, REFERENCE_WIND_SPEED
+
+# Rates for the four slabs of the calculator form (see tariffs.LEGACY_SLAB_LIMITS)
+SLAB_KEYS = ('slab1Rate', 'slab2Rate', 'slab3Rate', 'slab4Rate')
+DEFAULT_SLAB_RATES = (4.0, 6.0, 8.0, 10.0)
+
+DEFAULT_TARIFF = 8.0  # ₹/kWh when neither a tariff nor slabs are usable
+
+USAGE_TYPES = ('home', 'factory', 'agriculture')
+
+# Agricultural systems need a minimum size for irrigation pumps (5HP pump ≈ 3.7kW)
+PUMP_REQUIREMENT_KW = 3.7
+
+# Average daily generation per kW installed at the reference resource (see geo_resource)
+SOLAR_MULTIPLIER = 4.2
+AGRICULTURE_SOLAR_MULTIPLIER = 4.5  # open fields give better positioning
+WIND_MULTIPLIER = 3.8
+
+# Cost per kW installed (₹)
+SOLAR_COST_PER_KW = 55000
+WIND_COST_PER_KW = 75000
+AGRICULTURE_COST_PER_KW = 45000
+AGRICULTURE_SUBSIDY = 0.30  # PM-KUSUM scheme
+
+CO2_KG_PER_KWH = 0.82  # Indian grid emission factor
+
+
+@dataclass
+class SiteInput:
+    """Validated inputs for a single site"""
+    __slots__ = (
+        'location', 'usage_type', 'monthly_consumption', 'tariff', 'tariff_plan', 'budget', 'latitude', 'longitude',
+        'place', 'simulate', 'finance', 'optimize', 'uncertainty',
+    )
+    location: str
+    usage_type: str
+    monthly_consumption: float
+    tariff: float
+    tariff_plan: Optional[Tariff]  # tiered tariff from a tariff id or slab rates
+    budget: Optional[float]
+    latitude: Optional[float]
+    longitude: Optional[float]
+    place: Optional[str]  # gazetteer match when the coordinates came from the location name
+    simulate: bool  # run the hourly simulation as well as the quick estimate
+    finance: bool  # project lifetime cashflows (NPV, IRR, LCOE)
+    optimize: Optional[str]  # optimizer objective, or None for the fixed sizing rule
+    uncertainty: Optional[Dict[str, Any]]  # Monte Carlo options {samples, seed}, or None
+
+
+@dataclass
+class Recommendation:
+    """Numeric outputs of the recommendation math for a single site"""
+    __slots__ = (
+        'location', 'usage_type', 'system_type', 'recommended_size_kw', 'estimated_generation_kwh',
+        'monthly_savings', 'system_cost', 'payback_years', 'current_consumption', 'remaining_consumption',
+        'current_bill', 'new_bill', 'effective_tariff', 'co2_reduction', 'slabs_used', 'tariff_id',
+        'gross_cost', 'subsidy_percentage', 'subsidy_amount',
+        'latitude', 'longitude', 'place', 'ghi', 'wind_speed', 'location_factor', 'simulation',
+        'solar_kw', 'wind_kw', 'optimization', 'uncertainty', 'finance',
+    )
+    location: str
+    usage_type: str
+    system_type: str
+    recommended_size_kw: float
+    estimated_generation_kwh: int
+    monthly_savings: int
+    system_cost: int
+    payback_years: float
+    current_consumption: float
+    remaining_consumption: float
+    current_bill: float
+    new_bill: float
+    effective_tariff: float
+    co2_reduction: float
+    slabs_used: bool
+    tariff_id: Optional[str]
+    gross_cost: int
+    subsidy_percentage: float
+    subsidy_amount: int
+    latitude: Optional[float]
+    longitude: Optional[float]
+    place: Optional[str]
+    ghi: float  # kWh/m²/day at the site
+    wind_speed: float  # m/s at the site
+    location_factor: float
+    simulation: Optional[Dict[str, Any]]  # hourly simulation results when requested
+    solar_kw: float
+    wind_kw: float
+    optimization: Optional[Dict[str, Any]]  # optimizer choice when requested
+    uncertainty: Optional[Dict[str, Any]]  # percentile bands when requested
+    finance: Optional[Dict[str, Any]]  # lifetime cashflow metrics when requested
+
+
+def _number(value, name):
+    """Return value if it is a finite real number (not a bool), otherwise raise ValueError"""
+    if isinstance(value, bool) or not isinstance(value, Real) or not math.isfinite(value):
+        raise ValueError(f"{name} must be a number")
+    return value
+
+
+def parse_site(data: Dict[str, Any]) -> SiteInput:
+    """Validate a /api/recommend style payload and build a SiteInput, raising ValueError on bad input"""
+    if not isinstance(data, dict):
+        raise ValueError("site must be an object")
+
+    usage_type = data.get('usageType', 'home')
+    if usage_type not in USAGE_TYPES:
+        raise ValueError(f"usageType must be one of: {', '.join(USAGE_TYPES)}")
+
+    monthly_consumption = _number(data.get('monthlyConsumption') or 0, 'monthlyConsumption')
+    if monthly_consumption < 0:
+        raise ValueError("monthlyConsumption must be non-negative")
+    tariff = _number(data.get('tariff') or 0, 'tariff')
+
+    # A named tariff takes precedence over slab rates sent with the request
+    tariff_plan = None
+    tariff_id = data.get('tariffId')
+    if tariff_id is not None and not isinstance(tariff_id, str):
+        raise ValueError("tariffId must be a string")
+    if tariff_id:
+        month = data.get('month')
+        if month is not None and (isinstance(month, bool) or not isinstance(month, int) or not 1 <= month <= 12):
+            raise ValueError("month must be an integer from 1 to 12")
+        tariff_plan = get_tariff(tariff_id, month)
+    else:
+        slabs = data.get('slabs') or {}
+        if not isinstance(slabs, dict):
+            raise ValueError("slabs must be an object")
+        if slabs:
+            rates = tuple(_number(slabs.get(key, default), key) for key, default in zip(SLAB_KEYS, DEFAULT_SLAB_RATES))
+            tariff_plan = tariff_from_slabs(rates)
+
+    latitude = data.get('latitude')
+    longitude = data.get('longitude')
+    if (latitude is None) != (longitude is None):
+        raise ValueError("latitude and longitude must be given together")
+    if latitude is not None:
+        latitude = _number(latitude, 'latitude')
+        longitude = _number(longitude, 'longitude')
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            raise ValueError("latitude/longitude out of range")
+
+    # Without coordinates, look the location name up in the offline gazetteer
+    location = str(data.get('location', 'Unknown'))
+    place = None
+    if latitude is None and location.strip():
+        match = resolve_place(location)
+        if match is not None:
+            latitude, longitude, place = match.latitude, match.longitude, match.label
+
+    budget = data.get('budget') or None
+    if budget is not None:
+        budget = _number(budget, 'budget')
+
+    simulate = data.get('simulate', False)
+    if not isinstance(simulate, bool):
+        raise ValueError("simulate must be true or false")
+
+    finance = data.get('finance', False)
+    if not isinstance(finance, bool):
+        raise ValueError("finance must be true or false")
+
+    optimize_objective = data.get('optimize')
+    if optimize_objective is True:
+        optimize_objective = OBJECTIVES[0]
+    elif optimize_objective is False:
+        optimize_objective = None
+    elif optimize_objective is not None and optimize_objective not in OBJECTIVES:
+        raise ValueError(f"optimize must be true, false or one of: {', '.join(OBJECTIVES)}")
+
+    uncertainty = parse_options(data.get('uncertainty'))
+
+    return SiteInput(
+        location=location,
+        usage_type=usage_type,
+        monthly_consumption=monthly_consumption,
+        tariff=tariff,
+        tariff_plan=tariff_plan,
+        budget=budget,
+        latitude=latitude,
+        longitude=longitude,
+        place=place,
+        simulate=simulate,
+        finance=finance,
+        optimize=optimize_objective,
+        uncertainty=uncertainty,
+    )
+
+
+def system_type_for(usage_type: str) -> str:
+    """Technology recommended for a usage type: wind for factories, solar otherwise"""
+    return "wind" if usage_type == "factory" else "solar"
+
+
+def mix_type(solar_kw: float, wind_kw: float) -> str:
+    """System type for a mix of solar and wind capacity"""
+    if solar_kw > 0 and wind_kw > 0:
+        return "hybrid"
+    return "wind" if wind_kw > 0 else "solar"
+
+
+def generation_multiplier(usage_type: str, system_type: str) -> float:
+    """Average daily kWh per kW installed at the reference resource"""
+    if system_type == "wind":
+        return WIND_MULTIPLIER
+    if usage_type == "agriculture":
+        return AGRICULTURE_SOLAR_MULTIPLIER
+    return SOLAR_MULTIPLIER
+
+
+def site_resource(site: SiteInput):
+    """(GHI, wind speed) at the site, or the reference resource when it has no coordinates"""
+    if site.latitude is None:
+        return REFERENCE_GHI, REFERENCE_WIND_SPEED
+    return get_resource_grid().lookup(site.latitude, site.longitude)
+
+
+def _no_lap(stage: str):
+    """Stand-in for StageTimer.lap when compute() is not timed"""
+
+
+def _no_skip():
+    """Stand-in for StageTimer.skip when compute() is not timed"""
+
+
+# Stages of compute(). Each one is a function of named values: SiteInput fields
+# and the outputs of earlier stages. A stage whose inputs are all unchanged from
+# a previous evaluation reuses that evaluation's outputs.
+
+def _tariff_stage(monthly_consumption, tariff, tariff_plan):
+    """Effective tariff: the average cost per unit under the tiered tariff"""
+    if tariff_plan is not None and monthly_consumption > 0:
+        tariff = tariff_plan.bill(monthly_consumption) / monthly_consumption
+    if not tariff or tariff <= 0:
+        tariff = DEFAULT_TARIFF
+    return {"effective_tariff": tariff}
+
+
+def _resource_stage(usage_type, latitude, longitude):
+    """Resource at the site, and the technology constants for its usage type"""
+    is_agriculture = usage_type == "agriculture"
+    if latitude is None:
+        ghi, wind_speed = REFERENCE_GHI, REFERENCE_WIND_SPEED
+    else:
+        ghi, wind_speed = get_resource_grid().lookup(latitude, longitude)
+    return {
+        "ghi": ghi,
+        "wind_speed": wind_speed,
+        "solar_multiplier": generation_multiplier(usage_type, "solar"),
+        "solar_cost_per_kw": AGRICULTURE_COST_PER_KW if is_agriculture else SOLAR_COST_PER_KW,
+        "solar_subsidy": AGRICULTURE_SUBSIDY if is_agriculture else 0.0,  # PM-KUSUM covers solar only
+        "min_size_kw": PUMP_REQUIREMENT_KW if is_agriculture else 0.0,
+    }
+
+
+def _sizing_stage(usage_type, monthly_consumption, min_size_kw):
+    """Solar or wind capacity from the fixed sizing rule, which does not depend on the tariff"""
+    size_kw = max(round(monthly_consumption / 100, 1), min_size_kw)
+    system_type = system_type_for(usage_type)
+    solar_kw, wind_kw = (0.0, size_kw) if system_type == "wind" else (size_kw, 0.0)
+    return {
+        "solar_kw": solar_kw,
+        "wind_kw": wind_kw,
+        "system_type": system_type,
+        "recommended_size_kw": round(solar_kw + wind_kw, 1),
+        "optimization": None,
+    }
+
+
+def _optimization_stage(monthly_consumption, tariff_plan, budget, optimize_objective, effective_tariff, ghi,
+                        wind_speed, solar_multiplier, solar_cost_per_kw, solar_subsidy, min_size_kw):
+    """Solar and wind capacity from the optimizer, searched against the tariff, budget and subsidy"""
+    optimum = optimize(
+        monthly_consumption, effective_tariff, tariff_plan,
+        solar_multiplier * 30 * solar_factor(ghi), WIND_MULTIPLIER * 30 * wind_factor(wind_speed),
+        solar_cost_per_kw, WIND_COST_PER_KW, solar_subsidy, min_size_kw, budget, optimize_objective,
+    )
+    solar_kw, wind_kw = optimum.solar_kw, optimum.wind_kw
+    return {
+        "solar_kw": solar_kw,
+        "wind_kw": wind_kw,
+        "system_type": mix_type(solar_kw, wind_kw),
+        "recommended_size_kw": round(solar_kw + wind_kw, 1),
+        "optimization": {
+            "objective": optimum.objective,
+            "solar_kw": solar_kw,
+            "wind_kw": wind_kw,
+            "budget": budget,
+            "candidates": optimum.candidates,
+            "evaluated": optimum.evaluated,
+        },
+    }
+
+
+def _generation_stage(solar_kw, wind_kw, system_type, ghi, wind_speed, solar_multiplier):
+    """Expected generation, adjusted by the solar or wind resource at the site"""
+    solar_generation = solar_kw * solar_multiplier * 30 * solar_factor(ghi)
+    wind_generation = wind_kw * WIND_MULTIPLIER * 30 * wind_factor(wind_speed)
+    if system_type == "hybrid":
+        reference_generation = (solar_kw * solar_multiplier + wind_kw * WIND_MULTIPLIER) * 30
+        location_factor = (solar_generation + wind_generation) / reference_generation
+    else:
+        location_factor = wind_factor(wind_speed) if system_type == "wind" else solar_factor(ghi)
+    return {
+        "solar_generation": solar_generation,
+        "wind_generation": wind_generation,
+        "estimated_generation_kwh": int(solar_generation + wind_generation),
+        "location_factor": location_factor,
+    }
+
+
+def _bills_stage(monthly_consumption, tariff_plan, effective_tariff, estimated_generation_kwh):
+    """Bills before and after (remaining grid usage)"""
+    current_bill = monthly_consumption * effective_tariff
+    new_consumption = max(0, monthly_consumption - estimated_generation_kwh)
+    if tariff_plan is not None:
+        new_bill = tariff_plan.bill(new_consumption)
+    else:
+        new_bill = new_consumption * effective_tariff
+    return {
+        "current_bill": current_bill,
+        "new_consumption": new_consumption,
+        "new_bill": new_bill,
+        "monthly_savings": int(current_bill - new_bill),
+    }
+
+
+def _costing_stage(solar_kw, wind_kw, solar_cost_per_kw, solar_subsidy):
+    """System cost, with PM-KUSUM subsidies for agricultural solar"""
+    solar_gross = solar_kw * solar_cost_per_kw
+    gross_cost = int(solar_gross + wind_kw * WIND_COST_PER_KW)
+    subsidy_percentage = solar_subsidy if solar_kw > 0 else 0.0
+    subsidy_amount = int(int(solar_gross) * subsidy_percentage)
+    return {
+        "gross_cost": gross_cost,
+        "subsidy_percentage": subsidy_percentage,
+        "subsidy_amount": subsidy_amount,
+        "system_cost": gross_cost - subsidy_amount,
+        "om": annual_om(int(solar_gross), int(wind_kw * WIND_COST_PER_KW)),
+    }
+
+
+def _payback_stage(monthly_savings, system_cost):
+    """Simple payback in years (0 when the system saves nothing)"""
+    annual_savings = monthly_savings * 12
+    return {"payback_years": round(system_cost / annual_savings, 1) if annual_savings > 0 else 0}
+
+
+def _simulation_stage(usage_type, monthly_consumption, tariff_plan, latitude, effective_tariff, wind_speed,
+                      solar_generation, wind_generation, system_cost):
+    """Hourly simulation of the system"""
+    return {"simulation": simulate(usage_type, solar_generation / 30, wind_generation / 30, monthly_consumption,
+                                   effective_tariff, tariff_plan, latitude, wind_speed, system_cost)}
+
+
+def _finance_stage(monthly_consumption, tariff_plan, effective_tariff, estimated_generation_kwh, current_bill,
+                   gross_cost, subsidy_amount, om):
+    """Cashflows over the system's life, re-billing each year with degraded generation"""
+    generation_by_year = degraded([estimated_generation_kwh])
+    units = np.maximum(0.0, monthly_consumption - generation_by_year)
+    new_bills = tariff_plan.bill_array(units) if tariff_plan is not None else units * effective_tariff
+    projection = project(current_bill - new_bills, generation_by_year, gross_cost, subsidy_amount, om)
+    return {"finance": finance_info(projection, 0)}
+
+
+def _uncertainty_stage(uncertainty_options, monthly_consumption, tariff_plan, effective_tariff, solar_generation,
+                       wind_generation, gross_cost, subsidy_amount, om):
+    """Monte Carlo percentile bands"""
+    return {"uncertainty": run_uncertainty(monthly_consumption, effective_tariff, tariff_plan, solar_generation,
+                                           wind_generation, gross_cost, subsidy_amount, om, **uncertainty_options)}
+
+
+@dataclass
+class Stage:
+    """A step of compute(): its function, the named values it reads and what it produces"""
+    __slots__ = ('name', 'fn', 'inputs', 'outputs', 'enabled_by')
+    name: str
+    fn: Callable[..., Dict[str, Any]]
+    inputs: Tuple[str, ...]  # parameter names of fn, in order
+    outputs: Tuple[str, ...]
+    enabled_by: Optional[str]  # value that must be set for the stage to run (its outputs default to None otherwise)
+
+
+def _stage(name: str, fn, outputs: Tuple[str, ...], enabled_by: Optional[str] = None) -> Stage:
+    """Stage reading the values named by fn's parameters"""
+    return Stage(name, fn, tuple(inspect.signature(fn).parameters), outputs, enabled_by)
+
+
+SIZING_OUTPUTS = ("solar_kw", "wind_kw", "system_type", "recommended_size_kw", "optimization")
+
+STAGES = (
+    _stage("tariff", _tariff_stage, ("effective_tariff",)),
+    _stage("resource", _resource_stage,
+           ("ghi", "wind_speed", "solar_multiplier", "solar_cost_per_kw", "solar_subsidy", "min_size_kw")),
+    # Exactly one of the two sizing stages runs, so only the optimizer depends on the tariff
+    _stage("sizing", _sizing_stage, SIZING_OUTPUTS, enabled_by="fixed_sizing"),
+    _stage("optimization", _optimization_stage, SIZING_OUTPUTS, enabled_by="optimize_objective"),
+    _stage("generation", _generation_stage,
+           ("solar_generation", "wind_generation", "estimated_generation_kwh", "location_factor")),
+    _stage("bills", _bills_stage, ("current_bill", "new_consumption", "new_bill", "monthly_savings")),
+    _stage("costing", _costing_stage, ("gross_cost", "subsidy_percentage", "subsidy_amount", "system_cost", "om")),
+    _stage("payback", _payback_stage, ("payback_years",)),
+    _stage("simulation", _simulation_stage, ("simulation",), enabled_by="simulate"),
+    _stage("finance", _finance_stage, ("finance",), enabled_by="with_finance"),
+    _stage("uncertainty", _uncertainty_stage, ("uncertainty",), enabled_by="uncertainty_options"),
+)
+
+
+@dataclass
+class Evaluation:
+    """A computed recommendation with the inputs and outputs of every stage, for incremental re-evaluation"""
+    __slots__ = ('recommendation', 'memo', 'recomputed')
+    recommendation: Recommendation
+    memo: Dict[str, Tuple[tuple, Dict[str, Any]]]  # stage name -> (input values, outputs)
+    recomputed: List[str]  # stages that ran (the rest were reused or disabled)
+
+
+def _site_values(site: SiteInput) -> Dict[str, Any]:
+    """The SiteInput fields stages can read"""
+    return {
+        "usage_type": site.usage_type,
+        "monthly_consumption": site.monthly_consumption,
+        "tariff": site.tariff,
+        "tariff_plan": site.tariff_plan,
+        "budget": site.budget,
+        "latitude": site.latitude,
+        "longitude": site.longitude,
+        "simulate": site.simulate,
+        "with_finance": site.finance,
+        "optimize_objective": site.optimize,
+        "fixed_sizing": site.optimize is None,
+        "uncertainty_options": site.uncertainty,
+    }
+
+
+def evaluate(site: SiteInput, previous: Optional[Evaluation] = None, timer=None) -> Evaluation:
+    """Run the stages of compute(), reusing a previous evaluation's outputs where a stage's inputs are unchanged"""
+    lap = timer.lap if timer is not None else _no_lap
+    skip = timer.skip if timer is not None else _no_skip
+    values = _site_values(site)
+    memo = {}
+    recomputed = []
+    for stage in STAGES:
+        if stage.enabled_by is not None and values[stage.enabled_by] in (None, False):
+            for name in stage.outputs:  # another stage may produce the same values
+                values.setdefault(name, None)
+            continue
+        args = tuple(values[name] for name in stage.inputs)
+        cached = previous.memo.get(stage.name) if previous is not None else None
+        if cached is not None and cached[0] == args and not _volatile(stage, values):
+            outputs = cached[1]
+            skip()
+        else:
+            outputs = stage.fn(*args)
+            recomputed.append(stage.name)
+            lap(stage.name)
+        memo[stage.name] = (args, outputs)
+        values.update(outputs)
+    return Evaluation(_recommendation(site, values), memo, recomputed)
+
+
+def _volatile(stage: Stage, values: Dict[str, Any]) -> bool:
+    """Whether a stage must run again even with unchanged inputs"""
+    # Unseeded Monte Carlo runs draw fresh samples every time
+    return stage.name == "uncertainty" and values["uncertainty_options"]["seed"] is None
+
+
+def _recommendation(site: SiteInput, values: Dict[str, Any]) -> Recommendation:
+    """Assemble the stage outputs into a Recommendation"""
+    plan = site.tariff_plan
+    return Recommendation(
+        location=site.location,
+        usage_type=site.usage_type,
+        system_type=values["system_type"],
+        recommended_size_kw=values["recommended_size_kw"],
+        estimated_generation_kwh=values["estimated_generation_kwh"],
+        monthly_savings=values["monthly_savings"],
+        system_cost=values["system_cost"],
+        payback_years=values["payback_years"],
+        current_consumption=site.monthly_consumption,
+        remaining_consumption=values["new_consumption"],
+        current_bill=values["current_bill"],
+        new_bill=values["new_bill"],
+        effective_tariff=values["effective_tariff"],
+        co2_reduction=values["estimated_generation_kwh"] * CO2_KG_PER_KWH / 1000,  # tons per month
+        slabs_used=plan is not None,
+        tariff_id=plan.name if plan is not None else None,
+        gross_cost=values["gross_cost"],
+        subsidy_percentage=values["subsidy_percentage"],
+        subsidy_amount=values["subsidy_amount"],
+        latitude=site.latitude,
+        longitude=site.longitude,
+        place=site.place,
+        ghi=values["ghi"],
+        wind_speed=values["wind_speed"],
+        location_factor=values["location_factor"],
+        simulation=values["simulation"],
+        solar_kw=values["solar_kw"],
+        wind_kw=values["wind_kw"],
+        optimization=values["optimization"],
+        uncertainty=values["uncertainty"],
+        finance=values["finance"],
+    )
+
+
+def compute(site: SiteInput, timer=None) -> Recommendation:
+    """Size, cost and evaluate a renewable system for a single site (timer: optional metrics.StageTimer)"""
+    return evaluate(site, timer=timer).recommendation
+
+
+def subsidy_info(rec: Recommendation) -> Dict[str, Any]:
+    """Subsidy block for the response details"""
+    if rec.subsidy_amount or rec.subsidy_percentage:
+        return {
+            "available": True,
+            "percentage": rec.subsidy_percentage * 100,
+            "amount": rec.subsidy_amount,
+            "gross_cost": rec.gross_cost
+        }
+    return {"available": False}
+
+
+def resource_info(rec: Recommendation) -> Dict[str, Any]:
+    """Resource block for the response details"""
+    info = {
+        "latitude": rec.latitude,
+        "longitude": rec.longitude,
+        "ghi_kwh_m2_day": round(rec.ghi, 2),
+        "wind_speed_ms": round(rec.wind_speed, 2),
+        "location_factor": round(rec.location_factor, 3),
+        "source": "grid" if rec.latitude is not None else "default",
+    }
+    if rec.place is not None:
+        info["place"] = rec.place
+    return info
+
+
+def to_response(rec: Recommendation, summary: Optional[str] = None) -> Dict[str, Any]:
+    """Build the /api/recommend JSON body for a recommendation"""
+    response = {
+        "location": rec.location,
+        "usage_type": rec.usage_type,
+        "system_type": rec.system_type,
+        "recommended_size_kw": rec.recommended_size_kw,
+        "estimated_generation_kwh": rec.estimated_generation_kwh,
+        "monthly_savings": rec.monthly_savings,
+        "system_cost": rec.system_cost,
+        "payback_years": rec.payback_years,
+    }
+    if summary is not None:
+        response["gemini_summary"] = summary
+    response["details"] = {
+        "current_consumption": rec.current_consumption,
+        "remaining_consumption": rec.remaining_consumption,
+        "current_bill": round(rec.current_bill, 2),
+        "new_bill": round(rec.new_bill, 2),
+        "effective_tariff": round(rec.effective_tariff, 2),
+        "co2_reduction": round(rec.co2_reduction, 2),
+        "slabs_used": rec.slabs_used,
+        "subsidy_info": subsidy_info(rec),
+    }
+    if rec.tariff_id is not None:
+        response["details"]["tariff_id"] = rec.tariff_id
+    response["details"]["resource"] = resource_info(rec)
+    if rec.finance is not None:
+        response["details"]["finance"] = rec.finance
+    if rec.system_type == "hybrid":
+        response["details"]["solar_kw"] = rec.solar_kw
+        response["details"]["wind_kw"] = rec.wind_kw
+    if rec.optimization is not None:
+        response["details"]["optimization"] = rec.optimization
+    if rec.simulation is not None:
+        response["details"]["simulation"] = rec.simulation
+    if rec.uncertainty is not None:
+        response["details"]["uncertainty"] = rec.uncertainty
+    return response
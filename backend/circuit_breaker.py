@@ -0,0 +1,174 @@
+"""
+Circuit breaker and background health probing for the local model.
+
+When LM Studio is down or too slow, the breaker opens and requests go straight
+to the template summary instead of waiting for a timeout. After a cool-down (or
+when the health probe sees the server again) it lets a single trial request
+through, and closes again if that succeeds.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Thread-safe circuit breaker with a consecutive-failure limit and a p95 latency budget"""
+
+    def __init__(self, failure_threshold: int = 3, recovery_timeout: float = 30, latency_budget: Optional[float] = None,
+                 latency_window: int = 20, min_samples: int = 5):
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.latency_budget = latency_budget  # seconds; trips the breaker when p95 latency exceeds it
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=latency_window)
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.trips = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        """Current state: closed, open or half_open"""
+        with self._lock:
+            self._maybe_half_open(time.time())
+            return self._state
+
+    def available(self) -> bool:
+        """Whether a request could be let through right now, without reserving it"""
+        with self._lock:
+            self._maybe_half_open(time.time())
+            return self._state == CLOSED or (self._state == HALF_OPEN and not self._trial_in_flight)
+
+    def allow_request(self) -> bool:
+        """Reserve permission for one request; every True must be followed by record_success/record_failure"""
+        with self._lock:
+            self._maybe_half_open(time.time())
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self, latency: float):
+        """Record a successful call and its latency"""
+        with self._lock:
+            self._failures = 0
+            if self._state == HALF_OPEN:
+                print("Local LM recovered. Closing circuit breaker.")
+                self._state = CLOSED
+                self._trial_in_flight = False
+                self._latencies.clear()
+            self._latencies.append(latency)
+            p95 = self._p95()
+            if self.latency_budget is not None and p95 is not None and p95 > self.latency_budget:
+                self._open(f"p95 latency {p95:.2f}s exceeds budget of {self.latency_budget:.2f}s")
+
+    def record_failure(self, reason: str = "request failed"):
+        """Record a failed or timed-out call"""
+        with self._lock:
+            self._failures += 1
+            if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self._open(reason)
+
+    def trip(self, reason: str):
+        """Open the breaker immediately, e.g. when a health probe fails"""
+        with self._lock:
+            if self._state != OPEN:
+                self._open(reason)
+
+    def probe_succeeded(self):
+        """Allow a trial request right away when the health probe sees the server again"""
+        with self._lock:
+            if self._state == OPEN:
+                self._state = HALF_OPEN
+                self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Breaker state and counters for /api/health"""
+        with self._lock:
+            self._maybe_half_open(time.time())
+            p95 = self._p95()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "p95_latency": round(p95, 3) if p95 is not None else None,
+                "latency_budget": self.latency_budget,
+            }
+
+    def _open(self, reason: str):
+        """Switch to open (caller holds the lock)"""
+        print(f"Opening circuit breaker for local LM: {reason}. Using template-based summaries.")
+        self._state = OPEN
+        self._opened_at = time.time()
+        self._trial_in_flight = False
+        self._failures = 0
+        self.trips += 1
+
+    def _maybe_half_open(self, now: float):
+        """Move from open to half-open once the recovery timeout has passed (caller holds the lock)"""
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+
+    def _p95(self) -> Optional[float]:
+        """95th percentile of recent latencies, once there are enough samples (caller holds the lock)"""
+        if len(self._latencies) < self.min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+
+
+class HealthProber:
+    """Daemon thread that polls the model server's /models endpoint and drives the breaker"""
+
+    def __init__(self, model, breaker: CircuitBreaker, interval: float = 15):
+        self.model = model
+        self.breaker = breaker
+        self.interval = interval
+        self._stop = threading.Event()
+        self._immediate = False
+        self._thread = threading.Thread(target=self._run, name="lm-health-probe", daemon=True)
+
+    def start(self, immediate: bool = False) -> "HealthProber":
+        """Start probing in the background, optionally with a first probe right away"""
+        self._immediate = immediate
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop probing"""
+        self._stop.set()
+
+    def probe(self) -> bool:
+        """Check the server once and update the breaker"""
+        healthy = self.model.test_connection()
+        self.model.is_connected = healthy
+        if healthy:
+            self.breaker.probe_succeeded()
+        else:
+            self.breaker.trip("health probe failed")
+        return healthy
+
+    def _run(self):
+        """Probe every `interval` seconds until stopped"""
+        delay = 0 if self._immediate else self.interval
+        while not self._stop.wait(delay):
+            delay = self.interval
+            try:
+                self.probe()
+            except Exception as e:
+                print(f"Error probing local LM health: {e}")
@@ -0,0 +1,60 @@
+"""
+gzip and Brotli compression of API responses, negotiated from Accept-Encoding.
+
+Bodies below a size threshold, streamed responses (server-sent events) and
+media types that are already compact are sent as they are. Compressed
+responses carry a weak ETag, since their bytes differ from the body the ETag
+was computed from, and `Vary: Accept-Encoding` so shared caches keep the
+variants apart. Brotli needs `pip install brotli`; without it only gzip is
+offered. Set RESPONSE_COMPRESSION to an empty string when a proxy in front of
+the app already compresses.
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encodings in order of preference; the client's q-values decide between the ones it accepts
+ENCODINGS = [name.strip() for name in os.environ.get("RESPONSE_COMPRESSION", "br,gzip").split(",")
+             if name.strip() in ("br", "gzip") and (name.strip() != "br" or brotli is not None)]
+COMPRESS_MIN_BYTES = int(os.environ.get("COMPRESS_MIN_BYTES", 1024))
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", 6))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", 4))  # 11 is far slower for a few percent
+
+COMPRESSIBLE = ("application/json", "application/msgpack", "application/vnd.apache.arrow.stream", "text/plain")
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """A body compressed with 'br' or 'gzip'"""
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)  # fixed mtime: same body, same bytes
+
+
+def compress_response(response, accept_encodings):
+    """Compress a Flask response in place if the client accepts it and it is worth it"""
+    if not ENCODINGS or response.status_code not in (200, 304) or "Content-Encoding" in response.headers:
+        return response
+    not_modified = response.status_code == 304  # no body, and so no media type to check
+    if not not_modified and (response.mimetype not in COMPRESSIBLE or response.is_streamed
+                             or response.direct_passthrough):
+        return response
+    response.vary.add("Accept-Encoding")
+    encoding = accept_encodings.best_match(ENCODINGS)
+    if encoding is None:
+        return response
+    if not not_modified:
+        body = response.get_data()
+        if len(body) < COMPRESS_MIN_BYTES:
+            return response
+        response.set_data(compress(body, encoding))
+        response.headers["Content-Encoding"] = encoding
+    # A 304 answers for the compressed variant the client holds, so it carries the same weak ETag
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,132 @@
+"""
+Multi-year cashflow projection: NPV, IRR, payback, discounted payback and LCOE.
+
+Each year of operation re-bills the month with degraded generation, escalates
+the saving with the tariff and subtracts O&M, which grows at its own rate. The
+subsidy can arrive some years after installation. Everything works on
+(sites or samples) × years arrays, so one call projects a whole batch, and the
+optimizer and the uncertainty mode score systems through the same code.
+"""
+
+import math
+import os
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+DISCOUNT_RATE = float(os.environ.get("FIN_DISCOUNT_RATE", 0.08))
+LIFETIME_YEARS = int(os.environ.get("FIN_LIFETIME_YEARS", 25))
+TARIFF_ESCALATION = float(os.environ.get("FIN_TARIFF_ESCALATION", 0.03))  # per year
+DEGRADATION = float(os.environ.get("FIN_DEGRADATION", 0.005))  # output lost per year
+SOLAR_OM = float(os.environ.get("FIN_SOLAR_OM", 0.01))  # yearly O&M as a share of the gross cost
+WIND_OM = float(os.environ.get("FIN_WIND_OM", 0.02))
+OM_ESCALATION = float(os.environ.get("FIN_OM_ESCALATION", 0.05))
+SUBSIDY_LAG_YEARS = int(os.environ.get("FIN_SUBSIDY_LAG_YEARS", 0))  # 0 = paid at installation
+
+IRR_ITERATIONS = 50
+
+
+def annual_om(solar_gross, wind_gross):
+    """First-year O&M cost for the solar and wind parts of a system (scalars or arrays)"""
+    return solar_gross * SOLAR_OM + wind_gross * WIND_OM
+
+
+def growth(rate, years: int) -> np.ndarray:
+    """(1 + rate) ** year for years 0..years-1; rate may be an (n, 1) array"""
+    return (1 + np.asarray(rate, dtype=np.float64)) ** np.arange(years)
+
+
+def degraded(monthly_generation, degradation=DEGRADATION, years: int = LIFETIME_YEARS) -> np.ndarray:
+    """(n, years) monthly generation in each year of operation for an (n,) array of first-year values"""
+    return np.asarray(monthly_generation, dtype=np.float64)[:, None] * growth(-np.asarray(degradation), years)
+
+
+def payback(flows: np.ndarray) -> np.ndarray:
+    """Fractional years until cumulative cashflow turns non-negative (inf if it never does)"""
+    cumulative = np.cumsum(flows, axis=1)
+    reached = cumulative >= 0
+    year = np.argmax(reached, axis=1)
+    rows = np.arange(len(flows))
+    before = np.where(year > 0, cumulative[rows, np.maximum(year - 1, 0)], 0.0)
+    within = flows[rows, year]
+    fraction = np.where(within > 0, -before / np.where(within > 0, within, 1.0), 0.0)
+    result = np.where(year > 0, year - 1 + fraction, 0.0)
+    return np.where(reached.any(axis=1), result, np.inf)
+
+
+def irr(flows: np.ndarray, iterations: int = IRR_ITERATIONS, tolerance: float = 1e-10) -> np.ndarray:
+    """Internal rate of return of each row of cashflows (NaN where there is none)"""
+    t = np.arange(flows.shape[1])
+    # NPV is convex and falling in the rate, so Newton's method from below the root climbs to it
+    rate = np.where(flows.sum(axis=1) > 0, 0.0, -0.9)
+    for _ in range(iterations):
+        discount = (1 + rate)[:, None] ** -t
+        value = (flows * discount).sum(axis=1)
+        slope = -(flows * t * discount).sum(axis=1) / (1 + rate)
+        step = np.where(slope < 0, value / np.where(slope < 0, slope, -1.0), 0.0)
+        rate = np.maximum(rate - step, -0.999)
+        if np.all(np.abs(step) < tolerance):
+            break
+    discount = (1 + rate)[:, None] ** -t
+    converged = np.abs((flows * discount).sum(axis=1)) <= 1e-6 * np.abs(flows).sum(axis=1) + 1e-9
+    has_root = (flows[:, 0] < 0) & (flows[:, 1:].max(axis=1) > 0)
+    return np.where(converged & has_root, rate, np.nan)
+
+
+def project(monthly_savings: np.ndarray, monthly_generation: np.ndarray, gross_cost, subsidy, om,
+            escalation=TARIFF_ESCALATION, rate: float = DISCOUNT_RATE, subsidy_lag: int = SUBSIDY_LAG_YEARS,
+            with_irr: bool = True) -> Dict[str, np.ndarray]:
+    """Project cashflows for n systems.
+
+    `monthly_savings` and `monthly_generation` are (n, years) arrays for a
+    month in each year of operation, before tariff escalation. `gross_cost`,
+    `subsidy` and the first-year `om` are (n,) arrays or scalars, and
+    `escalation` may be an (n, 1) array of per-row rates. The iterative IRR
+    can be skipped with `with_irr=False` when only NPV or payback is needed.
+    """
+    n, years = monthly_savings.shape
+    gross_cost = np.broadcast_to(np.asarray(gross_cost, dtype=np.float64), (n,))
+    subsidy = np.broadcast_to(np.asarray(subsidy, dtype=np.float64), (n,))
+    savings = monthly_savings * 12 * growth(escalation, years)
+    om = np.asarray(om, dtype=np.float64).reshape(-1, 1) * growth(OM_ESCALATION, years)
+
+    flows = np.empty((n, years + 1))
+    flows[:, 0] = -gross_cost
+    flows[:, 1:] = savings - om
+    lag = min(max(subsidy_lag, 0), years)
+    flows[:, lag] += subsidy
+
+    discount = (1 + rate) ** -np.arange(years + 1.0)
+    present = flows * discount
+    energy = (monthly_generation * 12 * discount[1:]).sum(axis=1)
+    costs = gross_cost - subsidy * discount[lag] + (om * discount[1:]).sum(axis=1)
+    return {
+        "npv": present.sum(axis=1),
+        "irr": irr(flows) if with_irr else np.full(n, np.nan),
+        "payback_years": payback(flows),
+        "discounted_payback_years": payback(present),
+        "lcoe": np.where(energy > 0, costs / np.where(energy > 0, energy, 1.0), np.nan),
+        "lifetime_savings": savings.sum(axis=1),
+        "lifetime_om": om.sum(axis=1),
+    }
+
+
+def _finite(value, digits: int) -> Optional[float]:
+    """Rounded float, or None for inf/NaN"""
+    value = float(value)
+    return round(value, digits) if math.isfinite(value) else None
+
+
+def finance_info(projection: Dict[str, np.ndarray], i: int) -> Dict[str, Any]:
+    """Finance block for the response details of row i of a projection"""
+    return {
+        "years": LIFETIME_YEARS,
+        "discount_rate": DISCOUNT_RATE,
+        "npv": _finite(projection["npv"][i], 2),
+        "irr": _finite(projection["irr"][i], 4),
+        "payback_years": _finite(projection["payback_years"][i], 1),
+        "discounted_payback_years": _finite(projection["discounted_payback_years"][i], 1),
+        "lcoe": _finite(projection["lcoe"][i], 2),
+        "lifetime_savings": _finite(projection["lifetime_savings"][i], 2),
+        "lifetime_om": _finite(projection["lifetime_om"][i], 2),
+    }
@@ -0,0 +1,230 @@
+"""
+Offline gazetteer for resolving free-text locations to coordinates.
+
+The place list in `data/gazetteer.csv` is compiled once into a small read-only
+SQLite file (next to the CSV, or GAZETTEER_DB). Connections open it immutable
+with `mmap_size` set, so every worker process reads the same pages from the OS
+page cache instead of holding its own copy. Lookups go through a B-tree index
+on normalized names, which also answers prefix queries the way a trie would.
+"""
+
+import csv
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import unicodedata
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Optional
+
+_DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GAZETTEER_FILE = os.environ.get("GAZETTEER_FILE", os.path.join(_DATA_DIR, "gazetteer.csv"))
+GAZETTEER_DB = os.environ.get("GAZETTEER_DB", os.path.join(_DATA_DIR, "gazetteer.sqlite"))
+GAZETTEER_MMAP_SIZE = int(os.environ.get("GAZETTEER_MMAP_SIZE", 64 * 1024 * 1024))
+
+SCHEMA_VERSION = 1
+
+# Words that qualify a place name without changing which place is meant
+_NOISE_WORDS = {"city", "district", "dist", "town", "india"}
+_PINCODE = re.compile(r"\b(\d{6})\b")
+
+
+@dataclass
+class Place:
+    """A gazetteer entry"""
+    __slots__ = ('name', 'state', 'latitude', 'longitude', 'pincode')
+    name: str
+    state: str
+    latitude: float
+    longitude: float
+    pincode: str
+
+    @property
+    def label(self) -> str:
+        """Display name, e.g. "Pune, Maharashtra" """
+        return f"{self.name}, {self.state}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON form for the geocode endpoint"""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+            "pincode": self.pincode,
+        }
+
+
+def normalize(text: str) -> str:
+    """Lowercase ASCII form of a place name with punctuation and qualifiers removed"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii").lower()
+    words = [word for word in re.split(r"[^a-z0-9]+", text) if word and word not in _NOISE_WORDS]
+    return " ".join(words)
+
+
+def build_database(csv_path: str = GAZETTEER_FILE, db_path: str = GAZETTEER_DB):
+    """Compile the gazetteer CSV into an indexed SQLite file (written atomically)"""
+    with open(csv_path, encoding="utf-8", newline="") as f:
+        rows = list(csv.DictReader(line for line in f if line.strip() and not line.startswith("#")))
+
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(db_path) or ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        conn = sqlite3.connect(tmp_path)
+        conn.executescript(f"""
+            PRAGMA user_version = {SCHEMA_VERSION};
+            CREATE TABLE places (
+                id INTEGER PRIMARY KEY, name TEXT NOT NULL, state TEXT NOT NULL,
+                latitude REAL NOT NULL, longitude REAL NOT NULL, pincode TEXT NOT NULL
+            );
+            CREATE TABLE names (
+                norm TEXT NOT NULL, place_id INTEGER NOT NULL, is_alias INTEGER NOT NULL,
+                PRIMARY KEY (norm, place_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE states (norm TEXT PRIMARY KEY, name TEXT NOT NULL) WITHOUT ROWID;
+        """)
+        for place_id, row in enumerate(rows, 1):
+            name, state = row["name"].strip(), row["state"].strip()
+            conn.execute(
+                "INSERT INTO places VALUES (?, ?, ?, ?, ?, ?)",
+                (place_id, name, state, float(row["latitude"]), float(row["longitude"]), row["pincode"].strip()),
+            )
+            aliases = [alias for alias in (row.get("aliases") or "").split("|") if alias.strip()]
+            for is_alias, text in [(0, name)] + [(1, alias) for alias in aliases]:
+                conn.execute("INSERT OR IGNORE INTO names VALUES (?, ?, ?)", (normalize(text), place_id, is_alias))
+            conn.execute("INSERT OR IGNORE INTO states VALUES (?, ?)", (normalize(state), state))
+        conn.execute("CREATE INDEX places_pincode ON places (pincode)")
+        conn.commit()
+        conn.execute("VACUUM")
+        conn.close()
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class Gazetteer:
+    """Read-only place-name and pincode index backed by a memory-mapped SQLite file"""
+
+    def __init__(self, db_path: str = GAZETTEER_DB, mmap_size: int = GAZETTEER_MMAP_SIZE):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        self._states = {norm: name for norm, name in self._conn().execute("SELECT norm, name FROM states")}
+
+    def _conn(self) -> sqlite3.Connection:
+        """Per-thread (and per-process, since a connection must not cross a fork) connection to the shared file"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            uri = "file:" + os.path.abspath(self.db_path) + "?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _places(self, sql: str, params) -> List[Place]:
+        """Run a query selecting place columns"""
+        return [Place(*row) for row in self._conn().execute(sql, params)]
+
+    def lookup(self, name: str, state: Optional[str] = None) -> List[Place]:
+        """Places whose name or alias matches exactly after normalization, canonical names first"""
+        places = self._places(
+            "SELECT p.name, p.state, p.latitude, p.longitude, p.pincode FROM names n "
+            "JOIN places p ON p.id = n.place_id WHERE n.norm = ? ORDER BY n.is_alias, p.id",
+            (normalize(name),),
+        )
+        if state is not None:
+            places = [place for place in places if place.state == state] or places
+        return places
+
+    def search(self, prefix: str, limit: int = 10) -> List[Place]:
+        """Places with a name or alias starting with prefix (index range scan)"""
+        norm = normalize(prefix)
+        if not norm:
+            return []
+        return self._places(
+            "SELECT p.name, p.state, p.latitude, p.longitude, p.pincode FROM places p WHERE p.id IN ("
+            "SELECT place_id FROM names WHERE norm >= ? AND norm < ?) "
+            "ORDER BY length(p.name), p.name LIMIT ?",
+            (norm, norm + "\uffff", limit),
+        )
+
+    def by_pincode(self, pincode: str) -> Optional[Place]:
+        """Place for a 6-digit PIN, falling back to the same 3-digit sorting district"""
+        places = self._places(
+            "SELECT name, state, latitude, longitude, pincode FROM places WHERE pincode = ? LIMIT 1", (pincode,)
+        )
+        if not places:
+            places = self._places(
+                "SELECT name, state, latitude, longitude, pincode FROM places "
+                "WHERE pincode >= ? AND pincode < ? ORDER BY pincode LIMIT 1",
+                (pincode[:3], pincode[:3] + "\uffff"),
+            )
+        return places[0] if places else None
+
+    def state(self, text: str) -> Optional[str]:
+        """State name if text names a state"""
+        return self._states.get(normalize(text))
+
+    def resolve(self, text: str) -> Optional[Place]:
+        """Best single match for free text such as "Pune", "Kothrud, Pune, MH" or "411038" """
+        pin = _PINCODE.search(text)
+        if pin:
+            place = self.by_pincode(pin.group(1))
+            if place is not None:
+                return place
+
+        parts = [part for part in (_PINCODE.sub(" ", part) for part in text.split(",")) if normalize(part)]
+        state = next((self.state(part) for part in parts if self.state(part)), None)
+        # "Delhi" or "Chandigarh" on its own is the city, not only the state
+        names = [part for part in parts if not self.state(part)] or parts
+
+        # Exact names first, most specific part first; then the whole string as one name
+        for part in names + [" ".join(names)]:
+            places = self.lookup(part, state)
+            if places:
+                return places[0]
+
+        # Finally an unambiguous prefix (e.g. "Visakha")
+        for part in names:
+            places = self.search(part, limit=2)
+            if len(places) == 1:
+                return places[0]
+        return None
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    """Open the shared gazetteer on first use, compiling the CSV if the database is missing or stale"""
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                if (not os.path.exists(GAZETTEER_DB)
+                        or os.path.getmtime(GAZETTEER_DB) < os.path.getmtime(GAZETTEER_FILE)):
+                    print(f"Building gazetteer index at {GAZETTEER_DB}")
+                    build_database()
+                _gazetteer = Gazetteer()
+    return _gazetteer
+
+
+@lru_cache(maxsize=4096)
+def _resolve_cached(text: str) -> Optional[Place]:
+    """Memoized lookup; errors propagate so lru_cache never stores them"""
+    return get_gazetteer().resolve(text)
+
+
+def resolve_place(text: str) -> Optional[Place]:
+    """Resolve a free-text location using the shared gazetteer (memoized per process, except failures)"""
+    try:
+        return _resolve_cached(text)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Gazetteer unavailable: {e}")
+        return None
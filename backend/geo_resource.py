@@ -0,0 +1,137 @@
+"""
+Solar and wind resource lookup on a regular latitude/longitude grid.
+
+The grid is loaded once (lazily, or preloaded at startup) from
+`data/resource_grid.csv`. Because the cells are regular, locating a site is
+plain index arithmetic, so a lookup is a few microseconds with no search.
+"""
+
+import os
+import threading
+from typing import Tuple
+
+import numpy as np
+
+RESOURCE_GRID_FILE = os.environ.get(
+    "RESOURCE_GRID_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "resource_grid.csv")
+)
+RESOURCE_INTERPOLATION = os.environ.get("RESOURCE_INTERPOLATION", "bilinear")
+
+# Resource levels at which the calculator's generation multipliers apply unchanged
+REFERENCE_GHI = 5.25  # kWh/m²/day
+REFERENCE_WIND_SPEED = 5.5  # m/s
+
+# Wind output scales with the cube of wind speed, limited by the turbine's power curve
+MIN_WIND_FACTOR = 0.25
+MAX_WIND_FACTOR = 1.8
+
+
+class ResourceGrid:
+    """Regular grid of mean irradiance and wind speed with O(1) cell lookup"""
+
+    def __init__(self, latitudes: np.ndarray, longitudes: np.ndarray, ghi: np.ndarray, wind_speed: np.ndarray):
+        self.lat0 = float(latitudes[0])
+        self.lon0 = float(longitudes[0])
+        self.dlat = float(latitudes[1] - latitudes[0])
+        self.dlon = float(longitudes[1] - longitudes[0])
+        self.nlat = len(latitudes)
+        self.nlon = len(longitudes)
+        self.ghi = ghi
+        self.wind_speed = wind_speed
+        # Plain lists make single-site lookups cheaper than indexing NumPy scalars
+        self._ghi_rows = ghi.tolist()
+        self._wind_rows = wind_speed.tolist()
+
+    @classmethod
+    def from_csv(cls, path: str) -> "ResourceGrid":
+        """Load a grid from CSV with latitude, longitude, ghi_kwh_m2_day and wind_speed_ms columns"""
+        with open(path, encoding="utf-8") as f:
+            lines = [line for line in f if line.strip() and not line.startswith("#")]
+        header = [name.strip() for name in lines[0].split(",")]
+        rows = np.loadtxt(lines[1:], delimiter=",", ndmin=2)
+        column = {name: rows[:, i] for i, name in enumerate(header)}
+        lat, lon = column["latitude"], column["longitude"]
+
+        latitudes = np.unique(lat)
+        longitudes = np.unique(lon)
+        if len(latitudes) < 2 or len(longitudes) < 2 or len(rows) != len(latitudes) * len(longitudes):
+            raise ValueError("resource grid must cover every cell of a regular latitude/longitude grid")
+        if not (np.allclose(np.diff(latitudes), latitudes[1] - latitudes[0])
+                and np.allclose(np.diff(longitudes), longitudes[1] - longitudes[0])):
+            raise ValueError("resource grid spacing must be uniform")
+
+        i = np.searchsorted(latitudes, lat)
+        j = np.searchsorted(longitudes, lon)
+        ghi = np.empty((len(latitudes), len(longitudes)))
+        wind_speed = np.empty_like(ghi)
+        ghi[i, j] = column["ghi_kwh_m2_day"]
+        wind_speed[i, j] = column["wind_speed_ms"]
+        return cls(latitudes, longitudes, ghi, wind_speed)
+
+    def lookup(self, latitude: float, longitude: float, method: str = RESOURCE_INTERPOLATION) -> Tuple[float, float]:
+        """(GHI, wind speed) at a point; points outside the grid use the nearest edge"""
+        y = min(max((latitude - self.lat0) / self.dlat, 0.0), self.nlat - 1.0)
+        x = min(max((longitude - self.lon0) / self.dlon, 0.0), self.nlon - 1.0)
+        if method == "nearest":
+            i, j = int(y + 0.5), int(x + 0.5)
+            return self._ghi_rows[i][j], self._wind_rows[i][j]
+
+        i = min(int(y), self.nlat - 2)
+        j = min(int(x), self.nlon - 2)
+        ty, tx = y - i, x - j
+        w00, w01, w10, w11 = (1 - ty) * (1 - tx), (1 - ty) * tx, ty * (1 - tx), ty * tx
+        g0, g1 = self._ghi_rows[i], self._ghi_rows[i + 1]
+        v0, v1 = self._wind_rows[i], self._wind_rows[i + 1]
+        return (
+            w00 * g0[j] + w01 * g0[j + 1] + w10 * g1[j] + w11 * g1[j + 1],
+            w00 * v0[j] + w01 * v0[j + 1] + w10 * v1[j] + w11 * v1[j + 1],
+        )
+
+    def lookup_array(self, latitude: np.ndarray, longitude: np.ndarray,
+                     method: str = RESOURCE_INTERPOLATION) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized lookup for arrays of points"""
+        y = np.clip((np.asarray(latitude, dtype=np.float64) - self.lat0) / self.dlat, 0.0, self.nlat - 1.0)
+        x = np.clip((np.asarray(longitude, dtype=np.float64) - self.lon0) / self.dlon, 0.0, self.nlon - 1.0)
+        if method == "nearest":
+            i, j = np.floor(y + 0.5).astype(np.intp), np.floor(x + 0.5).astype(np.intp)
+            return self.ghi[i, j], self.wind_speed[i, j]
+
+        i = np.minimum(y.astype(np.intp), self.nlat - 2)
+        j = np.minimum(x.astype(np.intp), self.nlon - 2)
+        ty, tx = y - i, x - j
+        w00, w01, w10, w11 = (1 - ty) * (1 - tx), (1 - ty) * tx, ty * (1 - tx), ty * tx
+
+        def interpolate(values):
+            # Same weights and order of operations as lookup(), so batch and single-site values agree to the bit
+            return w00 * values[i, j] + w01 * values[i, j + 1] + w10 * values[i + 1, j] + w11 * values[i + 1, j + 1]
+
+        return interpolate(self.ghi), interpolate(self.wind_speed)
+
+
+def solar_factor(ghi):
+    """Scale of solar generation relative to the reference irradiance (scalars or arrays)"""
+    return ghi / REFERENCE_GHI
+
+
+def wind_factor(wind_speed: float) -> float:
+    """Scale of wind generation relative to the reference wind speed"""
+    return min(max((wind_speed / REFERENCE_WIND_SPEED) ** 3, MIN_WIND_FACTOR), MAX_WIND_FACTOR)
+
+
+def wind_factor_array(wind_speed: np.ndarray) -> np.ndarray:
+    """Vectorized wind_factor()"""
+    return np.clip((wind_speed / REFERENCE_WIND_SPEED) ** 3, MIN_WIND_FACTOR, MAX_WIND_FACTOR)
+
+
+_grid = None
+_grid_lock = threading.Lock()
+
+
+def get_resource_grid() -> ResourceGrid:
+    """Load the shared resource grid on first use"""
+    global _grid
+    if _grid is None:
+        with _grid_lock:
+            if _grid is None:
+                _grid = ResourceGrid.from_csv(RESOURCE_GRID_FILE)
+    return _grid
@@ -0,0 +1,42 @@
+"""
+Gunicorn settings for production serving:
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is loaded once in the master (preload_app), so the resource grid and
+gazetteer are read before forking and shared by the workers. Each worker then
+starts its own LM Studio connection and health prober, without waiting on
+LM Studio, and stops them again on a graceful shutdown (SIGTERM).
+"""
+
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", os.cpu_count() or 1))
+# A summary poll can reach any worker, so with several workers async summary jobs are shared through
+# SQLite unless a Redis store is configured (SUMMARY_JOB_DB="" keeps them per process: needs sticky routing)
+if workers > 1 and not os.environ.get("SUMMARY_JOB_REDIS_URL"):
+    os.environ.setdefault("SUMMARY_JOB_DB",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "summary_jobs.sqlite"))
+# Threads keep a worker serving while its other requests wait on LM Studio or stream summaries
+worker_class = "gthread"
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+# Recycle workers after this many requests (0 = never), jittered so they do not restart together
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+
+def post_fork(server, worker):
+    """Start the worker's LM Studio connection and health prober"""
+    from app import start_background
+    start_background()
+
+
+def worker_exit(server, worker):
+    """Let queued summaries finish and close the LM Studio connection"""
+    from app import shutdown
+    shutdown()
@@ -1,24 +1,58 @@
 import os
 import requests
 import json
-from typing import Dict, Any
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List
+from requests.adapters import HTTPAdapter
+
+from prompts import (
+    SUMMARY_SENTENCES, STOP_SEQUENCES, build_messages, estimate_tokens, prompt_tokens, token_budget,
+)
+
+
+# Gateway errors that are worth another attempt while the deadline allows
+RETRY_STATUSES = (502, 503, 504)
+
+
+class LocalLMError(Exception):
+    """Raised when LM Studio fails to produce a recommendation"""
+
 
 class LocalLM:
     """Wrapper for local language models using LM Studio API"""
-    
-    def __init__(self, api_base=None):
-        """Initialize the connection to LM Studio API"""
+
+    def __init__(self, api_base=None, pool_size=None, connect_timeout=None, read_timeout=None, max_retries=None,
+                 max_in_flight=None, check_connection=True):
+        """Initialize the connection to LM Studio API (check_connection=False skips the blocking startup test)"""
         # Default URL for LM Studio's API - this is the standard port
         if api_base is None:
             # Use environment variable if set, otherwise use the default LM Studio port
             self.api_base = os.environ.get("LM_STUDIO_API_BASE", "http://localhost:1234/v1")
         else:
             self.api_base = api_base
-            
+
+        # Concurrent completions allowed at once, matched to the model server's parallel slots
+        self.max_in_flight = max_in_flight or int(os.environ.get("LM_MAX_IN_FLIGHT", 4))
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+
+        # Connection pool and timeout settings
+        self.pool_size = max(pool_size or int(os.environ.get("LM_POOL_SIZE", 4)), self.max_in_flight)
+        self.connect_timeout = connect_timeout or float(os.environ.get("LM_CONNECT_TIMEOUT", 3))
+        self.read_timeout = read_timeout or float(os.environ.get("LM_READ_TIMEOUT", 30))
+        self.max_retries = max_retries if max_retries is not None else int(os.environ.get("LM_MAX_RETRIES", 2))
+        self.retry_backoff = float(os.environ.get("LM_RETRY_BACKOFF", 0.3))
+        self.session = self._create_session()
+        # Optional callback(prompt_tokens, completion_tokens, elapsed_seconds, mode) called after each generation
+        self.on_usage = None
+
         print(f"Using LM Studio API at: {self.api_base}")
-        
+
         # Test the connection
         self.is_connected = False
+        if not check_connection:
+            return
         try:
             self.is_connected = self.test_connection()
             if self.is_connected:
@@ -27,87 +61,222 @@ class LocalLM:
                 print("LM Studio API connection failed. Is LM Studio running with the API server enabled?")
         except Exception as e:
             print(f"Error connecting to LM Studio API: {e}")
-    
+
+    def _create_session(self) -> requests.Session:
+        """Keep-alive session with a connection pool (completions are retried by _post, within their deadline)"""
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Content-Type": "application/json"})
+        return session
+
     def test_connection(self):
         """Test the connection to the LM Studio API"""
         try:
             # Simple request to check if the API is responding
-            response = requests.get(f"{self.api_base}/models")
+            response = self.session.get(f"{self.api_base}/models", timeout=(self.connect_timeout, self.connect_timeout))
             if response.status_code == 200:
                 models = response.json()
+                # OpenAI-compatible servers wrap the list in {"data": [...]}
+                if isinstance(models, dict):
+                    models = models.get("data", [])
                 if isinstance(models, list) and len(models) > 0:
                     print(f"Available models: {', '.join([m.get('id', 'unknown') for m in models])}")
                 return True
             return False
         except Exception:
             return False
-    
-    def generate_energy_recommendation(self, data: Dict[str, Any]) -> str:
-        """Generate energy recommendations using LM Studio API"""
-        # Extract relevant data
-        location = data["location"]
-        usage_type = data["usage_type"]
-        system_type = data["system_type"]
-        size = data["recommended_size_kw"]
-        generation = data["estimated_generation_kwh"]
-        savings = data["monthly_savings"]
-        cost = data["system_cost"]
-        payback = data["payback_years"]
-        
-        # Create a prompt for the model
-        prompt = f"""You are an energy expert providing recommendations for renewable energy solutions.
-        
-Based on the following information:
-- Location: {location}
-- Usage Type: {usage_type}
-- System Type: {system_type}
-- System Size: {size} kW
-- Monthly Generation: {generation} kWh
-- Monthly Savings: ₹{savings}
-- Total System Cost: ₹{cost}
-- Payback Period: {payback} years
-
-Generate a detailed paragraph recommending this renewable energy system. Include information about benefits, savings, and environmental impact.
-Keep your response focused and concise (3-5 sentences only).
-"""
-        
-        # Create the API request
+
+    def _completion_payload(self, data: Dict[str, Any], stream: bool = False,
+                            sentences: int = SUMMARY_SENTENCES) -> Dict[str, Any]:
+        """Request body for the chat completions endpoint"""
+        payload = {
+            "model": "local-model",  # LM Studio uses this as default name
+            "messages": build_messages(data, sentences),
+            "temperature": 0.7,
+            "max_tokens": token_budget(sentences),
+            "stop": STOP_SEQUENCES,
+            "stream": stream
+        }
+        if stream:
+            payload["stream_options"] = {"include_usage": True}  # token counts in the last chunk
+        return payload
+
+    def _report_usage(self, messages, usage, text: str, elapsed: float, mode: str):
+        """Pass a call's prompt and completion token counts to on_usage (estimated if the server sent none)"""
+        if self.on_usage is None:
+            return
+        usage = usage or {}
+        completion = usage.get("completion_tokens") or estimate_tokens(text)
+        if completion:
+            self.on_usage(prompt_tokens(messages, usage.get("prompt_tokens")), completion, elapsed, mode)
+
+    def _acquire_slot(self, deadline: float):
+        """Wait for a model slot until the deadline, raising LocalLMError if none frees up"""
+        if not self._slots.acquire(timeout=max(0.0, deadline - time.perf_counter())):
+            raise LocalLMError("No free model slot before the deadline")
+
+    def _post(self, body: Dict[str, Any], deadline: float, stream: bool = False) -> requests.Response:
+        """POST a completion request, retrying connection failures and gateway errors until the deadline"""
+        attempt = 0
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise LocalLMError("The local model did not answer before the deadline")
+            try:
+                response = self.session.post(
+                    f"{self.api_base}/chat/completions",
+                    json=body,
+                    timeout=(min(self.connect_timeout, remaining), remaining),  # when streaming, between chunks
+                    stream=stream
+                )
+            except requests.ConnectionError as e:
+                error = e
+            except Exception as e:
+                print(f"Error calling LM Studio API: {e}")
+                raise LocalLMError(f"Unable to connect to the local model: {e}") from e
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+                response.close()
+                error = f"API returned {response.status_code}"
+            # Only connection failures and gateway errors are retried; a slow generation is not
+            backoff = self.retry_backoff * 2 ** attempt
+            attempt += 1
+            if attempt > self.max_retries or time.perf_counter() + backoff >= deadline:
+                print(f"Error calling LM Studio API: {error}")
+                raise LocalLMError(f"Unable to connect to the local model: {error}")
+            time.sleep(backoff)
+
+    def generate_energy_recommendation(self, data: Dict[str, Any], timeout=None) -> str:
+        """Generate energy recommendations using LM Studio API.
+
+        `timeout` (default: the read timeout) bounds the whole call: waiting for a
+        model slot, every retry and the generation itself.
+        """
+        return self._generate(data, time.perf_counter() + (timeout or self.read_timeout))
+
+    def _generate(self, data: Dict[str, Any], deadline: float) -> str:
+        """Completion for generate_energy_recommendation(), finished by a perf_counter() deadline"""
+        start_time = time.perf_counter()
+        payload = self._completion_payload(data)
+        self._acquire_slot(deadline)
         try:
-            response = requests.post(
-                f"{self.api_base}/chat/completions",
-                headers={"Content-Type": "application/json"},
-                json={
-                    "model": "local-model",  # LM Studio uses this as default name
-                    "messages": [
-                        {"role": "system", "content": "You are an energy expert assistant."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    "temperature": 0.7,
-                    "max_tokens": 256
-                },
-                timeout=30  # Add a timeout in case the API is slow to respond
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                # Extract generated text from response
-                if "choices" in result and len(result["choices"]) > 0:
-                    message = result["choices"][0]["message"]
-                    if "content" in message:
-                        return message["content"].strip()
-            
-            # If we get here, something went wrong
-            print(f"API Error: {response.status_code} - {response.text}")
-            return f"Unable to generate recommendation. API returned: {response.status_code}"
-        
-        except Exception as e:
-            print(f"Error calling LM Studio API: {e}")
-            return "Unable to generate recommendation due to an error connecting to the local model."
-    
+            response = self._post(payload, deadline)
+        finally:
+            self._slots.release()
+
+        if response.status_code == 200:
+            result = response.json()
+            # Extract generated text from response
+            if "choices" in result and len(result["choices"]) > 0:
+                message = result["choices"][0]["message"]
+                if "content" in message:
+                    self._report_usage(payload["messages"], result.get("usage"), message["content"],
+                                       time.perf_counter() - start_time, "completion")
+                    return message["content"].strip()
+
+        # If we get here, something went wrong
+        print(f"API Error: {response.status_code} - {response.text}")
+        raise LocalLMError(f"Unable to generate recommendation. API returned: {response.status_code}")
+
+    def stream_energy_recommendation(self, data: Dict[str, Any], timeout=None) -> Iterator[str]:
+        """Generate energy recommendations, yielding text chunks as the model produces them.
+
+        `timeout` (default: the read timeout) bounds the wait for a model slot and
+        the first response, retries included, and then each gap between chunks.
+        """
+        deadline = time.perf_counter() + (timeout or self.read_timeout)
+        # Hold a model slot for the whole stream
+        self._acquire_slot(deadline)
+        try:
+            yield from self._stream(data, deadline)
+        finally:
+            self._slots.release()
+
+    def _stream(self, data: Dict[str, Any], deadline: float) -> Iterator[str]:
+        """Read the streamed completion for stream_energy_recommendation()"""
+        start_time = time.perf_counter()
+        body = self._completion_payload(data, stream=True)
+        response = self._post(body, deadline, stream=True)
+
+        with response:
+            if response.status_code != 200:
+                print(f"API Error: {response.status_code} - {response.text}")
+                raise LocalLMError(f"Unable to generate recommendation. API returned: {response.status_code}")
+
+            # OpenAI-compatible servers send "data: {json}" lines, ending with "data: [DONE]"
+            chunks = 0  # each content delta is about one token
+            usage = None  # sent in the last chunk by servers that honor stream_options
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                payload = line[len("data:"):].strip()
+                if payload == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(payload)
+                except ValueError:
+                    continue
+                usage = chunk.get("usage") or usage
+                choices = chunk.get("choices") or []
+                if choices:
+                    text = (choices[0].get("delta") or {}).get("content")
+                    if text:
+                        chunks += 1
+                        yield text
+            if chunks:
+                usage = dict(usage or {})
+                usage["completion_tokens"] = usage.get("completion_tokens") or chunks
+                self._report_usage(body["messages"], usage, "", time.perf_counter() - start_time, "stream")
+
+    def generate_batch(self, items: List[Dict[str, Any]], max_in_flight=None, timeout=None) -> List[Dict[str, Any]]:
+        """Generate recommendations for many inputs concurrently.
+
+        Identical prompts are sent once. Results come back in input order as
+        {"summary", "error", "elapsed", "duplicate_of"}, where a failed item has
+        summary None and duplicate_of is the index of the item whose result was reused.
+        """
+        keys = [json.dumps(self._completion_payload(data), sort_keys=True) for data in items]
+        first_index = {}
+        for i, key in enumerate(keys):
+            first_index.setdefault(key, i)
+
+        # One deadline for the whole batch, so items queued behind busy slots cannot run past it
+        deadline = time.perf_counter() + (timeout or self.read_timeout)
+
+        def run(i):
+            start_time = time.perf_counter()
+            try:
+                return self._generate(items[i], deadline), None, time.perf_counter() - start_time
+            except Exception as e:
+                return None, str(e), time.perf_counter() - start_time
+
+        results = []
+        if not items:
+            return results
+        workers = min(max_in_flight or self.max_in_flight, len(first_index))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lm-batch") as pool:
+            futures = {key: pool.submit(run, i) for key, i in first_index.items()}
+            for i, key in enumerate(keys):
+                summary, error, elapsed = futures[key].result()
+                results.append({
+                    "summary": summary,
+                    "error": error,
+                    "elapsed": round(elapsed, 3),
+                    "duplicate_of": first_index[key] if first_index[key] != i else None,
+                })
+        return results
+
     def is_available(self) -> bool:
         """Check if the API is available"""
         return self.is_connected
 
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
+
 
 # Singleton pattern for API reuse
 _api_instance = None
@@ -127,81 +296,9 @@ def get_model_instance(api_base=None):
                 print("3. Click 'API' tab")
                 print("4. Toggle on 'Local Server'")
                 print("5. Make sure it shows 'Running on http://localhost:1234'")
+                _api_instance.close()
                 _api_instance = None
         except Exception as e:
             print(f"Error initializing LM Studio API connection: {e}")
             _api_instance = None
     return _api_instance
-    
-    def generate_energy_recommendation(self, data: Dict[str, Any]) -> str:
-        """Generate energy recommendations based on user data"""
-        # Extract relevant data
-        location = data["location"]
-        usage_type = data["usage_type"]
-        system_type = data["system_type"]
-        size = data["recommended_size_kw"]
-        generation = data["estimated_generation_kwh"]
-        savings = data["monthly_savings"]
-        cost = data["system_cost"]
-        payback = data["payback_years"]
-        
-        # Create a prompt for the model
-        prompt = f"""You are an energy expert providing recommendations for renewable energy solutions.
-        
-Based on the following information:
-- Location: {location}
-- Usage Type: {usage_type}
-- System Type: {system_type}
-- System Size: {size} kW
-- Monthly Generation: {generation} kWh
-- Monthly Savings: ₹{savings}
-- Total System Cost: ₹{cost}
-- Payback Period: {payback} years
-
-Generate a detailed paragraph recommending this renewable energy system. Include information about benefits, savings, and environmental impact.
-Keep your response focused and concise (3-5 sentences only).
-"""
-
-        # Generate response
-        response = self.model(
-            prompt,
-            max_tokens=256,
-            temperature=0.7,
-            top_p=0.9,
-            repeat_penalty=1.1,
-            stop=["###", "\n\n"],
-            echo=False
-        )
-        
-        # Extract the generated text
-        generated_text = response["choices"][0]["text"].strip()
-        
-        return generated_text
-    
-    def is_available(self) -> bool:
-        """Check if the model is properly loaded and available"""
-        try:
-            # Try a simple generation to check if model works
-            response = self.model(
-                "Hello, are you working?",
-                max_tokens=10,
-                echo=False
-            )
-            return True
-        except Exception:
-            return False
-
-
-# Singleton pattern for model reuse
-_model_instance = None
-
-def get_model_instance(model_path=None):
-    """Get or create a singleton model instance"""
-    global _model_instance
-    if _model_instance is None:
-        try:
-            _model_instance = LocalLM(model_path)
-        except Exception as e:
-            print(f"Error loading model: {e}")
-            _model_instance = None
-    return _model_instance
\ No newline at end of file
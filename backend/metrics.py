@@ -0,0 +1,245 @@
+"""
+Low-overhead request metrics with a Prometheus text exposition.
+
+Counters and histograms live in process memory behind one lock each; an
+observation is a bisect and two additions. Request handlers time their stages
+with a `StageTimer`, whose `lap()` costs one `perf_counter()` call, and the
+laps are recorded once at the end of the request under the site's usage type.
+Slow requests can be profiled with cProfile on a sampled fraction of traffic.
+"""
+
+import cProfile
+import math
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+METRICS_PROFILE_SAMPLE = float(os.environ.get("METRICS_PROFILE_SAMPLE", 0))  # fraction of requests profiled
+METRICS_PROFILE_SLOW_MS = float(os.environ.get("METRICS_PROFILE_SLOW_MS", 500))  # dump profiles slower than this
+METRICS_PROFILE_DIR = os.environ.get("METRICS_PROFILE_DIR", "profiles")
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 250)
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Prometheus label set, e.g. {stage="parse",le="0.1"}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    """Escape a label value for the text format"""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    """Sample value in the text format"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        """Add to the counter for a label set"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def collect(self) -> List[str]:
+        """Text-format lines"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        """Record one observation for a label set"""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 3)
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def collect(self) -> List[str]:
+        """Text-format lines"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (math.inf,), series):
+                    cumulative += count
+                    le = f'le="{_number(bound)}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-2])}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Gauge:
+    """Gauge read from a callback at scrape time, returning {label values: value}"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...],
+                 read: Callable[[], Dict[Tuple[str, ...], float]]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.read = read
+
+    def collect(self) -> List[str]:
+        """Text-format lines"""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.read().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Registry:
+    """Set of metrics rendered together"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        """Add a metric and return it"""
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.collect())
+            except Exception as e:
+                print(f"Error collecting metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_SECONDS = registry.register(Histogram(
+    "http_request_duration_seconds", "Request latency by endpoint", ("endpoint", "method", "status")))
+STAGE_SECONDS = registry.register(Histogram(
+    "recommend_stage_duration_seconds", "Time spent in each stage of a recommendation", ("stage", "usage_type")))
+SUMMARY_SECONDS = registry.register(Histogram(
+    "summary_duration_seconds", "Summary latency by path (llm, cache, template)", ("path",)))
+LLM_PROMPT_TOKENS = registry.register(Counter(
+    "llm_prompt_tokens_total", "Prompt tokens sent to the local model", ("mode",)))
+LLM_TOKENS = registry.register(Counter(
+    "llm_completion_tokens_total", "Tokens generated by the local model", ("mode",)))
+LLM_TOKEN_RATE = registry.register(Histogram(
+    "llm_tokens_per_second", "Generation throughput of each local model call", ("mode",), RATE_BUCKETS))
+
+
+def cache_gauge(name: str, caches: Callable[[], Dict[str, Optional[object]]]):
+    """Register hit/miss gauges for caches exposing stats(), read at scrape time"""
+    def read(field):
+        values = {}
+        for cache_name, cache in caches().items():
+            if cache is not None:
+                values[(cache_name,)] = cache.stats()[field]
+        return values
+
+    registry.register(Gauge(f"{name}_hit_ratio", "Cache hit ratio", ("cache",), lambda: read("hit_ratio")))
+    registry.register(Gauge(f"{name}_hits", "Cache hits", ("cache",), lambda: read("hits")))
+    registry.register(Gauge(f"{name}_misses", "Cache misses", ("cache",), lambda: read("misses")))
+    registry.register(Gauge(f"{name}_entries", "Cached entries", ("cache",), lambda: read("entries")))
+
+
+def record_llm_usage(prompt_tokens: int, tokens: int, elapsed: float, mode: str = "completion"):
+    """Record a local model call's prompt and generated tokens, and its throughput"""
+    LLM_PROMPT_TOKENS.inc(prompt_tokens, mode=mode)
+    LLM_TOKENS.inc(tokens, mode=mode)
+    if elapsed > 0 and tokens:
+        LLM_TOKEN_RATE.observe(tokens / elapsed, mode=mode)
+
+
+class StageTimer:
+    """Lap timer for the stages of one request"""
+    __slots__ = ('laps', '_last')
+
+    def __init__(self):
+        self.laps: List[Tuple[str, float]] = []
+        self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Attribute the time since the previous lap (or the start) to a stage"""
+        now = time.perf_counter()
+        self.laps.append((stage, now - self._last))
+        self._last = now
+
+    def skip(self):
+        """Start the next lap now, leaving the time since the previous one unattributed"""
+        self._last = time.perf_counter()
+
+    def record(self, usage_type: str):
+        """Add the laps to the stage histogram"""
+        for stage, seconds in self.laps:
+            STAGE_SECONDS.observe(seconds, stage=stage, usage_type=usage_type)
+
+
+_profile_lock = threading.Lock()  # only one profiler can be active at a time
+
+
+def start_profile() -> Optional[cProfile.Profile]:
+    """Profile this request if it is sampled and no other request is being profiled"""
+    if METRICS_PROFILE_SAMPLE <= 0 or random.random() >= METRICS_PROFILE_SAMPLE:
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:  # another profiler (e.g. a debugger) is active
+        _profile_lock.release()
+        return None
+    return profile
+
+
+def finish_profile(profile: cProfile.Profile, elapsed: float, endpoint: str):
+    """Stop a profile, writing it to METRICS_PROFILE_DIR if the request was slow"""
+    try:
+        profile.disable()
+    finally:
+        _profile_lock.release()
+    if elapsed * 1000 < METRICS_PROFILE_SLOW_MS:
+        return
+    os.makedirs(METRICS_PROFILE_DIR, exist_ok=True)
+    path = os.path.join(METRICS_PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{endpoint}-"
+                                             f"{int(elapsed * 1000)}ms.prof")
+    profile.dump_stats(path)
+    print(f"Slow request to {endpoint} ({elapsed * 1000:.0f} ms) profiled to {path}")
@@ -0,0 +1,114 @@
+"""
+System-size and technology optimizer.
+
+Instead of sizing at `monthly_consumption / 100` with a fixed technology per
+usage type, `optimize()` scores a grid of solar, wind and hybrid sizes with the
+same monthly bill model as `calculator.compute()`, projects their cashflows
+with `finance.project()` and picks the best one by net present value or
+payback. Candidates are first pruned without touching the tariff (over budget,
+below the minimum size, or adding capacity that cannot save anything more),
+then the survivors are billed and projected in one vectorized pass.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from finance import annual_om, degraded, project
+from tariffs import Tariff
+
+OPT_GRID_STEPS = int(os.environ.get("OPT_GRID_STEPS", 40))  # sizes tried per technology
+
+OBJECTIVES = ("npv", "payback")
+
+
+@dataclass
+class Optimum:
+    """Chosen sizes and how many candidates were considered"""
+    __slots__ = ('solar_kw', 'wind_kw', 'objective', 'candidates', 'evaluated')
+    solar_kw: float
+    wind_kw: float
+    objective: str
+    candidates: int  # size combinations on the grid
+    evaluated: int  # combinations left after pruning and billed
+
+
+def _sizes(monthly_kwh_per_kw: float, monthly_consumption: float, min_size_kw: float, steps: int,
+           net_cost_per_kw: float = 0.0, budget: Optional[float] = None) -> np.ndarray:
+    """Candidate sizes for one technology, from zero up to the size that covers the whole consumption.
+
+    With a budget the grid stops at the largest size the budget pays for, so its
+    steps stay fine enough to find an affordable system however large the site.
+    """
+    if monthly_kwh_per_kw <= 0:
+        return np.zeros(1)
+    upper = monthly_consumption / monthly_kwh_per_kw
+    if budget is not None and net_cost_per_kw > 0:
+        upper = min(upper, budget / net_cost_per_kw)
+    upper = max(upper, min_size_kw)
+    step = max(round(upper / steps, 1), 0.1)
+    return np.round(np.arange(0.0, upper + step, step), 1)
+
+
+def optimize(monthly_consumption: float, tariff: float, plan: Optional[Tariff],
+             solar_kwh_per_kw: float, wind_kwh_per_kw: float, solar_cost_per_kw: float, wind_cost_per_kw: float,
+             solar_subsidy: float = 0.0, min_size_kw: float = 0.0, budget: Optional[float] = None,
+             objective: str = "npv", steps: int = OPT_GRID_STEPS) -> Optimum:
+    """Best solar and wind sizes for a site.
+
+    `*_kwh_per_kw` are monthly kWh per kW installed at the site; a technology
+    with no output is never chosen. `solar_subsidy` is the fraction of the solar
+    cost covered by subsidy. Raises ValueError if no candidate fits the budget.
+    """
+    if objective not in OBJECTIVES:
+        raise ValueError(f"optimize must be one of: {', '.join(OBJECTIVES)}")
+
+    solar_sizes = _sizes(solar_kwh_per_kw, monthly_consumption, min_size_kw, steps,
+                         solar_cost_per_kw * (1 - solar_subsidy), budget)
+    wind_sizes = _sizes(wind_kwh_per_kw, monthly_consumption, min_size_kw, steps, wind_cost_per_kw, budget)
+    solar_kw, wind_kw = (grid.ravel() for grid in np.meshgrid(solar_sizes, wind_sizes))
+    candidates = len(solar_kw)
+
+    # Costs, rounded the same way as calculator.compute()
+    solar_gross = solar_kw * solar_cost_per_kw
+    wind_gross = wind_kw * wind_cost_per_kw
+    gross_cost = np.trunc(solar_gross + wind_gross)
+    subsidy = np.trunc(np.trunc(solar_gross) * solar_subsidy)
+    system_cost = gross_cost - subsidy
+
+    # Prune before billing: empty or undersized systems, over budget, and hybrids where
+    # one technology alone already covers the consumption (the other only adds cost)
+    solar_output = solar_kw * solar_kwh_per_kw
+    wind_output = wind_kw * wind_kwh_per_kw
+    keep = (solar_kw + wind_kw > 0) & (solar_kw + wind_kw >= min_size_kw)
+    keep &= ~((solar_output >= monthly_consumption) & (wind_kw > 0))
+    keep &= ~((wind_output >= monthly_consumption) & (solar_kw > 0))
+    sized = keep.copy()
+    if budget is not None:
+        keep &= system_cost <= budget
+    if not keep.any():
+        if budget is not None and sized.any():
+            cheapest = float(system_cost[sized].min())
+            raise ValueError(f"budget of ₹{budget:,.0f} does not cover the smallest system (₹{cheapest:,.0f})")
+        return Optimum(0.0, 0.0, objective, candidates, 0)
+
+    solar_kw, wind_kw, system_cost = solar_kw[keep], wind_kw[keep], system_cost[keep]
+    generation = degraded(np.trunc(solar_output[keep] + wind_output[keep]))
+
+    # Monthly bill model of calculator.compute() for every year of operation
+    current_bill = monthly_consumption * tariff
+    new_consumption = np.maximum(0.0, monthly_consumption - generation)
+    new_bill = plan.bill_array(new_consumption) if plan is not None else new_consumption * tariff
+    om = annual_om(np.trunc(solar_gross[keep]), np.trunc(wind_gross[keep]))
+    projection = project(current_bill - new_bill, generation, gross_cost[keep], subsidy[keep], om, with_irr=False)
+    values = projection["npv"]
+
+    if objective == "npv":
+        # Highest NPV, cheapest first among ties
+        best = np.lexsort((system_cost, -values))[0]
+    else:
+        best = np.lexsort((-values, projection["payback_years"]))[0]
+
+    return Optimum(float(solar_kw[best]), float(wind_kw[best]), objective, candidates, int(keep.sum()))
@@ -0,0 +1,70 @@
+"""
+Prompts and generation limits for the local model's summaries.
+
+Every request starts with the same system message, so a model server that
+reuses the KV cache across requests with a common prefix (LM Studio and
+llama.cpp do) only has to process the short per-site line that follows. The
+site facts are written as one compact line, the completion gets a token budget
+sized to the number of sentences asked for, and stop sequences end generation
+at the end of the paragraph.
+"""
+
+import os
+from typing import Dict, Any, List, Optional
+
+SUMMARY_SENTENCES = int(os.environ.get("LM_SUMMARY_SENTENCES", 4))
+TOKENS_PER_SENTENCE = int(os.environ.get("LM_TOKENS_PER_SENTENCE", 40))
+BUDGET_MARGIN = 16  # tokens for the last sentence to finish
+MAX_TOKENS = int(os.environ.get("LM_MAX_TOKENS", 256))  # hard cap on any completion
+
+# A paragraph ends at the first blank line; the rest stop chat-style continuations
+STOP_SEQUENCES = ["\n\n", "\nUser:", "\n###"]
+
+# Shared by every request; keep it byte-for-byte stable so the server can reuse its cached prefix
+SYSTEM_PROMPT = (
+    "You are an energy expert. Write one plain paragraph recommending the renewable energy system described "
+    "by the user, covering its benefits, savings and environmental impact. No headings, lists or preamble."
+)
+
+
+def _value(value) -> str:
+    """Short text for a number (5.0 -> 5, 1234.5 -> 1234.5)"""
+    if isinstance(value, float):
+        return f"{value:g}" if abs(value) < 1e6 else f"{value:.0f}"
+    return str(value)
+
+
+def user_prompt(data: Dict[str, Any], sentences: int = SUMMARY_SENTENCES) -> str:
+    """The per-site part of the prompt"""
+    return (
+        f"Location: {data['location']}; use: {data['usage_type']}; system: {data['system_type']}; "
+        f"size: {_value(data['recommended_size_kw'])} kW; "
+        f"generation: {_value(data['estimated_generation_kwh'])} kWh/month; "
+        f"savings: ₹{_value(data['monthly_savings'])}/month; cost: ₹{_value(data['system_cost'])}; "
+        f"payback: {_value(data['payback_years'])} years. Answer in {sentences} sentences."
+    )
+
+
+def build_messages(data: Dict[str, Any], sentences: int = SUMMARY_SENTENCES) -> List[Dict[str, str]]:
+    """Chat messages for a summary: the shared system prefix, then the site"""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": user_prompt(data, sentences)},
+    ]
+
+
+def token_budget(sentences: int = SUMMARY_SENTENCES) -> int:
+    """max_tokens for a summary of this many sentences"""
+    return max(1, min(MAX_TOKENS, sentences * TOKENS_PER_SENTENCE + BUDGET_MARGIN))
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) for servers that do not report usage"""
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+def prompt_tokens(messages: List[Dict[str, str]], reported: Optional[int] = None) -> int:
+    """Prompt tokens as reported by the server, else estimated from the messages"""
+    if reported:
+        return reported
+    return sum(estimate_tokens(message["content"]) for message in messages)
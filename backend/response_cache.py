@@ -0,0 +1,99 @@
+"""
+Cache of /api/recommend responses, keyed on the canonical form of the request.
+
+The key is built from the parsed site rather than the raw body, so numbers
+of equal value (350 and 350.0), slab rates in any order, and slab rates left
+out or sent at their defaults all map to the same entry. A named tariff is
+keyed by its name together with its tiers and rates, so re-registering a
+tariff never serves a stale response. Entries live in an in-process LRU with a TTL and can
+be shared by every worker through a SQLite file or a Redis-compatible server.
+"""
+
+import hashlib
+import json
+import os
+from typing import Dict, Any, Optional
+
+from cache import LRUCache, SQLiteStore, RedisStore
+from calculator import SiteInput
+
+
+def canonical_request(site: SiteInput, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Normalized request, or None if its response must not be cached"""
+    if data.get('asyncSummary'):
+        return None  # carries a per-request summary job
+    if site.uncertainty is not None and site.uncertainty["seed"] is None:
+        return None  # fresh random samples on every request
+    plan = site.tariff_plan
+    return {
+        "location": site.location,
+        "usage_type": site.usage_type,
+        "monthly_consumption": float(site.monthly_consumption),
+        "tariff": float(site.tariff),
+        "tariff_plan": dict(plan.to_dict(), name=plan.name) if plan is not None else None,
+        "budget": float(site.budget) if site.budget is not None else None,
+        "latitude": float(site.latitude) if site.latitude is not None else None,
+        "longitude": float(site.longitude) if site.longitude is not None else None,
+        "simulate": site.simulate,
+        "finance": site.finance,
+        "optimize": site.optimize,
+        "uncertainty": site.uncertainty,
+    }
+
+
+def request_key(site: SiteInput, data: Dict[str, Any]) -> Optional[str]:
+    """Cache key for a request, or None if it is not cacheable"""
+    canonical = canonical_request(site, data)
+    if canonical is None:
+        return None
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag (unquoted) for a response body"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+
+class ResponseCache:
+    """LRU/TTL cache of serialized response bodies, optionally shared through SQLite or Redis"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 db_path: Optional[str] = None, redis_url: Optional[str] = None):
+        store = None
+        if redis_url:
+            store = RedisStore(redis_url, ttl=ttl, prefix="response:")
+        elif db_path:
+            store = SQLiteStore(db_path, ttl=ttl, max_entries=max_entries * 10)
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, store=store)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached response body, or None"""
+        return self._cache.get(key)
+
+    def set(self, key: str, body: bytes):
+        """Remember a response body"""
+        self._cache.set(key, body)
+
+    def clear(self):
+        """Drop every cached response"""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        return self._cache.stats()
+
+
+def response_cache_from_env() -> Optional[ResponseCache]:
+    """Build the response cache from RESPONSE_CACHE_* environment variables (None when disabled)"""
+    size = int(os.environ.get("RESPONSE_CACHE_SIZE", 1024))
+    if size <= 0:
+        return None
+    max_bytes = os.environ.get("RESPONSE_CACHE_MAX_BYTES", 16 * 1024 * 1024)
+    return ResponseCache(
+        max_entries=size,
+        max_bytes=int(max_bytes) if max_bytes else None,
+        ttl=float(os.environ.get("RESPONSE_CACHE_TTL", 300)),
+        db_path=os.environ.get("RESPONSE_CACHE_DB") or None,
+        redis_url=os.environ.get("RESPONSE_CACHE_REDIS_URL") or None,
+    )
@@ -0,0 +1,64 @@
+"""
+Recent evaluations by result id, for incremental /api/recommend follow-ups.
+
+Every response carries a `result_id`. When a follow-up request sends it back as
+`previousResultId`, `calculator.evaluate()` reuses the outputs of every stage
+whose inputs did not change, so editing the tariff slabs re-bills the site
+without re-sizing it, and the summary is reused when none of its inputs moved.
+Evaluations hold live Python objects, so they are kept in process memory; a
+follow-up that reaches another worker, or arrives after its entry expired,
+is simply computed from scratch.
+"""
+
+import os
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Any, Optional
+
+from cache import LRUCache
+from calculator import Evaluation
+
+
+@dataclass
+class StoredResult:
+    """An evaluation and the summary generated for it"""
+    __slots__ = ('evaluation', 'summary_args', 'summary')
+    evaluation: Evaluation
+    summary_args: tuple  # inputs of the summary
+    summary: Optional[str]  # None while an async summary is pending
+
+
+class ResultStore:
+    """LRU/TTL store of recent evaluations keyed by a random result id"""
+
+    def __init__(self, max_entries: int = 1024, ttl: Optional[float] = 1800):
+        self._cache = LRUCache(max_entries=max_entries, ttl=ttl)
+
+    def get(self, result_id) -> Optional[StoredResult]:
+        """A stored result, or None if the id is unknown or expired"""
+        if not isinstance(result_id, str) or not result_id:
+            return None
+        return self._cache.get(result_id)
+
+    def put(self, evaluation: Evaluation, summary_args: tuple, summary: Optional[str],
+            request_key: Optional[str] = None) -> str:
+        """Store an evaluation and return its result id.
+
+        The id is derived from the request's canonical key when it has one, so
+        identical requests get identical responses (and ETags); otherwise it is random.
+        """
+        result_id = request_key[:32] if request_key else uuid.uuid4().hex
+        self._cache.set(result_id, StoredResult(evaluation, summary_args, summary))
+        return result_id
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        return self._cache.stats()
+
+
+def result_store_from_env() -> Optional[ResultStore]:
+    """Build the result store from RESULT_STORE_* environment variables (None when disabled)"""
+    size = int(os.environ.get("RESULT_STORE_SIZE", 1024))
+    if size <= 0:
+        return None
+    return ResultStore(max_entries=size, ttl=float(os.environ.get("RESULT_STORE_TTL", 1800)))
@@ -0,0 +1,74 @@
+"""
+Cache for LLM-generated summaries, keyed on a normalized hash of the prompt fields.
+"""
+
+import hashlib
+import json
+import math
+import os
+from typing import Dict, Any, Optional
+
+from cache import LRUCache, SQLiteStore
+
+# Fields of the LLM prompt that determine the summary
+TEXT_FIELDS = ("location", "usage_type", "system_type")
+NUMERIC_FIELDS = (
+    "recommended_size_kw", "estimated_generation_kwh", "monthly_savings", "system_cost", "payback_years",
+)
+
+
+def _bucket(value, significant_figures: Optional[int]):
+    """Round a number to a number of significant figures so near-identical values share a key"""
+    value = float(value)
+    if not significant_figures or value == 0 or not math.isfinite(value):
+        return value
+    digits = significant_figures - int(math.floor(math.log10(abs(value)))) - 1
+    return round(value, digits)
+
+
+def summary_cache_key(data: Dict[str, Any], significant_figures: Optional[int] = None) -> str:
+    """Stable hash of the summary inputs, with text normalized and numbers optionally bucketed"""
+    normalized = {field: " ".join(str(data[field]).lower().split()) for field in TEXT_FIELDS}
+    for field in NUMERIC_FIELDS:
+        normalized[field] = _bucket(data[field], significant_figures)
+    payload = json.dumps(normalized, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache:
+    """LRU/TTL cache of summaries, optionally persisted to SQLite"""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: Optional[int] = None, ttl: Optional[float] = None,
+                 db_path: Optional[str] = None, significant_figures: Optional[int] = None):
+        store = SQLiteStore(db_path, ttl=ttl, max_entries=max_entries * 10) if db_path else None
+        self.significant_figures = significant_figures
+        self._cache = LRUCache(max_entries=max_entries, max_bytes=max_bytes, ttl=ttl, store=store)
+
+    def key(self, data: Dict[str, Any]) -> str:
+        """Cache key for a summary request"""
+        return summary_cache_key(data, self.significant_figures)
+
+    def get(self, data: Dict[str, Any]) -> Optional[str]:
+        """Cached summary for these inputs, or None"""
+        return self._cache.get(self.key(data))
+
+    def set(self, data: Dict[str, Any], summary: str):
+        """Remember the summary generated for these inputs"""
+        self._cache.set(self.key(data), summary)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters"""
+        return self._cache.stats()
+
+
+def summary_cache_from_env() -> SummaryCache:
+    """Build the summary cache from SUMMARY_CACHE_* environment variables"""
+    sig_figs = os.environ.get("SUMMARY_CACHE_SIGFIGS")
+    max_bytes = os.environ.get("SUMMARY_CACHE_MAX_BYTES", 4 * 1024 * 1024)
+    return SummaryCache(
+        max_entries=int(os.environ.get("SUMMARY_CACHE_SIZE", 1024)),
+        max_bytes=int(max_bytes) if max_bytes else None,
+        ttl=float(os.environ.get("SUMMARY_CACHE_TTL", 86400)),
+        db_path=os.environ.get("SUMMARY_CACHE_DB") or None,
+        significant_figures=int(sig_figs) if sig_figs else None,
+    )
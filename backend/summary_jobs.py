@@ -0,0 +1,193 @@
+"""
+Background generation of LLM summaries.
+
+`/api/recommend` can hand the slow LLM call to a small pool of worker threads
+and return the numbers immediately; clients then fetch (or long-poll) the
+finished summary by job id. With a SQLite or Redis job store, every job's
+state is also written there, so a poll that reaches another gunicorn worker
+still finds it.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Any, Optional
+
+from cache import RedisStore, SQLiteStore
+
+# How often a long-poll for a job running in another process re-reads the store
+STORE_POLL_INTERVAL = 0.25
+
+
+class SummaryJob:
+    """State of a single summary generation job"""
+    __slots__ = ('id', 'status', 'summary', 'created', 'finished', 'done')
+
+    def __init__(self, placeholder: str):
+        self.id = uuid.uuid4().hex
+        self.status = "pending"
+        self.summary = placeholder  # template summary until the LLM result arrives
+        self.created = time.time()
+        self.finished = None
+        self.done = threading.Event()
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SummaryJob":
+        """A job as read back from the shared store"""
+        job = cls(state["summary"])
+        job.id, job.status = state["id"], state["status"]
+        job.created, job.finished = state["created"], state["finished"]
+        if job.finished is not None:
+            job.done.set()
+        return job
+
+    def state(self) -> Dict[str, Any]:
+        """Fields written to the shared store"""
+        return {"id": self.id, "status": self.status, "summary": self.summary, "created": self.created,
+                "finished": self.finished}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON representation for /api/summary/<id>"""
+        end = self.finished if self.finished is not None else time.time()
+        return {
+            "id": self.id,
+            "status": self.status,
+            "summary": self.summary,
+            "elapsed": round(end - self.created, 3),
+        }
+
+
+class SummaryJobQueue:
+    """Bounded queue of summary jobs served by a pool of daemon worker threads.
+
+    `store` (a cache.SQLiteStore or RedisStore) shares job state with the other worker processes.
+    """
+
+    def __init__(self, generate: Callable[..., str], workers: int = 2, max_queue: int = 100, ttl: float = 600,
+                 store=None):
+        self._generate = generate
+        self._store = store
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._jobs: Dict[str, SummaryJob] = {}
+        self._lock = threading.Lock()
+        self._ttl = ttl
+        self._last_expiry = time.time()
+        self._stopping = False
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._run, name=f"summary-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, args: tuple, placeholder: str) -> Optional[SummaryJob]:
+        """Queue a summary for generate(*args), returning None if the queue is full or stopping"""
+        if self._stopping:
+            return None
+        self._expire()
+        job = SummaryJob(placeholder)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._publish(job)
+        try:
+            self._queue.put_nowait((job, args))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job.id]
+            if self._store is not None:
+                self._store.delete(job.id)
+            return None
+        return job
+
+    def get(self, job_id: str, wait: float = 0) -> Optional[SummaryJob]:
+        """Look up a job, optionally blocking up to `wait` seconds for it to finish"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            if wait > 0:
+                job.done.wait(wait)
+            return job
+        if self._store is None:
+            return None
+        # Submitted by another process: poll the shared store
+        deadline = time.time() + wait
+        while True:
+            job = self._load(job_id)
+            remaining = deadline - time.time()
+            if job is None or job.finished is not None or remaining <= 0:
+                return job
+            time.sleep(min(STORE_POLL_INTERVAL, remaining))
+
+    def pending(self) -> int:
+        """Number of jobs waiting for a worker"""
+        return self._queue.qsize()
+
+    def stop(self, timeout: float = 10):
+        """Refuse new jobs, let queued ones finish and stop the workers, waiting up to `timeout` seconds"""
+        self._stopping = True
+        deadline = time.time() + timeout
+        try:
+            for _ in self._workers:
+                self._queue.put(None, timeout=max(0.0, deadline - time.time()))
+        except queue.Full:
+            pass
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.time()))
+
+    def _run(self):
+        """Worker loop: generate summaries until stopped or the process exits"""
+        while True:
+            item = self._queue.get()
+            if item is None:
+                self._queue.task_done()
+                return
+            job, args = item
+            try:
+                job.summary = self._generate(*args)
+                job.status = "complete"
+            except Exception as e:
+                print(f"Error generating summary for job {job.id}: {e}")
+                job.status = "failed"  # keeps the template placeholder
+            finally:
+                job.finished = time.time()
+                self._publish(job)
+                job.done.set()
+                self._queue.task_done()
+
+    def _publish(self, job: SummaryJob):
+        """Write a job's state to the shared store, if there is one"""
+        if self._store is not None:
+            self._store.set(job.id, json.dumps(job.state()))
+
+    def _load(self, job_id: str) -> Optional[SummaryJob]:
+        """A job from the shared store, or None if it is unknown or expired"""
+        if not isinstance(job_id, str) or not job_id:
+            return None
+        value = self._store.get(job_id)
+        return SummaryJob.from_state(json.loads(value)) if value is not None else None
+
+    def _expire(self):
+        """Forget finished jobs older than the TTL (checked at most every few seconds)"""
+        now = time.time()
+        if now - self._last_expiry < 5:
+            return
+        self._last_expiry = now
+        cutoff = now - self._ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job.finished is not None and job.finished < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+
+def job_store_from_env(ttl: float):
+    """Shared job store from SUMMARY_JOB_REDIS_URL or SUMMARY_JOB_DB (None keeps jobs in this process)"""
+    redis_url = os.environ.get("SUMMARY_JOB_REDIS_URL")
+    if redis_url:
+        return RedisStore(redis_url, ttl=ttl, prefix="summary-job:")
+    db_path = os.environ.get("SUMMARY_JOB_DB")
+    if db_path:
+        return SQLiteStore(db_path, ttl=ttl)
+    return None
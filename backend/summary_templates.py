@@ -0,0 +1,88 @@
+"""
+Deterministic template summaries.
+
+Phrase catalogs are loaded from `data/summary_phrases.json` once at import and
+compiled into bound `str.format` methods, so rendering only formats the five
+chosen phrases. The phrases are chosen from a hash of the inputs rather than
+`random`, so identical requests always get the identical (cacheable) summary.
+"""
+
+import hashlib
+import json
+import os
+from typing import Callable, Dict, List
+
+PHRASES_FILE = os.environ.get(
+    "SUMMARY_PHRASES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "summary_phrases.json")
+)
+DEFAULT_LANGUAGE = "en"
+
+SECTIONS = ("intro", "generation", "savings", "investment")
+
+
+class PhraseCatalog:
+    """Compiled phrases for one language"""
+    __slots__ = ('sections', 'benefits')
+
+    def __init__(self, spec: Dict):
+        self.sections: Dict[str, List[Callable[..., str]]] = {}
+        for section in SECTIONS:
+            phrases = spec.get(section) or []
+            if not phrases:
+                raise ValueError(f"phrase catalog is missing '{section}' phrases")
+            self.sections[section] = [phrase.format for phrase in phrases]
+        self.benefits: Dict[str, List[str]] = {key: list(phrases) for key, phrases in spec.get("benefits", {}).items()}
+        if "solar" not in self.benefits:
+            raise ValueError("phrase catalog needs at least 'solar' benefits")
+
+    def benefit_phrases(self, usage_type: str, system_type: str) -> List[str]:
+        """Benefit sentences for a usage and system type"""
+        if usage_type == "agriculture":
+            key = "agriculture_solar" if system_type == "solar" else "agriculture"
+            if key in self.benefits:
+                return self.benefits[key]
+        return self.benefits.get(system_type) or self.benefits["solar"]
+
+
+def load_catalogs(path: str = PHRASES_FILE) -> Dict[str, PhraseCatalog]:
+    """Load and compile the phrase catalog for every language in the file"""
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    return {language: PhraseCatalog(spec) for language, spec in specs.items()}
+
+
+_catalogs = load_catalogs()
+
+
+def _seed(location, usage_type, system_type, size, generation, savings, cost, payback) -> int:
+    """64-bit seed derived from the summary inputs"""
+    key = f"{location}\x1f{usage_type}\x1f{system_type}\x1f{size}\x1f{generation}\x1f{savings}\x1f{cost}\x1f{payback}"
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def render_summary(location, usage_type, system_type, size, generation, savings, cost, payback,
+                   language: str = DEFAULT_LANGUAGE) -> str:
+    """Render a template summary; the same inputs always produce the same text"""
+    catalog = _catalogs.get(language) or _catalogs[DEFAULT_LANGUAGE]
+    seed = _seed(location, usage_type, system_type, size, generation, savings, cost, payback)
+    values = {
+        "location": location,
+        "usage_type": usage_type,
+        "system_type": system_type,
+        "size": size,
+        "generation": generation,
+        "savings": savings,
+        "cost": cost,
+        "payback": payback,
+    }
+
+    # Each section takes its choice from a different 12 bits of the seed
+    parts = []
+    for i, section in enumerate(SECTIONS):
+        phrases = catalog.sections[section]
+        parts.append(phrases[(seed >> (12 * i)) % len(phrases)](**values))
+    benefits = catalog.benefit_phrases(usage_type, system_type)
+    parts.append(benefits[(seed >> 48) % len(benefits)])
+
+    # Combine all parts into a coherent summary
+    return " ".join(parts)
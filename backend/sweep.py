@@ -0,0 +1,253 @@
+"""
+What-if sweeps: one site evaluated over a grid of parameter values.
+
+The base site is parsed, located and priced once. Each swept parameter
+(consumption, flat tariff, slab rates, and the sweep-only budget cap and solar
+subsidy) becomes an axis, and
+the whole grid is sized, billed, costed and projected as flat NumPy arrays in
+one pass, with no summaries. Results come back as one array per output in
+row-major grid order, so a client can interpolate between grid points instead
+of posting a request for every slider position.
+"""
+
+import math
+import os
+from numbers import Real
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from calculator import (
+    parse_site, site_resource, system_type_for, generation_multiplier, DEFAULT_SLAB_RATES, DEFAULT_TARIFF, SLAB_KEYS,
+    PUMP_REQUIREMENT_KW, SOLAR_COST_PER_KW, WIND_COST_PER_KW, AGRICULTURE_COST_PER_KW, AGRICULTURE_SUBSIDY,
+)
+from batch import round_exact
+from finance import annual_om, degraded, project
+from geo_resource import solar_factor, wind_factor
+from tariffs import LEGACY_SLAB_LIMITS
+
+SWEEP_MAX_POINTS = int(os.environ.get("SWEEP_MAX_POINTS", 50000))
+
+# Axes that are /api/recommend fields, and what-if axes with no /api/recommend equivalent
+FIELD_AXES = ("monthlyConsumption", "tariff") + SLAB_KEYS
+WHAT_IF_AXES = ("budgetCap", "solarSubsidyPercent")
+AXES = FIELD_AXES + WHAT_IF_AXES
+
+# Outputs and the decimals they are rounded to (None: whole numbers)
+OUTPUTS = (
+    ("recommended_size_kw", 1), ("estimated_generation_kwh", None), ("monthly_savings", None),
+    ("system_cost", None), ("payback_years", 1), ("new_bill", 2), ("effective_tariff", 2), ("npv", 2),
+    ("discounted_payback_years", 1),
+)
+
+
+def _check_value(name: str, value) -> float:
+    """A swept value as a float, raising ValueError if it is out of range"""
+    if isinstance(value, bool) or not isinstance(value, Real) or not math.isfinite(value):
+        raise ValueError(f"{name} values must be numbers")
+    if value < 0:
+        raise ValueError(f"{name} values must be non-negative")
+    if name == "budgetCap" and value == 0:
+        raise ValueError("budgetCap values must be positive")
+    if name == "solarSubsidyPercent" and value > 100:
+        raise ValueError("solarSubsidyPercent values must be from 0 to 100")
+    return float(value)
+
+
+def axis_values(name: str, spec) -> np.ndarray:
+    """Values of one axis from a list, {start, stop, step} or {start, stop, count} (stop is included)"""
+    if isinstance(spec, list):
+        values = [_check_value(name, value) for value in spec]
+    elif isinstance(spec, dict):
+        start = _check_value(name, spec.get('start'))
+        stop = _check_value(name, spec.get('stop'))
+        if stop < start:
+            raise ValueError(f"{name}.stop must not be below {name}.start")
+        if 'count' in spec:
+            count = spec['count']
+            if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+                raise ValueError(f"{name}.count must be a positive integer")
+            if count > SWEEP_MAX_POINTS:
+                raise ValueError(f"{name} has more than {SWEEP_MAX_POINTS} values")
+            values = np.linspace(start, stop, count)
+        else:
+            step = spec.get('step')
+            if isinstance(step, bool) or not isinstance(step, Real) or step <= 0:
+                raise ValueError(f"{name}.step must be a positive number")
+            count = int(math.floor((stop - start) / step + 1e-9)) + 1
+            if count > SWEEP_MAX_POINTS:
+                raise ValueError(f"{name} has more than {SWEEP_MAX_POINTS} values")
+            values = start + step * np.arange(count)
+        values = np.round(values, 10).tolist()  # 0.1 * 3 -> 0.3, so grid points read as entered
+    else:
+        raise ValueError(f"{name} must be a list of values or an object with start, stop and step (or count)")
+    if not values:
+        raise ValueError(f"{name} needs at least one value")
+    return np.array(values, dtype=np.float64)
+
+
+def parse_axes(parameters) -> List[tuple]:
+    """Validate the `parameters` request field into [(name, values)] in the order given, raising ValueError"""
+    if not isinstance(parameters, dict) or not parameters:
+        raise ValueError("parameters must be an object of parameter: values")
+    axes = []
+    points = 1
+    for name, spec in parameters.items():
+        if name not in AXES:
+            raise ValueError(f"cannot sweep '{name}'; sweepable parameters are: {', '.join(AXES)}")
+        values = axis_values(name, spec)
+        points *= len(values)
+        if points > SWEEP_MAX_POINTS:
+            raise ValueError(f"sweep too large: more than {SWEEP_MAX_POINTS} grid points")
+        axes.append((name, values))
+    return axes
+
+
+def _slab_biller(rates: np.ndarray):
+    """Vectorized bills for the four-slab tariff with per-row rates ((n, 4) array)"""
+    starts = np.array((0.0,) + LEGACY_SLAB_LIMITS)
+    cumulative = np.zeros_like(rates)
+    for k in range(1, len(starts)):  # accumulated in the same order as tariffs.Tariff, so bills match exactly
+        cumulative[:, k] = cumulative[:, k - 1] + (starts[k] - starts[k - 1]) * rates[:, k - 1]
+
+    def bill(units: np.ndarray) -> np.ndarray:
+        units = np.maximum(units, 0.0)
+        tier = np.searchsorted(starts, units, side='right') - 1
+        rows = np.arange(len(rates)).reshape((-1,) + (1,) * (units.ndim - 1))
+        return cumulative[rows, tier] + (units - starts[tier]) * rates[rows, tier]
+
+    return bill
+
+
+def _column(values: np.ndarray, digits: Optional[int]) -> list:
+    """An output array as a JSON list, with None where a value is not finite"""
+    if digits is None:
+        return values.astype(np.int64).tolist()
+    rounded = round_exact(values, digits)
+    finite = np.isfinite(rounded)
+    if finite.all():
+        return rounded.tolist()
+    return [value if ok else None for value, ok in zip(rounded.tolist(), finite.tolist())]
+
+
+def sweep(site_data: Dict[str, Any], parameters, with_irr: bool = False) -> Dict[str, Any]:
+    """Evaluate a site at every point of a parameter grid, raising ValueError on bad input.
+
+    The site takes the same fields as /api/recommend and is sized with the
+    fixed rule (budget, optimize, simulate and uncertainty are not used, as in
+    /api/recommend without optimize), so every point matches /api/recommend.
+    The what-if axes have no /api/recommend equivalent: `budgetCap` caps the
+    system at the largest size it pays for, after subsidy, and
+    `solarSubsidyPercent` replaces the default PM-KUSUM subsidy on solar
+    systems (wind systems, as in compute(), are never subsidised).
+    """
+    site = parse_site(site_data)
+    axes = parse_axes(parameters)
+    names = [name for name, _ in axes]
+    if site_data.get('tariffId') and any(name in SLAB_KEYS for name in names):
+        raise ValueError("slab rates cannot be swept for a site with a tariffId")
+
+    # Every grid point as flat arrays, in row-major order of the axes
+    shape = tuple(len(values) for _, values in axes)
+    grid = dict(zip(names, (axis.ravel() for axis in np.meshgrid(*(values for _, values in axes), indexing='ij'))))
+    n = int(np.prod(shape))
+
+    def column(name, default):
+        return grid[name] if name in grid else np.full(n, float(default))
+
+    consumption = column("monthlyConsumption", site.monthly_consumption)
+    flat_tariff = column("tariff", site.tariff)
+    budget = column("budgetCap", np.nan)
+
+    # Bills: per-row slab rates when any are swept, else the site's own tariff plan
+    plan = site.tariff_plan
+    if any(name in SLAB_KEYS for name in names):
+        base_rates = plan.rates if plan is not None else DEFAULT_SLAB_RATES
+        rates = np.column_stack([column(key, rate) for key, rate in zip(SLAB_KEYS, base_rates)])
+        plan_bill = _slab_biller(rates)
+        slabs_used = True
+    elif plan is not None:
+        plan_bill = plan.bill_array
+        slabs_used = True
+    else:
+        plan_bill = None
+        slabs_used = False
+
+    # Effective tariff, as in calculator.compute()
+    if slabs_used:
+        positive = consumption > 0
+        tariff = np.where(positive, plan_bill(consumption) / np.where(positive, consumption, 1.0), flat_tariff)
+    else:
+        tariff = flat_tariff
+    tariff = np.where(tariff > 0, tariff, DEFAULT_TARIFF)
+
+    # Technology, resource and unit costs are fixed by the site
+    usage_type = site.usage_type
+    is_agriculture = usage_type == "agriculture"
+    system_type = system_type_for(usage_type)
+    ghi, wind_speed = site_resource(site)
+    factor = wind_factor(wind_speed) if system_type == "wind" else solar_factor(ghi)
+    multiplier = generation_multiplier(usage_type, system_type)
+    if system_type == "wind":
+        cost_per_kw = WIND_COST_PER_KW
+    else:
+        cost_per_kw = AGRICULTURE_COST_PER_KW if is_agriculture else SOLAR_COST_PER_KW
+    default_subsidy = AGRICULTURE_SUBSIDY if is_agriculture and system_type == "solar" else 0.0
+    if "solarSubsidyPercent" in grid and system_type == "solar":
+        subsidy_share = grid["solarSubsidyPercent"] / 100
+    else:
+        subsidy_share = np.full(n, default_subsidy)
+
+    # Sizing, capped by the budget where one is swept
+    size = np.maximum(round_exact(consumption / 100), PUMP_REQUIREMENT_KW if is_agriculture else 0.0)
+    net_per_kw = cost_per_kw * (1 - subsidy_share)
+    affordable = np.floor(budget / np.where(net_per_kw > 0, net_per_kw, 1.0) * 10) / 10
+    capped = ~np.isnan(budget) & (net_per_kw > 0) & (affordable < size)
+    size = np.where(capped, affordable, size)
+
+    # Generation, bills and cost
+    generation = np.trunc(size * multiplier * 30 * factor)
+    current_bill = consumption * tariff
+    remaining = np.maximum(0.0, consumption - generation)
+    new_bill = plan_bill(remaining) if slabs_used else remaining * tariff
+    monthly_savings = np.trunc(current_bill - new_bill)
+    gross_cost = np.trunc(size * cost_per_kw)
+    subsidy_amount = np.trunc(gross_cost * subsidy_share)
+    system_cost = gross_cost - subsidy_amount
+    annual_savings = monthly_savings * 12
+    pays_back = annual_savings > 0
+    payback_years = np.where(pays_back, round_exact(system_cost / np.where(pays_back, annual_savings, 1)), 0.0)
+
+    # Lifetime cashflows
+    generation_by_year = degraded(generation)
+    units = np.maximum(0.0, consumption[:, None] - generation_by_year)
+    new_bills = plan_bill(units) if slabs_used else units * tariff[:, None]
+    if system_type == "wind":
+        om = annual_om(0.0, gross_cost)
+    else:
+        om = annual_om(gross_cost, 0.0)
+    projection = project(current_bill[:, None] - new_bills, generation_by_year, gross_cost, subsidy_amount, om,
+                         with_irr=with_irr)
+
+    columns = {
+        "recommended_size_kw": size, "estimated_generation_kwh": generation, "monthly_savings": monthly_savings,
+        "system_cost": system_cost, "payback_years": payback_years, "new_bill": new_bill,
+        "effective_tariff": tariff, "npv": projection["npv"],
+        "discounted_payback_years": projection["discounted_payback_years"],
+    }
+    results = {name: _column(columns[name], digits) for name, digits in OUTPUTS}
+    if with_irr:
+        results["irr"] = _column(projection["irr"], 4)
+    if not np.isnan(budget).all():
+        results["budget_limited"] = capped.tolist()
+
+    return {
+        "location": site.location,
+        "usage_type": usage_type,
+        "system_type": system_type,
+        "tariff_id": plan.name if plan is not None and not any(name in SLAB_KEYS for name in names) else None,
+        "axes": [{"name": name, "values": values.tolist()} for name, values in axes],
+        "shape": list(shape),
+        "points": n,
+        "results": results,
+    }
@@ -0,0 +1,275 @@
+"""
+N-tier tariff engine.
+
+A `Tariff` precomputes the cumulative cost at the start of every tier once, so a
+bill is one binary search plus one multiply-add regardless of the number of
+tiers. Named tariffs (optionally with seasonal variants) are loaded from
+`data/tariffs.json` and can be registered at runtime, so clients refer to them
+by id instead of re-sending slab rates with every request. Runtime
+registrations are written to TARIFF_STORE, a JSON file every worker process
+reads through, so a tariff registered with one gunicorn worker is known to all
+of them and survives a restart.
+"""
+
+import json
+import os
+import tempfile
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not locked against other processes
+    fcntl = None
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+TARIFFS_FILE = os.environ.get("TARIFFS_FILE", os.path.join(DATA_DIR, "tariffs.json"))
+# Tariffs registered at runtime, shared by the worker processes ("" keeps them in the registering process)
+TARIFF_STORE = os.environ.get("TARIFF_STORE", os.path.join(DATA_DIR, "registered_tariffs.json"))
+
+# Slab boundaries (kWh) of the calculator form: 0-100, 101-300, 301-500, >500
+LEGACY_SLAB_LIMITS = (100.0, 300.0, 500.0)
+
+
+class Tariff:
+    """Tiered tariff with a fixed monthly charge.
+
+    `boundaries` are the upper limits (kWh) of every tier except the last, which
+    is unbounded; `rates` has one ₹/kWh rate per tier.
+    """
+    __slots__ = ('name', 'boundaries', 'rates', 'fixed_charge', '_starts', '_cumulative',
+                 '_np_starts', '_np_cumulative', '_np_rates')
+
+    def __init__(self, boundaries: Sequence[float], rates: Sequence[float], fixed_charge: float = 0.0,
+                 name: Optional[str] = None):
+        boundaries = tuple(float(b) for b in boundaries)
+        rates = tuple(float(r) for r in rates)
+        if len(rates) != len(boundaries) + 1:
+            raise ValueError("a tariff needs exactly one more rate than tier boundaries")
+        if any(b <= 0 for b in boundaries) or any(b2 <= b1 for b1, b2 in zip(boundaries, boundaries[1:])):
+            raise ValueError("tier boundaries must be positive and strictly increasing")
+        if any(r < 0 for r in rates) or fixed_charge < 0:
+            raise ValueError("tariff rates and fixed charge must be non-negative")
+
+        self.name = name
+        self.boundaries = boundaries
+        self.rates = rates
+        self.fixed_charge = float(fixed_charge)
+
+        # Cost of consuming exactly up to the start of each tier
+        starts = (0.0,) + boundaries
+        cumulative = [0.0]
+        for i in range(1, len(starts)):
+            cumulative.append(cumulative[-1] + (starts[i] - starts[i - 1]) * rates[i - 1])
+        self._starts = starts
+        self._cumulative = tuple(cumulative)
+        self._np_starts = np.array(starts)
+        self._np_cumulative = np.array(cumulative)
+        self._np_rates = np.array(rates)
+
+    def energy_charge(self, units: float) -> float:
+        """Tiered energy charge for a monthly consumption, excluding the fixed charge"""
+        if units <= 0:
+            return 0
+        i = bisect_right(self._starts, units) - 1
+        return self._cumulative[i] + (units - self._starts[i]) * self.rates[i]
+
+    def bill(self, units: float) -> float:
+        """Monthly bill including the fixed charge"""
+        return self.fixed_charge + self.energy_charge(units)
+
+    def energy_charge_array(self, units: np.ndarray) -> np.ndarray:
+        """Vectorized energy charge for an array of consumptions"""
+        units = np.maximum(np.asarray(units, dtype=np.float64), 0.0)
+        i = np.searchsorted(self._np_starts, units, side='right') - 1
+        return self._np_cumulative[i] + (units - self._np_starts[i]) * self._np_rates[i]
+
+    def bill_array(self, units: np.ndarray) -> np.ndarray:
+        """Vectorized monthly bill including the fixed charge"""
+        return self.fixed_charge + self.energy_charge_array(units)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON description of the tariff"""
+        tiers = [{"upTo": b, "rate": r} for b, r in zip(self.boundaries, self.rates)]
+        tiers.append({"upTo": None, "rate": self.rates[-1]})
+        return {"fixedCharge": self.fixed_charge, "tiers": tiers}
+
+
+class SeasonalTariff:
+    """A named tariff whose tiers change by calendar month"""
+    __slots__ = ('name', 'seasons', '_by_month', 'default')
+
+    def __init__(self, name: str, seasons: Dict[str, Any]):
+        self.name = name
+        self.seasons = {}
+        self._by_month = {}
+        for season, (months, tariff) in seasons.items():
+            self.seasons[season] = tariff
+            for month in months:
+                if not 1 <= month <= 12:
+                    raise ValueError(f"invalid month {month} in season '{season}'")
+                self._by_month[month] = tariff
+        if not self.seasons:
+            raise ValueError("a seasonal tariff needs at least one season")
+        # Used when the request does not say which month it is for
+        self.default = next(iter(self.seasons.values()))
+
+    def for_month(self, month: Optional[int] = None) -> Tariff:
+        """Tariff in effect for a calendar month (1-12)"""
+        if month is None:
+            return self.default
+        tariff = self._by_month.get(month)
+        if tariff is None:
+            raise ValueError(f"tariff '{self.name}' has no rates for month {month}")
+        return tariff
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON description of the tariff"""
+        return {
+            "seasons": {
+                season: dict(tariff.to_dict(), months=sorted(m for m, t in self._by_month.items() if t is tariff))
+                for season, tariff in self.seasons.items()
+            }
+        }
+
+
+def tariff_from_spec(spec: Dict[str, Any], name: Optional[str] = None) -> Tariff:
+    """Build a Tariff from {"tiers": [{"upTo": kWh or null, "rate": ₹/kWh}, ...], "fixedCharge": ₹}"""
+    tiers = spec.get("tiers")
+    if not isinstance(tiers, list) or not tiers:
+        raise ValueError("tariff 'tiers' must be a non-empty list")
+    if tiers[-1].get("upTo") is not None:
+        raise ValueError("the last tariff tier must be unbounded (upTo: null)")
+    boundaries = [tier["upTo"] for tier in tiers[:-1]]
+    if any(b is None for b in boundaries):
+        raise ValueError("only the last tariff tier may be unbounded")
+    rates = [tier["rate"] for tier in tiers]
+    return Tariff(boundaries, rates, spec.get("fixedCharge", 0.0), name=name)
+
+
+def parse_tariff(name: str, spec: Dict[str, Any]):
+    """Build a Tariff or SeasonalTariff from its JSON description"""
+    if "seasons" in spec:
+        seasons = {}
+        for season, season_spec in spec["seasons"].items():
+            seasons[season] = (season_spec.get("months", []), tariff_from_spec(season_spec, name=name))
+        return SeasonalTariff(name, seasons)
+    return tariff_from_spec(spec, name=name)
+
+
+@lru_cache(maxsize=1024)
+def tariff_from_slabs(rates: tuple) -> Tariff:
+    """Cached Tariff for the legacy four-slab payload"""
+    return Tariff(LEGACY_SLAB_LIMITS, rates)
+
+
+# Named tariffs, shared across requests
+_registry: Dict[str, Any] = {}
+_descriptions: Dict[str, str] = {}
+# (inode, mtime, size) of the TARIFF_STORE file last read, to notice other processes' registrations
+_store_stamp = None
+_store_lock = threading.Lock()
+
+
+def _add_tariff(name: str, spec: Dict[str, Any]):
+    """Parse a tariff into this process's registry"""
+    tariff = parse_tariff(name, spec)
+    _registry[name] = tariff
+    _descriptions[name] = spec.get("description", "")
+    return tariff
+
+
+def register_tariff(name: str, spec: Dict[str, Any]):
+    """Parse and register a named tariff, replacing any existing one with the same name"""
+    tariff = parse_tariff(name, spec)  # validated before anything is written
+    if TARIFF_STORE:
+        _write_store(name, spec)
+    _registry[name] = tariff
+    _descriptions[name] = spec.get("description", "")
+    return tariff
+
+
+def _write_store(name: str, spec: Dict[str, Any]):
+    """Add a registration to TARIFF_STORE, holding a lock file and replacing the store atomically"""
+    directory = os.path.dirname(os.path.abspath(TARIFF_STORE))
+    with open(TARIFF_STORE + ".lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        specs = {}
+        if os.path.exists(TARIFF_STORE):
+            with open(TARIFF_STORE, encoding="utf-8") as f:
+                specs = json.load(f)
+        specs[name] = spec
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(specs, f, indent=2)
+            os.replace(temp_path, TARIFF_STORE)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def sync_tariffs():
+    """Read TARIFF_STORE again if another process has registered a tariff since it was last read"""
+    global _store_stamp
+    if not TARIFF_STORE:
+        return
+    try:
+        stat = os.stat(TARIFF_STORE)
+    except FileNotFoundError:
+        return
+    if (stat.st_ino, stat.st_mtime_ns, stat.st_size) == _store_stamp:
+        return
+    with _store_lock:
+        try:
+            with open(TARIFF_STORE, encoding="utf-8") as f:
+                stat = os.fstat(f.fileno())  # the stamp of the version actually read
+                specs = json.load(f)
+            for name, spec in specs.items():
+                _add_tariff(name, spec)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Error loading tariffs from {TARIFF_STORE}: {e}")
+        _store_stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
+def get_tariff(name: str, month: Optional[int] = None) -> Tariff:
+    """Resolve a named tariff (and season, for seasonal tariffs), raising ValueError if unknown"""
+    sync_tariffs()
+    tariff = _registry.get(name)
+    if tariff is None:
+        raise ValueError(f"unknown tariff '{name}'")
+    if isinstance(tariff, SeasonalTariff):
+        return tariff.for_month(month)
+    return tariff
+
+
+def list_tariffs() -> List[Dict[str, Any]]:
+    """Describe all registered tariffs"""
+    sync_tariffs()
+    return [
+        dict(tariff.to_dict(), name=name, description=_descriptions.get(name, ""))
+        for name, tariff in _registry.items()
+    ]
+
+
+def load_tariffs(path: str = TARIFFS_FILE) -> int:
+    """Register every tariff in a JSON file, returning how many were loaded"""
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as f:
+        specs = json.load(f)
+    for name, spec in specs.items():
+        _add_tariff(name, spec)
+    return len(specs)
+
+
+try:
+    load_tariffs()
+except (OSError, ValueError, KeyError) as e:
+    print(f"Error loading tariffs from {TARIFFS_FILE}: {e}")
+sync_tariffs()
@@ -0,0 +1,13 @@
+"""Shared setup for the backend tests: run them from the backend directory with `python -m pytest tests`."""
+
+import os
+import sys
+import tempfile
+
+# The backend modules are flat files one directory up
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# Tariffs registered by the tests go to a scratch store, not data/registered_tariffs.json
+os.environ["TARIFF_STORE"] = os.path.join(tempfile.mkdtemp(prefix="tariff-store-"), "registered_tariffs.json")
@@ -0,0 +1,77 @@
+"""Portfolio allocation: options sized like compute(), and picks within the budget and region caps."""
+
+import itertools
+import random
+
+import numpy as np
+import pytest
+
+from allocation import allocate, _options
+from calculator import parse_site, compute
+
+SITES = [
+    {"location": "Pune", "usageType": "home", "monthlyConsumption": 225, "tariff": 8},
+    {"location": "Jaisalmer", "usageType": "home", "monthlyConsumption": 1005, "slabs": {"slab1Rate": 3}},
+    {"location": "Nashik", "usageType": "agriculture", "monthlyConsumption": 267.5, "tariff": 6.5},
+    {"location": "Chennai", "usageType": "factory", "monthlyConsumption": 14245, "tariff": 9.5},
+    {"location": "Leh", "usageType": "home", "monthlyConsumption": 645, "tariffId": "example-domestic-8-tier"},
+    {"location": "Shillong", "usageType": "agriculture", "monthlyConsumption": 2850, "latitude": 21.25,
+     "longitude": 79.05},
+]
+
+
+def options_for(sites, steps=(0.25, 0.5, 0.75, 1.0)):
+    parsed = [parse_site(site) for site in sites]
+    return parsed, _options(
+        [p.usage_type for p in parsed], np.array([p.monthly_consumption for p in parsed], dtype=np.float64),
+        np.array([p.tariff for p in parsed], dtype=np.float64), [p.tariff_plan for p in parsed],
+        np.array([p.latitude if p.latitude is not None else np.nan for p in parsed]),
+        np.array([p.longitude if p.longitude is not None else np.nan for p in parsed]), steps)
+
+
+def test_full_size_option_matches_compute():
+    rng = random.Random(3)
+    sites = SITES + [{"location": "Pune", "usageType": rng.choice(("home", "agriculture", "factory")),
+                      "monthlyConsumption": rng.randrange(0, 400000) / 100, "tariff": 8} for _ in range(300)]
+    parsed, options = options_for(sites)
+    for j, site in enumerate(parsed):
+        rec = compute(site)
+        assert options["recommended"][j] == rec.recommended_size_kw
+        assert options["size"][j, -1] == rec.recommended_size_kw
+        assert options["generation"][j, -1] == rec.estimated_generation_kwh
+        assert options["cost"][j, -1] == rec.system_cost
+
+
+@pytest.mark.parametrize("budget", [50000, 150000, 400000, 2000000])
+def test_picks_stay_within_the_budget_and_near_the_best_choice(budget):
+    result = allocate(SITES, budget)
+    assert result["spent"] <= budget
+    assert sum(install["system_cost"] for install in result["installs"]) == result["spent"]
+    assert len({install["index"] for install in result["installs"]}) == result["count"]
+
+    # Brute force over every (no install or one option) choice per site
+    _, options = options_for(SITES)
+    cost, npv = options["cost"], options["npv"]
+    best = 0.0
+    for choice in itertools.product(range(-1, cost.shape[1]), repeat=len(SITES)):
+        picked = [(s, k) for s, k in enumerate(choice) if k >= 0]
+        if sum(cost[s, k] for s, k in picked) <= budget:
+            best = max(best, sum(npv[s, k] for s, k in picked))
+    assert result["npv"] <= best + 0.01
+    assert result["npv"] >= 0.99 * best
+    assert result["npv_upper_bound"] >= result["npv"]
+
+
+def test_region_caps_are_respected():
+    sites = [dict(site, region="feeder-1" if j % 2 else "feeder-2") for j, site in enumerate(SITES)]
+    result = allocate(sites, 10 ** 7, {"feeder-1": 5.0})
+    feeder = sum(install["size_kw"] for install in result["installs"] if install["region"] == "feeder-1")
+    assert feeder <= 5.0 + 1e-9
+    assert result["regions"]["feeder-1"]["allocated_kw"] == round(feeder, 1)
+
+
+def test_invalid_sites_are_reported_not_allocated():
+    result = allocate(SITES[:1] + [{"monthlyConsumption": -1}, dict(SITES[0], region=7)], 100000)
+    assert [error["index"] for error in result["errors"]] == [1, 2]
+    with pytest.raises(ValueError):
+        allocate(SITES, 0)
@@ -0,0 +1,104 @@
+"""recommend_batch() gives every row exactly what compute() gives the same site."""
+
+import random
+
+import numpy as np
+import pytest
+
+from batch import recommend_batch, round_exact
+from calculator import parse_site, compute, to_response
+
+LOCATIONS = ("Pune", "Jaisalmer", "Chennai", "Leh", "Shillong", "Nowhere")
+TARIFF_IDS = ("legacy-4-slab", "example-domestic-8-tier", "example-commercial-seasonal")
+
+
+def random_sites(n: int, seed: int):
+    """A spread of valid sites: flat tariffs, slabs, named tariffs, coordinates and budgets"""
+    rng = random.Random(seed)
+    sites = []
+    for _ in range(n):
+        usage_type = rng.choice(("home", "factory", "agriculture"))
+        scale = {"home": 400, "factory": 15000, "agriculture": 2500}[usage_type]
+        site = {
+            "location": rng.choice(LOCATIONS),
+            "usageType": usage_type,
+            "monthlyConsumption": round(rng.uniform(0, 2.0) * scale, rng.choice((0, 1))),
+            "tariff": rng.choice((0, 6.5, 8, 9.5)),
+        }
+        r = rng.random()
+        if r < 0.3:
+            site["tariffId"] = rng.choice(TARIFF_IDS)
+        elif r < 0.5:
+            site["slabs"] = {"slab1Rate": 3, "slab2Rate": rng.choice((5.5, 6)), "slab3Rate": 8, "slab4Rate": 10}
+        if rng.random() < 0.4:
+            site["latitude"] = round(rng.uniform(8, 35), 3)
+            site["longitude"] = round(rng.uniform(68, 97), 3)
+        sites.append(site)
+    return sites
+
+
+def single(site):
+    return to_response(compute(parse_site(site)))
+
+
+def without_index(row):
+    row = dict(row)
+    assert row.pop("index") is not None
+    return row
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_batch_matches_single_site(seed):
+    sites = random_sites(1000, seed)
+    for site, row in zip(sites, recommend_batch(sites)):
+        assert without_index(row) == single(site), site
+
+
+def test_batch_matches_single_site_with_options():
+    sites = random_sites(60, seed=7)
+    for k, site in enumerate(sites):
+        site["finance"] = k % 2 == 0
+        site["simulate"] = k % 3 == 0
+        if k % 5 == 0:
+            site["optimize"] = "npv"
+            site["budget"] = 400000
+    for site, row in zip(sites, recommend_batch(sites)):
+        assert without_index(row) == single(site), site
+
+
+def test_invalid_rows_carry_an_error():
+    sites = [{"location": "Pune", "monthlyConsumption": 300}, {"monthlyConsumption": -5}, "not a site",
+             {"location": "Pune", "tariffId": "no-such-tariff"}, {"location": "Pune", "tariffId": ["legacy-4-slab"]},
+             {"location": "Pune", "tariffId": {"name": "legacy-4-slab"}}]
+    rows = recommend_batch(sites)
+    assert "error" not in rows[0]
+    assert [row["index"] for row in rows] == list(range(len(sites)))
+    for row in rows[1:]:
+        assert set(row) == {"index", "error"}
+
+
+@pytest.mark.parametrize("bad", [
+    {"monthlyConsumption": float("nan")}, {"monthlyConsumption": float("inf")}, {"tariff": float("nan")},
+    {"budget": float("-inf")}, {"slabs": {"slab1Rate": float("nan")}}, {"latitude": float("nan"), "longitude": 73.9},
+    {"monthlyConsumption": 1e308}, {"tariff": 1e308}, {"slabs": {"slab2Rate": 1e308}, "finance": True},
+    {"monthlyConsumption": 1e308, "optimize": "npv"},
+])
+def test_non_finite_and_overflowing_rows_fail_alone(bad):
+    good = {"location": "Pune", "monthlyConsumption": 300}
+    rows = recommend_batch([good, dict({"location": "Pune", "monthlyConsumption": 300}, **bad), good])
+    assert set(rows[1]) == {"index", "error"}
+    assert without_index(rows[0]) == without_index(rows[2]) == single(good)
+
+
+def test_nan_is_not_a_number():
+    with pytest.raises(ValueError, match="tariff must be a number"):
+        parse_site({"location": "Pune", "tariff": float("nan")})
+
+
+@pytest.mark.parametrize("digits", [1, 2, 4])
+def test_round_exact_agrees_with_python_round(digits):
+    rng = np.random.default_rng(digits)
+    ties = np.array([0.05, 0.15, 0.25, 1.05, 2.25, 26.75, 3.45, 1234.55, 1.005, 2.675, 10.42, 4.325, 0.0, -2.25])
+    values = np.concatenate([ties, ties * 3, ties / 7, rng.uniform(-1e6, 1e6, 2000),
+                             np.round(rng.uniform(0, 100, 2000), 3)])
+    assert round_exact(values, digits).tolist() == [round(value, digits) for value in values.tolist()]
@@ -0,0 +1,79 @@
+"""Bulk scoring: a file round-trips row for row, and bad rows fail alone."""
+
+import csv
+
+import pytest
+
+import bulk_score
+from batch import COLUMNS, recommend_batch
+
+ROWS = [
+    {"id": "a", "location": "Pune", "usageType": "home", "monthlyConsumption": "350", "tariff": "8"},
+    {"id": "b", "location": "Pune", "usageType": "home", "monthlyConsumption": "nan", "tariff": "8"},
+    {"id": "c", "location": "Leh", "usageType": "agriculture", "monthlyConsumption": "900",
+     "tariffId": "example-commercial-seasonal", "month": "3.0"},
+    {"id": "d", "location": "Pune", "usageType": "factory", "monthlyConsumption": "1e308"},
+    {"id": "e", "location": "Pune", "usageType": "home", "monthlyConsumption": "200", "slab1Rate": "3"},
+]
+
+
+def write_csv(path, rows):
+    fields = sorted({field for row in rows for field in row})
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def read_csv(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(1, 2), (2, 2)])
+def test_csv_round_trip_with_bad_rows(tmp_path, workers, chunk_size):
+    source, target = tmp_path / "in.csv", tmp_path / "out.csv"
+    write_csv(source, ROWS)
+    assert bulk_score.run(str(source), str(target), chunk_size, workers) == len(ROWS)
+    out = read_csv(target)
+    assert list(out[0]) == [name for name, _ in COLUMNS]
+    assert [row["id"] for row in out] == ["a", "b", "c", "d", "e"]
+    assert [row["row"] for row in out] == ["0", "1", "2", "3", "4"]
+    assert [bool(row["error"]) for row in out] == [False, True, False, True, False]
+    expected = recommend_batch([dict(bulk_score.to_site(ROWS[0]))])[0]
+    assert int(out[0]["monthly_savings"]) == expected["monthly_savings"]
+    assert float(out[0]["npv"]) == expected["details"]["finance"]["npv"]
+
+
+def test_a_failing_chunk_is_rescored_row_by_row(tmp_path, monkeypatch):
+    def fragile(sites):
+        if any(site.get("location") == "Boom" for site in sites):
+            raise RuntimeError("unexpected failure")
+        return recommend_batch(sites)
+
+    monkeypatch.setattr(bulk_score, "recommend_batch", fragile)
+    source, target = tmp_path / "in.csv", tmp_path / "out.csv"
+    write_csv(source, [ROWS[0], dict(ROWS[0], id="x", location="Boom"), ROWS[4]])
+    bulk_score.run(str(source), str(target), 10, 1)
+    out = read_csv(target)
+    assert [row["error"] for row in out] == ["", "RuntimeError: unexpected failure", ""]
+
+
+def test_integral_floats_are_integers():
+    assert bulk_score.to_site({"month": 3.0})["month"] == 3
+    assert bulk_score.to_site({"month": "3.0"})["month"] == 3
+    assert bulk_score.to_site({"month": 3.5})["month"] == 3.5  # left for parse_site to reject
+
+
+def test_parquet_float_months(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    source, target = tmp_path / "in.parquet", tmp_path / "out.parquet"
+    pq.write_table(pa.table({
+        "location": ["Leh", "Leh"], "usageType": ["home", "home"], "monthlyConsumption": [400.0, float("nan")],
+        "tariffId": ["example-commercial-seasonal"] * 2, "month": pa.array([3.0, None]),
+    }), source)
+    bulk_score.run(str(source), str(target), 10, 1)
+    out = pq.read_table(target).to_pylist()
+    assert out[0]["error"] is None and out[0]["monthly_savings"] > 0
+    assert out[1]["error"] == "monthlyConsumption must be a number"
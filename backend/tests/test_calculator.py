@@ -0,0 +1,64 @@
+"""parse_site() accepts what /api/recommend documents and rejects everything else with a ValueError."""
+
+import math
+
+import pytest
+
+from calculator import compute, parse_site, to_response
+
+
+def test_defaults():
+    site = parse_site({})
+    assert site.usage_type == "home" and site.monthly_consumption == 0 and site.tariff == 0
+    assert site.tariff_plan is None and site.budget is None and site.optimize is None
+    assert not site.simulate and not site.finance and site.uncertainty is None
+
+
+def test_location_names_resolve_to_coordinates():
+    site = parse_site({"location": "Pune"})
+    assert site.place == "Pune, Maharashtra"
+    assert (site.latitude, site.longitude) == (18.5204, 73.8567)
+    explicit = parse_site({"location": "Pune", "latitude": 10, "longitude": 77})
+    assert (explicit.latitude, explicit.longitude, explicit.place) == (10, 77, None)
+
+
+def test_tariff_plans():
+    assert parse_site({"slabs": {"slab1Rate": 3}}).tariff_plan is not None
+    assert parse_site({"tariffId": "example-commercial-seasonal", "month": 5}).tariff_plan is not None
+    assert parse_site({"optimize": True}).optimize is not None
+
+
+@pytest.mark.parametrize("data, message", [
+    ([], "site must be an object"),
+    ({"usageType": "office"}, "usageType must be one of"),
+    ({"monthlyConsumption": "300"}, "monthlyConsumption must be a number"),
+    ({"monthlyConsumption": True}, "monthlyConsumption must be a number"),
+    ({"monthlyConsumption": math.nan}, "monthlyConsumption must be a number"),
+    ({"monthlyConsumption": math.inf}, "monthlyConsumption must be a number"),
+    ({"monthlyConsumption": -1}, "monthlyConsumption must be non-negative"),
+    ({"tariff": "8"}, "tariff must be a number"),
+    ({"tariffId": 3}, "tariffId must be a string"),
+    ({"tariffId": "no-such-tariff"}, "unknown tariff"),
+    ({"tariffId": "example-commercial-seasonal", "month": 13}, "month must be an integer"),
+    ({"tariffId": "example-commercial-seasonal", "month": 3.0}, "month must be an integer"),
+    ({"slabs": [1, 2]}, "slabs must be an object"),
+    ({"slabs": {"slab2Rate": "x"}}, "slab2Rate must be a number"),
+    ({"latitude": 10}, "latitude and longitude must be given together"),
+    ({"latitude": 91, "longitude": 0}, "latitude/longitude out of range"),
+    ({"budget": "lots"}, "budget must be a number"),
+    ({"simulate": "yes"}, "simulate must be true or false"),
+    ({"finance": 1}, "finance must be true or false"),
+    ({"optimize": "cheapest"}, "optimize must be true, false or one of"),
+    ({"uncertainty": "yes"}, "uncertainty must be true, false or an object"),
+])
+def test_invalid_input(data, message):
+    with pytest.raises(ValueError, match=message):
+        parse_site(data)
+
+
+def test_compute_is_pure():
+    site = parse_site({"location": "Jaisalmer", "usageType": "home", "monthlyConsumption": 350, "tariff": 8})
+    first, second = to_response(compute(site)), to_response(compute(site))
+    assert first == second
+    assert first["system_type"] == "solar" and first["recommended_size_kw"] > 0
+    assert 0 < first["monthly_savings"] <= 350 * 8
@@ -0,0 +1,74 @@
+"""Incremental evaluation: a follow-up recomputes only the stages whose inputs changed."""
+
+import pytest
+
+from calculator import parse_site, compute, evaluate, to_response
+from result_store import ResultStore
+
+HOME = {"location": "Pune", "usageType": "home", "monthlyConsumption": 350, "slabs": {"slab1Rate": 3}}
+ALL_CORE = ["tariff", "resource", "sizing", "generation", "bills", "costing", "payback"]
+
+
+def follow_up(first, second):
+    """Stages recomputed by evaluating `second` after `first`, checking the result matches a full compute()"""
+    previous = evaluate(parse_site(first))
+    evaluation = evaluate(parse_site(second), previous)
+    assert to_response(evaluation.recommendation) == to_response(compute(parse_site(second)))
+    return evaluation.recomputed
+
+
+def test_first_evaluation_runs_every_enabled_stage():
+    assert evaluate(parse_site(HOME)).recomputed == ALL_CORE
+    assert evaluate(parse_site(dict(HOME, finance=True))).recomputed == ALL_CORE + ["finance"]
+
+
+def test_unchanged_request_recomputes_nothing():
+    assert follow_up(HOME, HOME) == []
+
+
+def test_slab_edit_rebills_without_resizing():
+    edited = dict(HOME, slabs={"slab1Rate": 3, "slab4Rate": 12})  # above 350 kWh, so the bills do not move
+    assert follow_up(HOME, edited) == ["tariff", "bills"]
+
+
+def test_slab_edit_that_moves_the_bill_stops_at_payback():
+    edited = dict(HOME, slabs={"slab1Rate": 5})
+    assert follow_up(HOME, edited) == ["tariff", "bills", "payback"]
+
+
+def test_consumption_change_resizes():
+    recomputed = follow_up(HOME, dict(HOME, monthlyConsumption=500))
+    assert "sizing" in recomputed and "costing" in recomputed
+
+
+def test_optimizer_depends_on_the_tariff():
+    optimized = dict(HOME, optimize="npv")
+    assert evaluate(parse_site(optimized)).recomputed[2] == "optimization"
+    assert "optimization" in follow_up(optimized, dict(optimized, slabs={"slab1Rate": 5}))
+    assert "optimization" not in follow_up(optimized, dict(optimized, finance=True))
+
+
+@pytest.mark.parametrize("change", [{"optimize": "npv"}, {"finance": True}, {"usageType": "factory"}])
+def test_switching_options_matches_a_full_compute(change):
+    follow_up(HOME, dict(HOME, **change))
+    follow_up(dict(HOME, **change), HOME)
+
+
+def test_result_store_round_trip():
+    store = ResultStore(max_entries=4)
+    evaluation = evaluate(parse_site(HOME))
+    result_id = store.put(evaluation, ("args",), "summary")
+    stored = store.get(result_id)
+    assert stored.evaluation is evaluation and stored.summary == "summary"
+    assert store.get("unknown") is None and store.get(None) is None
+    edited = evaluate(parse_site(dict(HOME, slabs={"slab1Rate": 3, "slab4Rate": 12})), stored.evaluation)
+    assert edited.recomputed == ["tariff", "bills"]
+
+
+def test_follow_up_request_reports_the_recomputed_stages():
+    from app import app
+    client = app.test_client()
+    first = client.post("/api/recommend", json=HOME)
+    assert first.headers["X-Recomputed"] == ",".join(ALL_CORE)
+    edited = dict(HOME, slabs={"slab1Rate": 3, "slab4Rate": 12}, previousResultId=first.get_json()["result_id"])
+    assert client.post("/api/recommend", json=edited).headers["X-Recomputed"] == "tariff,bills"
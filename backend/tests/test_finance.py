@@ -0,0 +1,55 @@
+"""Cashflow projection: NPV, IRR and payback against hand-computed values, and the opt-in finance block."""
+
+import math
+
+import numpy as np
+import pytest
+
+import finance
+from calculator import parse_site, compute, to_response
+
+
+def flat_project(saving, cost, years=10, subsidy=0.0, om=0.0, rate=0.08, with_irr=True):
+    """One system with a constant monthly saving, no escalation or degradation"""
+    savings = np.full((1, years), saving / 12.0)
+    return finance.project(savings, np.full((1, years), 100.0), cost, subsidy, om, escalation=0.0, rate=rate,
+                           subsidy_lag=0, with_irr=with_irr)
+
+
+def test_npv_is_the_discounted_sum():
+    result = flat_project(saving=12000, cost=60000, years=10, om=0.0, rate=0.08)
+    expected = -60000 + sum(12000 / 1.08 ** t for t in range(1, 11))
+    assert result["npv"][0] == pytest.approx(expected)
+    assert result["lifetime_savings"][0] == pytest.approx(120000)
+
+
+def test_subsidy_reduces_the_upfront_cost():
+    with_subsidy = flat_project(saving=12000, cost=60000, subsidy=20000)
+    without = flat_project(saving=12000, cost=60000)
+    assert with_subsidy["npv"][0] - without["npv"][0] == pytest.approx(20000)
+
+
+def test_irr_zeroes_the_npv():
+    result = flat_project(saving=12000, cost=60000, years=10)
+    rate = result["irr"][0]
+    assert 0.1 < rate < 0.2
+    assert -60000 + sum(12000 / (1 + rate) ** t for t in range(1, 11)) == pytest.approx(0, abs=1e-4)
+
+
+def test_irr_is_nan_without_a_root_or_when_skipped():
+    assert math.isnan(flat_project(saving=-100, cost=60000)["irr"][0])
+    assert math.isnan(flat_project(saving=12000, cost=60000, with_irr=False)["irr"][0])
+
+
+def test_payback_interpolates_within_the_year():
+    flows = np.array([[-100.0, 40, 40, 40, 40], [-100.0, 10, 10, 10, 10], [0.0, 5, 5, 5, 5]])
+    assert finance.payback(flows).tolist() == [2.5, np.inf, 0.0]
+
+
+def test_finance_is_opt_in():
+    site = {"location": "Pune", "usageType": "home", "monthlyConsumption": 350, "tariff": 8}
+    assert "finance" not in to_response(compute(parse_site(site)))["details"]
+    block = to_response(compute(parse_site(dict(site, finance=True))))["details"]["finance"]
+    assert block["years"] == finance.LIFETIME_YEARS and block["npv"] is not None
+    with pytest.raises(ValueError):
+        parse_site(dict(site, finance="yes"))
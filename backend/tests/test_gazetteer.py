@@ -0,0 +1,66 @@
+"""Gazetteer: free-text locations resolve to the right place, and failures are not memoized."""
+
+import sqlite3
+
+import pytest
+
+import gazetteer
+from gazetteer import GAZETTEER_FILE, Gazetteer, build_database, normalize
+
+
+@pytest.fixture(scope="module")
+def places(tmp_path_factory):
+    db_path = str(tmp_path_factory.mktemp("gazetteer") / "gazetteer.sqlite")
+    build_database(GAZETTEER_FILE, db_path)
+    return Gazetteer(db_path)
+
+
+def test_normalize_drops_accents_punctuation_and_qualifiers():
+    assert normalize("  Pune City, India ") == "pune"
+    assert normalize("Bengaluru (Urban) District") == "bengaluru urban"
+    assert normalize("Bélgaum") == "belgaum"
+
+
+@pytest.mark.parametrize("text, name", [
+    ("Pune", "Pune"),
+    ("poona", "Pune"),
+    ("Bombay", "Mumbai"),
+    ("Kothrud, Pune, MH", "Pune"),
+    ("Delhi", "Delhi"),
+    ("New Delhi, Delhi", "New Delhi"),
+    ("Vizag", "Visakhapatnam"),
+    ("Visakha", "Visakhapatnam"),
+    ("411001", "Pune"),
+    ("Somewhere 411038", "Pune"),
+])
+def test_resolve(places, text, name):
+    assert places.resolve(text).name == name
+
+
+def test_unknown_places_do_not_resolve(places):
+    assert places.resolve("Atlantis") is None
+    assert places.search("", limit=5) == []
+
+
+def test_search_is_a_prefix_scan(places):
+    names = [place.name for place in places.search("Nag", limit=10)]
+    assert "Nagpur" in names and "Nagercoil" in names
+    assert all(normalize(name).startswith("nag") for name in names)
+
+
+def test_failed_lookups_are_not_cached(places, monkeypatch):
+    gazetteer._resolve_cached.cache_clear()
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError("database is locked")
+        return places
+
+    monkeypatch.setattr(gazetteer, "get_gazetteer", flaky)
+    assert gazetteer.resolve_place("Pune") is None
+    assert gazetteer.resolve_place("Pune").name == "Pune"
+    assert gazetteer.resolve_place("Pune").name == "Pune"
+    assert len(calls) == 2
+    gazetteer._resolve_cached.cache_clear()
@@ -0,0 +1,63 @@
+"""Resource grid: cell lookup and interpolation, with batch lookups bit-identical to single ones."""
+
+import numpy as np
+import pytest
+
+from geo_resource import (
+    MAX_WIND_FACTOR, MIN_WIND_FACTOR, REFERENCE_WIND_SPEED, ResourceGrid, get_resource_grid, wind_factor,
+    wind_factor_array,
+)
+
+
+def write_grid(path, rows):
+    path.write_text("# test grid\nlatitude,longitude,ghi_kwh_m2_day,wind_speed_ms\n"
+                    + "".join(f"{lat},{lon},{ghi},{wind}\n" for lat, lon, ghi, wind in rows))
+    return str(path)
+
+
+@pytest.fixture
+def grid(tmp_path):
+    # GHI rises with latitude and wind speed with longitude, so interpolation is easy to predict
+    rows = [(lat, lon, 4.0 + lat / 10, 3.0 + lon / 10) for lon in (70, 80, 90) for lat in (10, 20, 30)]
+    return ResourceGrid.from_csv(write_grid(tmp_path / "grid.csv", rows))
+
+
+def test_grid_nodes_are_exact(grid):
+    assert grid.lookup(20, 80) == (6.0, 11.0)
+    assert grid.lookup(20, 80, method="nearest") == (6.0, 11.0)
+
+
+def test_bilinear_between_nodes(grid):
+    ghi, wind = grid.lookup(15, 85)
+    assert ghi == pytest.approx(5.5) and wind == pytest.approx(11.5)
+    assert grid.lookup(16, 84, method="nearest") == (6.0, 11.0)
+
+
+def test_points_outside_use_the_nearest_edge(grid):
+    assert grid.lookup(-5, 60) == grid.lookup(10, 70) == (5.0, 10.0)
+    assert grid.lookup(45, 100) == grid.lookup(30, 90)
+
+
+@pytest.mark.parametrize("method", ["bilinear", "nearest"])
+def test_batch_lookup_matches_single_lookups(method):
+    real = get_resource_grid()
+    rng = np.random.default_rng(1)
+    lat, lon = rng.uniform(0, 40, 500), rng.uniform(60, 100, 500)
+    ghi, wind = real.lookup_array(lat, lon, method=method)
+    assert [real.lookup(a, b, method=method) for a, b in zip(lat, lon)] == list(zip(ghi.tolist(), wind.tolist()))
+
+
+def test_irregular_grids_are_rejected(tmp_path):
+    missing = [(lat, lon, 5, 5) for lat in (10, 20) for lon in (70, 80)][:-1]
+    with pytest.raises(ValueError, match="every cell"):
+        ResourceGrid.from_csv(write_grid(tmp_path / "missing.csv", missing))
+    uneven = [(lat, lon, 5, 5) for lat in (10, 20, 35) for lon in (70, 80)]
+    with pytest.raises(ValueError, match="uniform"):
+        ResourceGrid.from_csv(write_grid(tmp_path / "uneven.csv", uneven))
+
+
+def test_wind_factor_is_cubic_within_limits():
+    assert wind_factor(REFERENCE_WIND_SPEED) == 1.0
+    assert wind_factor(0.0) == MIN_WIND_FACTOR and wind_factor(20.0) == MAX_WIND_FACTOR
+    speeds = np.array([0.0, 4.0, REFERENCE_WIND_SPEED, 6.0, 20.0])
+    assert wind_factor_array(speeds).tolist() == [wind_factor(speed) for speed in speeds]
@@ -0,0 +1,120 @@
+"""LocalLM: the slot wait, retries and generation fit in one deadline, and batches respect the slot limit."""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from lm_stub import start_stub  # noqa: E402
+
+from local_lm import LocalLM, LocalLMError  # noqa: E402
+
+DATA = {"location": "Pune", "usage_type": "home", "system_type": "solar", "recommended_size_kw": 3.5,
+        "estimated_generation_kwh": 420, "monthly_savings": 3200, "system_cost": 192500, "payback_years": 5.0}
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**settings):
+        server, base = start_stub(**dict({"delay": 0.0, "tokens_per_second": 0, "tokens": 8}, **settings))
+        servers.append(server)
+        return server, base
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def elapsed(fn):
+    start = time.perf_counter()
+    try:
+        fn()
+    except LocalLMError:
+        pass
+    return time.perf_counter() - start
+
+
+def test_completion_and_stream(stub):
+    _, base = stub()
+    model = LocalLM(base, check_connection=False)
+    assert model.generate_energy_recommendation(DATA, timeout=5).split()[0] == "solar"
+    assert "".join(model.stream_energy_recommendation(DATA, timeout=5)).split()[0] == "solar"
+
+
+def test_waiting_for_a_slot_counts_against_the_deadline(stub):
+    _, base = stub(delay=1.0)
+    model = LocalLM(base, max_in_flight=1, check_connection=False)
+    busy = threading.Thread(target=model.generate_energy_recommendation, args=(DATA,), kwargs={"timeout": 5})
+    busy.start()
+    time.sleep(0.1)
+    with pytest.raises(LocalLMError, match="slot"):
+        model.generate_energy_recommendation(DATA, timeout=0.3)
+    assert elapsed(lambda: list(model.stream_energy_recommendation(DATA, timeout=0.3))) < 0.6
+    busy.join()
+
+
+def test_retries_stop_at_the_deadline(stub):
+    server, base = stub(error_rate=1.0)
+    model = LocalLM(base, max_retries=10, check_connection=False)
+    model.retry_backoff = 0.2
+    assert elapsed(lambda: model.generate_energy_recommendation(DATA, timeout=0.5)) < 0.8
+    assert server.config.requests <= 3
+
+
+def test_slow_generation_stops_at_the_deadline(stub):
+    _, base = stub(delay=2.0)
+    model = LocalLM(base, check_connection=False)
+    assert elapsed(lambda: model.generate_energy_recommendation(DATA, timeout=0.3)) < 0.6
+
+
+def test_batch_items_share_one_deadline(stub):
+    _, base = stub(delay=0.4)
+    model = LocalLM(base, max_in_flight=1, check_connection=False)
+    start = time.perf_counter()
+    results = model.generate_batch([dict(DATA, location=f"Site {i}") for i in range(5)], timeout=1.0)
+    assert time.perf_counter() - start < 1.5
+    assert any(result["summary"] is None for result in results)
+
+
+def count_in_flight(model):
+    """Wrap model._post to record the most requests it had in flight at once"""
+    lock, state = threading.Lock(), {"now": 0, "peak": 0}
+    post = model._post
+
+    def counted(*args, **kwargs):
+        with lock:
+            state["now"] += 1
+            state["peak"] = max(state["peak"], state["now"])
+        try:
+            return post(*args, **kwargs)
+        finally:
+            with lock:
+                state["now"] -= 1
+
+    model._post = counted
+    return state
+
+
+@pytest.mark.parametrize("max_in_flight", [1, 3])
+def test_batch_concurrency_is_limited(stub, max_in_flight):
+    _, base = stub(delay=0.05)
+    model = LocalLM(base, max_in_flight=max_in_flight, check_connection=False)
+    state = count_in_flight(model)
+    results = model.generate_batch([dict(DATA, location=f"Site {i}") for i in range(9)], max_in_flight=8, timeout=5)
+    assert all(result["summary"] for result in results)
+    assert state["peak"] == max_in_flight
+
+
+def test_batch_sends_identical_prompts_once(stub):
+    server, base = stub()
+    model = LocalLM(base, check_connection=False)
+    items = [DATA, dict(DATA, location="Leh"), DATA, DATA]
+    results = model.generate_batch(items, timeout=5)
+    assert server.config.requests == 2
+    assert [result["duplicate_of"] for result in results] == [None, None, 0, 0]
+    assert results[2]["summary"] == results[0]["summary"]
+    assert model.generate_batch([], timeout=5) == []
@@ -0,0 +1,75 @@
+"""Request metrics: summary timings on one clock, and bounded label values."""
+
+import re
+import uuid
+
+import pytest
+
+import app as backend
+from circuit_breaker import CircuitBreaker
+from metrics import registry
+
+
+class FakeModel:
+    """Stands in for LocalLM: answers at once, or fails"""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+
+    def generate_energy_recommendation(self, data, timeout=None):
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return "A fine system."
+
+
+def summary_seconds(path: str):
+    """(sum, count) of summary_duration_seconds for a path, from the /metrics text"""
+    text = registry.render()
+    total = re.search(rf'^summary_duration_seconds_sum{{path="{path}"}} (\S+)$', text, re.M)
+    count = re.search(rf'^summary_duration_seconds_count{{path="{path}"}} (\S+)$', text, re.M)
+    return (float(total.group(1)), int(count.group(1))) if total else (0.0, 0)
+
+
+def summary_args():
+    """Inputs no earlier test has summarized, so the summary cache misses"""
+    return (f"Test-{uuid.uuid4().hex}", "home", "solar", 3.5, 420, 3200, 192500, 5.0)
+
+
+@pytest.fixture
+def model(monkeypatch):
+    def use(fake):
+        monkeypatch.setattr(backend, "USE_LOCAL_LM", True)
+        monkeypatch.setattr(backend, "local_model", fake)
+        monkeypatch.setattr(backend, "llm_breaker", CircuitBreaker(failure_threshold=100))
+    return use
+
+
+@pytest.mark.parametrize("path, fake", [("llm", FakeModel()), ("template", FakeModel(fail=True))])
+def test_summary_duration_is_measured_on_one_clock(model, path, fake):
+    model(fake)
+    before_sum, before_count = summary_seconds(path)
+    backend.generate_summary(*summary_args())
+    after_sum, after_count = summary_seconds(path)
+    assert after_count == before_count + 1
+    assert 0 <= after_sum - before_sum < 5
+
+
+def test_cached_summary_is_recorded_as_cache(model):
+    model(FakeModel())
+    args = summary_args()
+    first = backend.generate_summary(*args)
+    before_sum, before_count = summary_seconds("cache")
+    assert backend.generate_summary(*args) == first
+    after_sum, after_count = summary_seconds("cache")
+    assert after_count == before_count + 1
+    assert 0 <= after_sum - before_sum < 5
+
+
+@pytest.mark.parametrize("usage_type", ["x0", ["home"], 1, None])
+def test_unknown_usage_types_are_rejected_before_they_become_labels(usage_type):
+    client = backend.app.test_client()
+    response = client.post("/api/recommend", json={"location": "Pune", "usageType": usage_type,
+                                                   "monthlyConsumption": 350})
+    assert response.status_code == 400 and "usageType" in response.get_json()["error"]
+    labels = set(re.findall(r'usage_type="([^"]*)"', registry.render()))
+    assert labels <= {"home", "factory", "agriculture"}
@@ -0,0 +1,39 @@
+"""Optimizer: budgets cap the system without hiding smaller affordable ones."""
+
+import pytest
+
+from calculator import parse_site, compute, SOLAR_COST_PER_KW
+from optimizer import optimize
+
+
+def optimized(**fields):
+    site = dict({"location": "Pune", "usageType": "home", "tariff": 8, "optimize": "npv"}, **fields)
+    return compute(parse_site(site))
+
+
+@pytest.mark.parametrize("consumption, budget", [(20000, 60000), (50000, 100000), (400, 60000), (100000, 200000)])
+def test_small_budget_on_a_large_site_finds_an_affordable_system(consumption, budget):
+    rec = optimized(monthlyConsumption=consumption, budget=budget)
+    assert 0 < rec.system_cost <= budget
+    # The grid near the cap is fine enough to use most of the budget
+    assert rec.system_cost > budget - 0.1 * SOLAR_COST_PER_KW * 2
+
+
+def test_budget_below_the_smallest_system_is_an_error():
+    with pytest.raises(ValueError, match="does not cover the smallest system"):
+        optimized(usageType="agriculture", monthlyConsumption=3000, budget=1000)
+
+
+def test_without_budget_the_grid_reaches_full_coverage():
+    optimum = optimize(1000, 8.0, None, solar_kwh_per_kw=120, wind_kwh_per_kw=0, solar_cost_per_kw=50000,
+                       wind_cost_per_kw=75000)
+    assert 0 < optimum.solar_kw <= 1000 / 120 + 0.3
+    assert optimum.wind_kw == 0
+
+
+@pytest.mark.parametrize("objective", ["npv", "payback"])
+def test_budget_caps_every_objective(objective):
+    optimum = optimize(5000, 9.0, None, solar_kwh_per_kw=120, wind_kwh_per_kw=90, solar_cost_per_kw=50000,
+                       wind_cost_per_kw=75000, budget=150000, objective=objective)
+    assert optimum.solar_kw * 50000 + optimum.wind_kw * 75000 <= 150000
+    assert optimum.solar_kw + optimum.wind_kw > 0
@@ -0,0 +1,52 @@
+"""Response cache keys: equivalent requests share a key, different ones never do."""
+
+import pytest
+
+from calculator import parse_site, DEFAULT_SLAB_RATES, SLAB_KEYS
+from response_cache import request_key
+from tariffs import register_tariff
+
+
+def key(data):
+    return request_key(parse_site(data), data)
+
+
+BASE = {"location": "Pune", "usageType": "home", "tariff": 8}
+
+
+def test_numbers_are_compared_by_value():
+    assert key(dict(BASE, monthlyConsumption=350)) == key(dict(BASE, monthlyConsumption=350.0))
+
+
+def test_string_numbers_are_rejected_before_the_cache():
+    with pytest.raises(ValueError):
+        key(dict(BASE, monthlyConsumption="350"))
+
+
+def test_slab_order_and_defaults_do_not_matter():
+    partial = {"slab4Rate": 12, "slab1Rate": 3}
+    full = dict(zip(SLAB_KEYS, DEFAULT_SLAB_RATES), slab1Rate=3, slab4Rate=12)
+    assert key(dict(BASE, monthlyConsumption=350, slabs=partial)) == key(dict(BASE, monthlyConsumption=350, slabs=full))
+
+
+@pytest.mark.parametrize("change", [
+    {"monthlyConsumption": 351}, {"tariff": 9}, {"usageType": "factory"}, {"budget": 100000},
+    {"simulate": True}, {"finance": True}, {"optimize": "npv"}, {"slabs": {"slab1Rate": 3}},
+    {"latitude": 18.5, "longitude": 73.9},
+])
+def test_different_requests_get_different_keys(change):
+    base = dict(BASE, monthlyConsumption=350)
+    assert key(dict(base, **change)) != key(base)
+
+
+def test_re_registering_a_tariff_changes_the_key():
+    register_tariff("test-cache-tariff", {"tiers": [{"upTo": 100, "rate": 4}, {"upTo": None, "rate": 8}]})
+    before = key(dict(BASE, monthlyConsumption=350, tariffId="test-cache-tariff"))
+    register_tariff("test-cache-tariff", {"tiers": [{"upTo": 100, "rate": 4}, {"upTo": None, "rate": 9}]})
+    assert key(dict(BASE, monthlyConsumption=350, tariffId="test-cache-tariff")) != before
+
+
+def test_uncacheable_requests_have_no_key():
+    assert key(dict(BASE, monthlyConsumption=350, asyncSummary=True)) is None
+    assert key(dict(BASE, monthlyConsumption=350, uncertainty={"samples": 100})) is None
+    assert key(dict(BASE, monthlyConsumption=350, uncertainty={"samples": 100, "seed": 1})) is not None
@@ -0,0 +1,37 @@
+"""Negotiated response formats carry the same results as JSON."""
+
+import pytest
+
+from batch import COLUMNS, recommend_batch
+from response_format import JSON, MSGPACK, ARROW, negotiate, batch_arrow
+from werkzeug.datastructures import MIMEAccept
+
+SITES = [{"id": "a", "location": "Pune", "usageType": "home", "monthlyConsumption": 350, "finance": True},
+         {"location": "Leh", "usageType": "factory", "monthlyConsumption": 9000},
+         {"monthlyConsumption": -1}]
+
+
+def accept(header):
+    return MIMEAccept([(value, 1) for value in header.split(",")]) if header else MIMEAccept()
+
+
+def test_json_is_the_default():
+    assert negotiate(accept("")) == JSON
+    assert negotiate(accept("*/*"), (JSON, MSGPACK, ARROW)) == JSON
+
+
+def test_unacceptable_formats_are_refused():
+    assert negotiate(accept("text/csv")) is None
+    assert negotiate(accept(ARROW)) is None  # not offered by single recommendations
+
+
+def test_batch_arrow_rows_match_json():
+    pa = pytest.importorskip("pyarrow")
+    results = recommend_batch(SITES)
+    table = pa.ipc.open_stream(batch_arrow(SITES, results)).read_all()
+    assert table.column_names == [name for name, _ in COLUMNS]
+    rows = table.to_pylist()
+    assert rows[0]["id"] == "a" and rows[0]["npv"] == results[0]["details"]["finance"]["npv"]
+    assert rows[1]["recommended_size_kw"] == results[1]["recommended_size_kw"] and rows[1]["npv"] is None
+    assert rows[2]["error"] == results[2]["error"]
+    assert table.schema.metadata[b"errors"] == b"1"
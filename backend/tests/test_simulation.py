@@ -0,0 +1,36 @@
+"""Hourly simulation at the edges of the solar geometry."""
+
+import math
+
+import numpy as np
+import pytest
+
+from batch import recommend_batch
+from calculator import parse_site, compute, to_response
+from simulation import solar_shape
+
+
+@pytest.mark.parametrize("latitude", [90.0, 80.0, 66.6, 0.0, -80.0, -90.0])
+def test_solar_shape_is_finite_everywhere(latitude):
+    shape = solar_shape(latitude)
+    assert np.isfinite(shape).all()
+    assert (shape >= 0).all()
+    assert shape.sum() == pytest.approx(365)
+
+
+def test_polar_night_produces_nothing():
+    shape = solar_shape(80.0).reshape(365, 24)
+    assert shape[355].sum() == 0  # late December, weeks into the polar night
+    assert shape[172].sum() > 0  # midsummer
+
+
+@pytest.mark.parametrize("latitude", [80.0, -80.0])
+def test_high_latitude_site_simulates(latitude):
+    site = {"location": "Svalbard", "usageType": "home", "monthlyConsumption": 400, "tariff": 8,
+            "latitude": latitude, "longitude": 15.0, "simulate": True}
+    response = to_response(compute(parse_site(site)))
+    simulation = response["details"]["simulation"]
+    assert all(not isinstance(value, float) or math.isfinite(value) for value in simulation.values())
+    row = recommend_batch([site])[0]
+    assert "error" not in row
+    assert row["details"]["simulation"] == simulation
@@ -0,0 +1,81 @@
+"""Streaming recommendations: server-sent event framing, with and without a local model."""
+
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+from lm_stub import start_stub  # noqa: E402
+
+import app as backend  # noqa: E402
+from circuit_breaker import CircuitBreaker  # noqa: E402
+from local_lm import LocalLM  # noqa: E402
+
+SITE = {"location": "Pune", "usageType": "home", "tariff": 8}
+
+
+def events(response):
+    """(event, payload) pairs from an SSE body, checking the framing of every frame"""
+    body = response.get_data(as_text=True)
+    assert body.endswith("\n\n")
+    parsed = []
+    for frame in body[:-2].split("\n\n"):
+        event, data = frame.split("\n")
+        assert event.startswith("event: ") and data.startswith("data: ")
+        parsed.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return parsed
+
+
+def stream(client, consumption):
+    response = client.post("/api/recommend/stream", json=dict(SITE, monthlyConsumption=consumption))
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert response.headers["Cache-Control"] == "no-cache"
+    return events(response)
+
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+
+def test_sse_event_is_one_frame():
+    assert backend.sse_event("token", {"text": "a\nb"}) == 'event: token\ndata: {"text": "a\\nb"}\n\n'
+
+
+def test_template_summary_without_a_model(client, monkeypatch):
+    monkeypatch.setattr(backend, "local_model", None)
+    (first, recommendation), (second, token), (third, done) = stream(client, 351)
+    assert (first, second, third) == ("recommendation", "token", "done")
+    assert recommendation["monthly_savings"] > 0
+    assert token["text"] == done["summary"]
+
+
+def test_model_tokens_are_streamed_then_summarized(client, monkeypatch):
+    server, base = start_stub(delay=0.0, tokens_per_second=0, tokens=6)
+    model = LocalLM(base, check_connection=False)
+    monkeypatch.setattr(backend, "USE_LOCAL_LM", True)
+    monkeypatch.setattr(backend, "local_model", model)
+    monkeypatch.setattr(backend, "llm_breaker", CircuitBreaker())  # the app's opens until LM Studio is checked
+    try:
+        received = stream(client, 352)
+        assert received[0][0] == "recommendation" and received[-1][0] == "done"
+        tokens = [payload["text"] for event, payload in received[1:-1]]
+        assert [event for event, _ in received[1:-1]] == ["token"] * len(tokens) and len(tokens) > 1
+        assert received[-1][1]["summary"] == "".join(tokens).strip()
+
+        # The finished summary is cached: the next identical request sends it as one token
+        cached = stream(client, 352)
+        assert [event for event, _ in cached] == ["recommendation", "token", "done"]
+        assert cached[1][1]["text"] == received[-1][1]["summary"]
+        assert server.config.requests == 1
+    finally:
+        model.close()
+        server.shutdown()
+
+
+def test_invalid_input_is_a_plain_error(client):
+    response = client.post("/api/recommend/stream", json=dict(SITE, usageType="office"))
+    assert response.status_code == 400 and "usageType" in response.get_json()["error"]
@@ -0,0 +1,69 @@
+"""Summary cache: equivalent prompts hit, entries are evicted least recently used and expire after the TTL."""
+
+import cache
+from summary_cache import SummaryCache, summary_cache_key
+
+DATA = {
+    "location": "Pune", "usage_type": "home", "system_type": "solar", "recommended_size_kw": 3.2,
+    "estimated_generation_kwh": 384, "monthly_savings": 3072, "system_cost": 123200, "payback_years": 3.3,
+}
+
+
+class Clock:
+    """Stands in for the time module inside cache.py"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+def test_keys_ignore_case_spacing_and_number_types():
+    same = dict(DATA, location="  pune ", usage_type="HOME", monthly_savings=3072.0)
+    assert summary_cache_key(same) == summary_cache_key(DATA)
+    assert summary_cache_key(dict(DATA, monthly_savings=3073)) != summary_cache_key(DATA)
+
+
+def test_significant_figures_bucket_near_identical_numbers():
+    near = dict(DATA, monthly_savings=3074, system_cost=123300)
+    assert summary_cache_key(near, 3) == summary_cache_key(DATA, 3)
+    assert summary_cache_key(near) != summary_cache_key(DATA)
+
+
+def test_hit_after_set():
+    summaries = SummaryCache(max_entries=4)
+    assert summaries.get(DATA) is None
+    summaries.set(DATA, "A 3.2 kW solar system for Pune.")
+    assert summaries.get(dict(DATA, location="PUNE")) == "A 3.2 kW solar system for Pune."
+    stats = summaries.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+
+def test_least_recently_used_entries_are_evicted():
+    summaries = SummaryCache(max_entries=2)
+    first, second, third = (dict(DATA, monthly_savings=n) for n in (1, 2, 3))
+    summaries.set(first, "first")
+    summaries.set(second, "second")
+    summaries.get(first)
+    summaries.set(third, "third")
+    assert summaries.get(second) is None
+    assert (summaries.get(first), summaries.get(third)) == ("first", "third")
+    assert summaries.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, "time", clock)
+    summaries = SummaryCache(ttl=60)
+    summaries.set(DATA, "summary")
+    clock.now += 59
+    assert summaries.get(DATA) == "summary"
+    clock.now += 2
+    assert summaries.get(DATA) is None
+
+
+def test_persisted_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "summaries.sqlite")
+    SummaryCache(db_path=path, ttl=60).set(DATA, "summary")
+    assert SummaryCache(db_path=path, ttl=60).get(DATA) == "summary"
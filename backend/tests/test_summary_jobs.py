@@ -0,0 +1,83 @@
+"""Asynchronous summary jobs: lifecycle, and sharing job state between processes."""
+
+import threading
+import time
+
+from cache import SQLiteStore
+from summary_jobs import SummaryJobQueue
+
+
+def test_job_finished_in_one_process_is_visible_in_another(tmp_path):
+    release = threading.Event()
+
+    def generate(name):
+        release.wait(5)
+        return f"summary for {name}"
+
+    path = str(tmp_path / "jobs.sqlite")
+    submitter = SummaryJobQueue(generate, workers=1, store=SQLiteStore(path, ttl=60))
+    other = SummaryJobQueue(generate, workers=1, store=SQLiteStore(path, ttl=60))
+    job = submitter.submit(("Pune",), "template")
+    seen = other.get(job.id)
+    assert (seen.status, seen.summary) == ("pending", "template")
+    release.set()
+    done = other.get(job.id, wait=5)
+    assert (done.status, done.summary) == ("complete", "summary for Pune")
+    assert other.get("no-such-job") is None
+    submitter.stop()
+    other.stop()
+
+
+def test_without_a_store_other_queues_do_not_know_the_job():
+    submitter = SummaryJobQueue(lambda: "summary", workers=1)
+    job = submitter.submit((), "template")
+    assert SummaryJobQueue(lambda: "summary", workers=1).get(job.id) is None
+    assert submitter.get(job.id, wait=5).status == "complete"
+    submitter.stop()
+
+
+def test_pending_until_generated_then_complete():
+    release = threading.Event()
+    jobs = SummaryJobQueue(lambda name: release.wait(5) and f"summary for {name}", workers=1)
+    job = jobs.submit(("Pune",), "template")
+    assert jobs.get(job.id).to_dict()["status"] == "pending"
+    assert jobs.get(job.id, wait=0.05).summary == "template"
+    release.set()
+    done = jobs.get(job.id, wait=5).to_dict()
+    assert (done["status"], done["summary"]) == ("complete", "summary for Pune")
+    assert done["elapsed"] >= 0
+    jobs.stop()
+
+
+def test_a_failed_job_keeps_the_template():
+    def generate():
+        raise RuntimeError("model unavailable")
+
+    jobs = SummaryJobQueue(generate, workers=1)
+    job = jobs.get(jobs.submit((), "template").id, wait=5)
+    assert (job.status, job.summary) == ("failed", "template")
+    jobs.stop()
+
+
+def test_a_full_queue_refuses_jobs():
+    release = threading.Event()
+    jobs = SummaryJobQueue(lambda: release.wait(5) and "summary", workers=1, max_queue=1)
+    running = jobs.submit((), "template")
+    while jobs.pending():  # let the worker take the first job
+        time.sleep(0.01)
+    queued = jobs.submit((), "template")
+    assert queued is not None and jobs.submit((), "template") is None
+    release.set()
+    assert jobs.get(running.id, wait=5).status == jobs.get(queued.id, wait=5).status == "complete"
+    jobs.stop()
+    assert jobs.submit((), "template") is None
+
+
+def test_finished_jobs_expire_after_the_ttl():
+    jobs = SummaryJobQueue(lambda: "summary", workers=1, ttl=0)
+    job = jobs.get(jobs.submit((), "template").id, wait=5)
+    assert job.status == "complete"
+    jobs._last_expiry = 0  # skip the expiry check's rate limit
+    jobs.submit((), "template")
+    assert jobs.get(job.id) is None
+    jobs.stop()
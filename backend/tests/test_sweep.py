@@ -0,0 +1,93 @@
+"""Every sweep grid point over /api/recommend fields matches /api/recommend, and bad grids are rejected cheaply.
+
+The what-if axes (budgetCap, solarSubsidyPercent) have no /api/recommend equivalent and are tested on their own.
+"""
+
+import itertools
+import math
+import time
+
+import pytest
+
+from calculator import (
+    parse_site, compute, to_response, AGRICULTURE_COST_PER_KW, AGRICULTURE_SUBSIDY, SOLAR_COST_PER_KW, WIND_COST_PER_KW,
+)
+from sweep import sweep, SWEEP_MAX_POINTS
+
+
+def single(base, names, combo):
+    """to_response(compute()) for the base site with one grid point's values"""
+    site = dict(base, finance=True)
+    for name, value in zip(names, combo):
+        if name.startswith("slab"):
+            site["slabs"] = dict(site.get("slabs") or {}, **{name: value})
+        else:
+            site[name] = value
+    return to_response(compute(parse_site(site)))
+
+
+@pytest.mark.parametrize("base, parameters", [
+    ({"location": "Pune", "usageType": "home", "budget": 50000},  # ignored without optimize, as in /api/recommend
+     {"monthlyConsumption": {"start": 0, "stop": 2000, "step": 5}, "tariff": [0, 6.5, 8, 9.25]}),
+    ({"location": "Jaisalmer", "usageType": "factory", "slabs": {"slab1Rate": 3}},
+     {"monthlyConsumption": {"start": 10, "stop": 30000, "count": 40}, "slab2Rate": [4, 6],
+      "slab4Rate": {"start": 8, "stop": 12, "step": 0.5}}),
+    ({"location": "Leh", "usageType": "agriculture", "tariffId": "example-domestic-8-tier"},
+     {"monthlyConsumption": {"start": 0, "stop": 5000, "step": 7}}),
+    ({"location": "Chennai", "usageType": "agriculture"},
+     {"monthlyConsumption": {"start": 0, "stop": 5000, "step": 35}, "slab3Rate": [5, 9]}),
+])
+def test_grid_points_match_single_site(base, parameters):
+    result = sweep(base, parameters)
+    names = [axis["name"] for axis in result["axes"]]
+    grid = itertools.product(*(axis["values"] for axis in result["axes"]))
+    for k, combo in enumerate(grid):
+        one = single(base, names, combo)
+        for key in ("recommended_size_kw", "estimated_generation_kwh", "monthly_savings", "system_cost",
+                    "payback_years"):
+            assert result["results"][key][k] == one[key], (key, combo)
+        assert result["results"]["new_bill"][k] == one["details"]["new_bill"], combo
+        assert result["results"]["effective_tariff"][k] == one["details"]["effective_tariff"], combo
+        assert result["results"]["npv"][k] == pytest.approx(one["details"]["finance"]["npv"], abs=0.011), combo
+
+
+@pytest.mark.parametrize("parameters", [
+    {"x": [1]}, {"tariff": []}, {"budgetCap": [0]}, {"solarSubsidyPercent": [120]}, {"budget": [100000]},
+    {"tariff": {"start": 5, "stop": 1}},
+    {"tariff": {"start": 0, "stop": 1, "step": 0}}, {"tariff": "x"}, {},
+    {"monthlyConsumption": {"start": 0, "stop": 1e9, "step": 1}},
+    {"monthlyConsumption": [100, 200], "tariff": {"start": 1, "stop": 10, "count": SWEEP_MAX_POINTS}},
+])
+def test_bad_parameters_are_rejected(parameters):
+    with pytest.raises(ValueError):
+        sweep({"usageType": "home"}, parameters)
+
+
+def test_huge_count_is_rejected_before_building_the_axis():
+    start = time.perf_counter()
+    with pytest.raises(ValueError, match="more than"):
+        sweep({"usageType": "home"}, {"tariff": {"start": 1, "stop": 10, "count": 20_000_000}})
+    assert time.perf_counter() - start < 0.5
+
+
+def test_slabs_cannot_be_swept_with_a_tariff_id():
+    with pytest.raises(ValueError):
+        sweep({"tariffId": "legacy-4-slab"}, {"slab1Rate": [1]})
+
+
+def test_budget_cap_limits_the_size_to_what_it_pays_for():
+    result = sweep({"location": "Pune", "usageType": "agriculture", "monthlyConsumption": 1000},
+                   {"budgetCap": [10000, 50000, 10 ** 7]})["results"]
+    net_per_kw = AGRICULTURE_COST_PER_KW * (1 - AGRICULTURE_SUBSIDY)
+    assert result["budget_limited"] == [True, True, False]
+    affordable = [math.floor(budget / net_per_kw * 10) / 10 for budget in (10000, 50000)]
+    assert result["recommended_size_kw"] == affordable + [10.0]
+
+
+def test_solar_subsidy_applies_to_solar_systems_only():
+    home = sweep({"location": "Pune", "usageType": "home", "monthlyConsumption": 500},
+                 {"solarSubsidyPercent": [0, 40]})["results"]
+    assert home["system_cost"] == [SOLAR_COST_PER_KW * 5, SOLAR_COST_PER_KW * 5 * 0.6]
+    factory = sweep({"location": "Pune", "usageType": "factory", "monthlyConsumption": 500},
+                    {"solarSubsidyPercent": [0, 40]})["results"]
+    assert factory["system_cost"] == [WIND_COST_PER_KW * 5] * 2
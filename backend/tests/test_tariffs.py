@@ -0,0 +1,45 @@
+"""Named tariffs: runtime registrations are shared with other processes through TARIFF_STORE."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import tariffs
+from tariffs import get_tariff, list_tariffs, register_tariff
+
+SPEC = {"tiers": [{"upTo": 100, "rate": 4}, {"upTo": None, "rate": 8}]}
+
+
+def register_elsewhere(name, rate):
+    """Register a tariff from a separate process, as another gunicorn worker would"""
+    spec = {"tiers": [{"upTo": 100, "rate": 4}, {"upTo": None, "rate": rate}]}
+    code = f"import tariffs; tariffs.register_tariff({name!r}, {spec!r})"
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(tariffs.__file__), env=os.environ)
+
+
+def test_registration_in_another_process_is_visible():
+    register_elsewhere("test-shared-tariff", 8)
+    assert get_tariff("test-shared-tariff").bill(200) == 400 + 800
+    assert "test-shared-tariff" in [tariff["name"] for tariff in list_tariffs()]
+
+
+def test_replacement_in_another_process_is_visible():
+    register_tariff("test-replaced-tariff", SPEC)
+    register_elsewhere("test-replaced-tariff", 10)
+    assert get_tariff("test-replaced-tariff").rates == (4.0, 10.0)
+
+
+def test_invalid_tariffs_are_not_stored():
+    register_tariff("test-valid-tariff", SPEC)
+    with pytest.raises(ValueError):
+        register_tariff("test-invalid-tariff", {"tiers": [{"upTo": 100, "rate": 4}]})
+    with open(tariffs.TARIFF_STORE, encoding="utf-8") as f:
+        assert "test-invalid-tariff" not in f.read()
+
+
+def test_an_empty_store_setting_keeps_registrations_in_process(monkeypatch):
+    monkeypatch.setattr(tariffs, "TARIFF_STORE", "")
+    register_tariff("test-local-tariff", SPEC)
+    assert get_tariff("test-local-tariff").bill(50) == 200
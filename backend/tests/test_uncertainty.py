@@ -0,0 +1,42 @@
+"""Uncertainty bands: a seed pins the percentiles, and portfolios share one bounded pool."""
+
+import pytest
+
+import uncertainty
+from uncertainty import parse_options, run_many, run_uncertainty
+
+SITE = dict(monthly_consumption=400.0, tariff=8.0, plan=None, solar_generation=300.0, wind_generation=0.0,
+            gross_cost=180000.0, subsidy=40000.0, om=2000.0)
+
+
+def test_a_seed_gives_the_same_bands():
+    first = run_uncertainty(**SITE, samples=500, seed=7)
+    assert run_uncertainty(**SITE, samples=500, seed=7) == first
+    assert run_uncertainty(**SITE, samples=500, seed=8) != first
+    bands = first["monthly_savings"]
+    assert bands["p10"] <= bands["p50"] <= bands["p90"]
+    assert first["samples"] == 500 and first["seed"] == 7
+
+
+def test_parse_options():
+    assert parse_options(None) is None and parse_options(False) is None
+    assert parse_options(True) == {"samples": uncertainty.UNC_SAMPLES, "seed": None}
+    assert parse_options({"samples": 10, "seed": 1}) == {"samples": 10, "seed": 1}
+    for value in ({"samples": 0}, {"samples": True}, {"seed": -1}, {"seed": 1.5}, "yes"):
+        with pytest.raises(ValueError):
+            parse_options(value)
+
+
+def test_run_many_reuses_one_pool(monkeypatch):
+    monkeypatch.setattr(uncertainty, "UNC_WORKERS", 2)
+    monkeypatch.setattr(uncertainty, "UNC_PARALLEL_MIN_SITES", 2)
+    jobs = [dict(SITE, monthly_consumption=300.0 + 50 * i, samples=200, seed=i) for i in range(4)]
+    try:
+        assert run_many(jobs) == [run_uncertainty(**job) for job in jobs]
+        pool = uncertainty._pool
+        assert pool is not None and pool._max_workers == 2
+        run_many(jobs)
+        assert uncertainty._pool is pool
+    finally:
+        uncertainty.shutdown_pool()
+    assert uncertainty._pool is None
@@ -0,0 +1,167 @@
+"""
+Monte Carlo uncertainty bands for savings and payback.
+
+Each sample draws its own year-to-year resource variation, tariff escalation
+and panel/turbine degradation, runs the monthly bill model of
+`calculator.compute()` for every year of the system's life and projects the
+cashflows with `finance.project()`. Samples are drawn and billed as whole NumPy
+arrays, a chunk at a time, and summarized as P10/P50/P90 percentiles.
+Portfolios can spread sites over a process pool.
+"""
+
+import math
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from finance import LIFETIME_YEARS, growth, project
+from tariffs import Tariff
+
+UNC_SAMPLES = int(os.environ.get("UNC_SAMPLES", 2000))
+UNC_MAX_SAMPLES = int(os.environ.get("UNC_MAX_SAMPLES", 20000))
+UNC_CHUNK = 4096  # samples billed at once, to bound memory
+UNC_WORKERS = int(os.environ.get("UNC_WORKERS", min(4, os.cpu_count() or 1)))
+UNC_PARALLEL_MIN_SITES = int(os.environ.get("UNC_PARALLEL_MIN_SITES", 32))
+
+# Year-to-year variation of annual generation (standard deviation of a lognormal factor)
+SOLAR_VARIABILITY = float(os.environ.get("UNC_SOLAR_SIGMA", 0.05))
+WIND_VARIABILITY = float(os.environ.get("UNC_WIND_SIGMA", 0.12))
+# Annual tariff escalation and output degradation rates, drawn once per sample
+ESCALATION_MEAN = float(os.environ.get("UNC_ESCALATION_MEAN", 0.03))
+ESCALATION_SD = float(os.environ.get("UNC_ESCALATION_SD", 0.015))
+DEGRADATION_MEAN = float(os.environ.get("UNC_DEGRADATION_MEAN", 0.005))
+DEGRADATION_SD = float(os.environ.get("UNC_DEGRADATION_SD", 0.002))
+
+PERCENTILES = (10, 50, 90)
+
+
+def parse_options(value) -> Optional[Dict[str, Any]]:
+    """Normalize the `uncertainty` request field to {"samples", "seed"} or None, raising ValueError"""
+    if value is None or value is False:
+        return None
+    if value is True:
+        value = {}
+    if not isinstance(value, dict):
+        raise ValueError("uncertainty must be true, false or an object")
+    samples = value.get('samples', UNC_SAMPLES)
+    if isinstance(samples, bool) or not isinstance(samples, int) or not 1 <= samples <= UNC_MAX_SAMPLES:
+        raise ValueError(f"uncertainty.samples must be an integer from 1 to {UNC_MAX_SAMPLES}")
+    seed = value.get('seed')
+    if seed is not None and (isinstance(seed, bool) or not isinstance(seed, int) or seed < 0):
+        raise ValueError("uncertainty.seed must be a non-negative integer")
+    return {"samples": samples, "seed": seed}
+
+
+def _bands(values: np.ndarray) -> Dict[str, Optional[float]]:
+    """P10/P50/P90 of a sample, with None where the percentile is not finite (NaN values are left out)"""
+    bands = {}
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {f"p{p}": None for p in PERCENTILES}
+    with np.errstate(invalid="ignore"):  # payback is infinite for samples that never pay back
+        percentiles = np.percentile(values, PERCENTILES)
+    for p, value in zip(PERCENTILES, percentiles):
+        bands[f"p{p}"] = round(float(value), 2) if math.isfinite(value) else None
+    return bands
+
+
+def _sample_chunk(rng: np.random.Generator, n: int, monthly_consumption: float, tariff: float, plan: Optional[Tariff],
+                  solar_generation: float, wind_generation: float, gross_cost: float, subsidy: float, om: float):
+    """First-year monthly savings and the cashflow projection for n samples"""
+    years = LIFETIME_YEARS
+    escalation = rng.normal(ESCALATION_MEAN, ESCALATION_SD, (n, 1))
+    degradation = np.clip(rng.normal(DEGRADATION_MEAN, DEGRADATION_SD, (n, 1)), 0.0, None)
+
+    # Lognormal factors with a mean of one
+    generation = np.zeros((n, years))
+    if solar_generation > 0:
+        generation += solar_generation * rng.lognormal(-SOLAR_VARIABILITY ** 2 / 2, SOLAR_VARIABILITY, (n, years))
+    if wind_generation > 0:
+        generation += wind_generation * rng.lognormal(-WIND_VARIABILITY ** 2 / 2, WIND_VARIABILITY, (n, years))
+    generation = np.trunc(generation * growth(-degradation, years))
+
+    # Monthly bill model for every year, then the cashflows with this sample's escalation
+    current_bill = monthly_consumption * tariff
+    new_consumption = np.maximum(0.0, monthly_consumption - generation)
+    new_bill = plan.bill_array(new_consumption) if plan is not None else new_consumption * tariff
+    monthly_savings = current_bill - new_bill
+    return monthly_savings[:, 0], project(monthly_savings, generation, gross_cost, subsidy, om, escalation=escalation)
+
+
+def run_uncertainty(monthly_consumption: float, tariff: float, plan: Optional[Tariff],
+                    solar_generation: float, wind_generation: float, gross_cost: float, subsidy: float, om: float,
+                    samples: int = UNC_SAMPLES, seed: Optional[int] = None) -> Dict[str, Any]:
+    """Percentile bands for one site.
+
+    `solar_generation` and `wind_generation` are the expected monthly kWh from
+    each technology, `tariff` is the flat rate used when there is no plan and
+    `om` is the first-year O&M cost. The same seed always gives the same bands.
+    """
+    rng = np.random.default_rng(seed)
+    parts = [
+        _sample_chunk(rng, min(UNC_CHUNK, samples - start), monthly_consumption, tariff, plan,
+                      solar_generation, wind_generation, gross_cost, subsidy, om)
+        for start in range(0, samples, UNC_CHUNK)
+    ]
+    monthly_savings = np.concatenate([savings for savings, _ in parts])
+    projection = {key: np.concatenate([p[key] for _, p in parts]) for key in parts[0][1]}
+    payback = projection["payback_years"]
+    return {
+        "samples": samples,
+        "seed": seed,
+        "years": LIFETIME_YEARS,
+        "monthly_savings": _bands(monthly_savings),
+        "lifetime_savings": _bands(projection["lifetime_savings"]),
+        "npv": _bands(projection["npv"]),
+        "irr": _bands(projection["irr"]),
+        "payback_years": _bands(payback),
+        "probability_of_payback": round(float(np.isfinite(payback).mean()), 3),
+    }
+
+
+def _run(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    """Process pool entry point"""
+    return run_uncertainty(**kwargs)
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """The process pool shared by every request in this process, started on first use"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            # Spawned workers avoid forking a server process that is running threads
+            _pool = ProcessPoolExecutor(max_workers=UNC_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+            _pool_pid = os.getpid()
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared pool's worker processes (safe to call more than once)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None and _pool_pid == os.getpid():
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def run_many(jobs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """run_uncertainty() for many sites, spread over the shared process pool for large portfolios"""
+    if UNC_WORKERS <= 1 or len(jobs) < UNC_PARALLEL_MIN_SITES:
+        return [run_uncertainty(**job) for job in jobs]
+    try:
+        return list(_get_pool().map(_run, jobs, chunksize=max(1, len(jobs) // (UNC_WORKERS * 4))))
+    except BrokenProcessPool as e:
+        # A worker died: start a fresh pool next time and finish this batch in-process
+        print(f"Uncertainty pool failed ({e}); running {len(jobs)} sites in-process")
+        shutdown_pool()
+        return [run_uncertainty(**job) for job in jobs]
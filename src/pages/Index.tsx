@@ -1,4 +1,4 @@
-import { useState } from "react";
+import { useRef, useState } from "react";
 import Hero from "@/components/Hero";
 import EnergyForm from "@/components/EnergyForm";
 import ResultsDashboard from "@/components/ResultsDashboard";
@@ -7,6 +7,8 @@ import { useToast } from "@/hooks/use-toast";
 const Index = () => {
   const [results, setResults] = useState(null);
   const [isLoading, setIsLoading] = useState(false);
+  // Last response and its ETag, so an unchanged form comes back as 304 Not Modified
+  const lastResponse = useRef<{ etag: string; data: any } | null>(null);
   const { toast } = useToast();
 
   const handleFormSubmit = async (formData: any) => {
@@ -18,15 +20,22 @@ const Index = () => {
         method: "POST",
         headers: {
           "Content-Type": "application/json",
+          ...(lastResponse.current ? { "If-None-Match": lastResponse.current.etag } : {}),
         },
         body: JSON.stringify(formData),
       });
 
-      if (!response.ok) {
-        throw new Error("Failed to get recommendations");
+      let data;
+      if (response.status === 304 && lastResponse.current) {
+        data = lastResponse.current.data;
+      } else {
+        if (!response.ok) {
+          throw new Error("Failed to get recommendations");
+        }
+        data = await response.json();
+        const etag = response.headers.get("ETag");
+        lastResponse.current = etag ? { etag, data } : null;
       }
-
-      const data = await response.json();
       setResults(data);
       
       toast({